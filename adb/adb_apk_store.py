@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+APK_STORE_DIR = os.getenv("APK_STORE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "apk_store"))
+# Taille des écritures et lectures disque lors de l'ajout d'un APK
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+# Types de blocs du format XML binaire Android (AXML)
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+RES_XML_START_ELEMENT_TYPE = 0x0102
+UTF8_FLAG = 0x100
+TYPE_STRING = 0x03
+ATTR_VERSION_CODE = 0x0101021B
+
+
+class ApkFormatError(ValueError):
+    """Fichier qui n'est pas un APK lisible (archive ou manifeste invalide)."""
+
+
+def _read_string_pool(data: bytes, offset: int) -> List[str]:
+    header_size, _ = struct.unpack_from("<HI", data, offset + 2)
+    count, _, flags, strings_start = struct.unpack_from("<IIII", data, offset + 8)
+    offsets = struct.unpack_from(f"<{count}I", data, offset + header_size)
+    base = offset + strings_start
+    strings = []
+    for string_offset in offsets:
+        position = base + string_offset
+        if flags & UTF8_FLAG:
+            # Longueur en caractères puis en octets, chacune sur 1 ou 2 octets
+            position += 2 if data[position] & 0x80 else 1
+            length = data[position]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[position + 1]
+                position += 1
+            position += 1
+            strings.append(data[position:position + length].decode("utf-8", errors="replace"))
+        else:
+            length = struct.unpack_from("<H", data, position)[0]
+            if length & 0x8000:
+                length = ((length & 0x7FFF) << 16) | struct.unpack_from("<H", data, position + 2)[0]
+                position += 2
+            position += 2
+            strings.append(data[position:position + length * 2].decode("utf-16-le", errors="replace"))
+    return strings
+
+
+def parse_manifest(data: bytes) -> Dict[str, Any]:
+    """
+    Extrait package, versionCode et split de l'élément <manifest> d'un AndroidManifest.xml compilé.
+
+    Seuls le pool de chaînes, la table des ressources et le premier élément sont lus :
+    cela évite de dépendre d'aapt sur le serveur.
+    """
+    if len(data) < 8 or struct.unpack_from("<H", data, 0)[0] != 0x0003:
+        raise ApkFormatError("Manifeste binaire invalide")
+    strings: List[str] = []
+    resource_ids: List[int] = []
+    offset = struct.unpack_from("<H", data, 2)[0]
+    while offset + 8 <= len(data):
+        chunk_type, header_size, chunk_size = struct.unpack_from("<HHI", data, offset)
+        if chunk_size < 8:
+            break
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = _read_string_pool(data, offset)
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            resource_ids = list(struct.unpack_from(f"<{(chunk_size - header_size) // 4}I", data, offset + header_size))
+        elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+            body = offset + header_size
+            name, attribute_start, attribute_size, attribute_count = struct.unpack_from("<4xIHHH", data, body)
+            if strings[name] != "manifest":
+                raise ApkFormatError("Élément <manifest> introuvable")
+            manifest: Dict[str, Any] = {"package": None, "version_code": None, "split": None}
+            for index in range(attribute_count):
+                position = body + attribute_start + index * attribute_size
+                _, attr_name, raw_value, _, data_type, value = struct.unpack_from("<IIIHxBI", data, position)
+                key = strings[attr_name] if attr_name < len(strings) else ""
+                if attr_name < len(resource_ids) and resource_ids[attr_name] == ATTR_VERSION_CODE:
+                    key = "versionCode"
+                text = strings[raw_value] if raw_value != 0xFFFFFFFF else None
+                if key == "package":
+                    manifest["package"] = text
+                elif key == "versionCode":
+                    manifest["version_code"] = int(text) if data_type == TYPE_STRING else value
+                elif key == "split":
+                    manifest["split"] = text
+            return manifest
+        offset += chunk_size
+    raise ApkFormatError("Élément <manifest> introuvable")
+
+
+def read_apk_manifest(path: str) -> Dict[str, Any]:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return parse_manifest(archive.read("AndroidManifest.xml"))
+    except (zipfile.BadZipFile, KeyError, struct.error, IndexError) as e:
+        raise ApkFormatError(f"APK illisible : {e}")
+
+
+class ApkStore:
+    """
+    Dépôt d'APK adressé par contenu : chaque fichier est rangé sous son empreinte SHA-256.
+
+    L'index (index.json) associe l'empreinte au paquet, au versionCode et au nom de
+    split éventuel ; un même APK envoyé plusieurs fois n'est stocké qu'une fois.
+    """
+
+    _instance: Optional["ApkStore"] = None
+
+    def __init__(self, directory: str = APK_STORE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, "index.json")
+        self._index: Dict[str, Dict[str, Any]] = {}
+        if os.path.isfile(self._index_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                self._index = json.load(f)
+
+    @classmethod
+    def instance(cls) -> "ApkStore":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.directory, f"{sha256}.apk")
+
+    def _save_index(self) -> None:
+        temporary = self._index_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(temporary, self._index_path)
+
+    async def add_stream(self, chunks: AsyncIterator[bytes], filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Enregistre un APK reçu par blocs en calculant son empreinte au fil de l'écriture.
+
+        Les blocs sont regroupés par WRITE_BLOCK_SIZE ; écriture, hachage et enregistrement
+        s'exécutent dans un thread pour ne pas bloquer la boucle d'événements.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        descriptor, temporary = tempfile.mkstemp(suffix=".apk", dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                pending = bytearray()
+                async for chunk in chunks:
+                    size += len(chunk)
+                    pending += chunk
+                    if len(pending) >= WRITE_BLOCK_SIZE:
+                        await asyncio.to_thread(self._write_block, f, digest, bytes(pending))
+                        pending.clear()
+                if pending:
+                    await asyncio.to_thread(self._write_block, f, digest, bytes(pending))
+            return await asyncio.to_thread(self._register, temporary, digest.hexdigest(), size, filename)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @staticmethod
+    def _write_block(f: BinaryIO, digest: Any, block: bytes) -> None:
+        digest.update(block)
+        f.write(block)
+
+    def add_file(self, source: str) -> Dict[str, Any]:
+        """Copie un APK local dans le dépôt (bloquant : depuis la boucle, utiliser add_file_async)."""
+        digest = hashlib.sha256()
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(WRITE_BLOCK_SIZE), b""):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        if sha256 in self._index:
+            return self._index[sha256]
+        descriptor, temporary = tempfile.mkstemp(suffix=".apk", dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "wb") as target, open(source, "rb") as f:
+                for block in iter(lambda: f.read(WRITE_BLOCK_SIZE), b""):
+                    target.write(block)
+            return self._register(temporary, sha256, os.path.getsize(source), os.path.basename(source))
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    async def add_file_async(self, source: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.add_file, source)
+
+    def _register(self, temporary: str, sha256: str, size: int, filename: Optional[str]) -> Dict[str, Any]:
+        with self._lock:
+            if sha256 in self._index:
+                return self._index[sha256]
+            manifest = read_apk_manifest(temporary)
+            if not manifest["package"]:
+                raise ApkFormatError("Nom de paquet absent du manifeste")
+            os.replace(temporary, self.path(sha256))
+            entry = {
+                "sha256": sha256, "size": size, "filename": filename, "added": datetime.now().isoformat(),
+                **manifest
+            }
+            self._index[sha256] = entry
+            self._save_index()
+            logger.info(f"APK {manifest['package']} ({manifest['version_code']}) ajouté au dépôt : {sha256}")
+            return entry
+
+    def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        return self._index.get(sha256)
+
+    def list(self, package: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [entry for entry in self._index.values() if package is None or entry["package"] == package]
+
+    def remove(self, sha256: str) -> bool:
+        with self._lock:
+            if self._index.pop(sha256, None) is None:
+                return False
+            self._save_index()
+        if os.path.exists(self.path(sha256)):
+            os.remove(self.path(sha256))
+        return True
+
+    def resolve_bundle(self, sha256s: List[str]) -> Dict[str, Any]:
+        """
+        Vérifie qu'une liste d'empreintes forme une installation cohérente :
+        un APK de base éventuellement accompagné de splits du même paquet et de la même version.
+        """
+        entries = []
+        for sha256 in dict.fromkeys(sha256s):
+            entry = self.get(sha256)
+            if entry is None:
+                raise KeyError(f"APK inconnu : {sha256}")
+            entries.append(entry)
+        bases = [entry for entry in entries if not entry["split"]]
+        if len(bases) != 1:
+            raise ValueError("Une installation doit contenir exactement un APK de base")
+        base = bases[0]
+        for entry in entries:
+            if (entry["package"], entry["version_code"]) != (base["package"], base["version_code"]):
+                raise ValueError(f"Le split {entry['sha256']} ne correspond pas à {base['package']}")
+        paths = [self.path(base["sha256"])] + [self.path(e["sha256"]) for e in entries if e["split"]]
+        return {"package": base["package"], "version_code": base["version_code"], "paths": paths}
@@ -1,6 +1,8 @@
+import asyncio
+import os
 import subprocess
 import shutil
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional
 from enum import Enum, auto
 
 try:
@@ -18,14 +20,50 @@ class AdbServiceCategory(Enum):
     FICHIERS = auto()
 
 
+# "binary" : fork du binaire adb ; "socket" : protocole hôte sur le port 5037
+ADB_BACKEND = os.getenv("ADB_BACKEND", "binary")
+# Les lots shell courts qui le demandent (session=True) passent par une session persistante par périphérique
+ADB_SHELL_SESSIONS = os.getenv("ADB_SHELL_SESSIONS", "1") == "1"
+
+_adb_path: Optional[str] = None
+
+
+def adb_path() -> str:
+    """Localise le binaire adb une seule fois au lieu de parcourir le PATH à chaque appel."""
+    global _adb_path
+    if _adb_path is None:
+        _adb_path = shutil.which("adb")
+        if not _adb_path:
+            raise RuntimeError("ADB n'est pas installé ou introuvable dans le PATH")
+    return _adb_path
+
+
 class AdbCommandExecutor:
+    backend: str = ADB_BACKEND
+
+    @classmethod
+    def set_backend(cls, backend: str) -> None:
+        """Sélectionne le backend d'exécution ("binary" ou "socket") des deux exécuteurs."""
+        if backend not in ("binary", "socket"):
+            raise ValueError("Backend invalide. Utilisez 'binary' ou 'socket'.")
+        cls.backend = backend
+
     @staticmethod
     def execute(command: List[str], handle_errors: bool = True) -> str:
-        if not shutil.which("adb"):
-            raise RuntimeError("ADB n'est pas installé ou introuvable dans le PATH")
+        if AdbCommandExecutor.backend == "socket":
+            from adb.adb_host_client import AdbHostClient, AdbProtocolError, AdbUnsupportedCommand
+            try:
+                return AdbHostClient.default().run(command)
+            except (AdbUnsupportedCommand, ConnectionRefusedError):
+                pass  # Repli sur le binaire adb (install, push, serveur arrêté...)
+            except (AdbProtocolError, OSError) as e:
+                if handle_errors:
+                    return f"Erreur : {e}"
+                raise RuntimeError(f"Échec de la commande ADB : {e}")
+
         try:
             result = subprocess.run(
-                ["adb"] + command,
+                [adb_path()] + command,
                 capture_output=True,
                 text=True,
                 check=True,
@@ -35,4 +73,160 @@ class AdbCommandExecutor:
         except subprocess.CalledProcessError as e:
             if handle_errors:
                 return f"Erreur : {e.stderr}"
-            raise RuntimeError(f"Échec de la commande ADB : {e.stderr}")
\ No newline at end of file
+            raise RuntimeError(f"Échec de la commande ADB : {e.stderr}")
+
+
+class AsyncAdbCommandExecutor:
+    """Équivalent non bloquant d'AdbCommandExecutor basé sur asyncio."""
+
+    DEFAULT_TIMEOUT: float = 30.0
+    use_sessions: bool = ADB_SHELL_SESSIONS
+
+    @staticmethod
+    def build_command(command: List[str], serial: Optional[str] = None) -> List[str]:
+        """Préfixe la commande avec `-s <serial>` si un périphérique est ciblé."""
+        return ["-s", serial] + command if serial else list(command)
+
+    @staticmethod
+    async def execute(command: List[str], handle_errors: bool = True,
+                      timeout: Optional[float] = None, serial: Optional[str] = None,
+                      session: bool = False) -> str:
+        """
+        Exécute une commande ADB sans bloquer la boucle d'événements.
+
+        Même contrat que AdbCommandExecutor.execute : retourne la sortie standard
+        nettoyée, ou "Erreur : ..." si handle_errors est vrai, sinon lève RuntimeError.
+        Le processus adb est tué si le délai expire ou si la tâche est annulée.
+
+        session=True exécute une commande `shell` dans la session persistante du
+        périphérique : à réserver aux commandes courtes, en lecture seule et
+        construites par l'application (jamais à partir d'une saisie utilisateur).
+        """
+        timeout = AsyncAdbCommandExecutor.DEFAULT_TIMEOUT if timeout is None else timeout
+        if session and AsyncAdbCommandExecutor.use_sessions and len(command) > 1 and command[0] == "shell":
+            return await AsyncAdbCommandExecutor._execute_in_session(command, handle_errors, timeout, serial)
+
+        if AdbCommandExecutor.backend == "socket":
+            from adb.adb_host_client import AsyncAdbHostClient, AdbProtocolError, AdbUnsupportedCommand
+            try:
+                return await asyncio.wait_for(
+                    AsyncAdbHostClient.default().run(AsyncAdbCommandExecutor.build_command(command, serial)),
+                    timeout=timeout
+                )
+            except (AdbUnsupportedCommand, ConnectionRefusedError):
+                pass  # Repli sur le binaire adb (install, push, serveur arrêté...)
+            except asyncio.TimeoutError:
+                message = f"délai de {timeout}s dépassé pour adb {' '.join(command)}"
+                if handle_errors:
+                    return f"Erreur : {message}"
+                raise RuntimeError(f"Échec de la commande ADB : {message}")
+            except (AdbProtocolError, OSError) as e:
+                if handle_errors:
+                    return f"Erreur : {e}"
+                raise RuntimeError(f"Échec de la commande ADB : {e}")
+
+        process = await asyncio.create_subprocess_exec(
+            adb_path(), *AsyncAdbCommandExecutor.build_command(command, serial),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await AsyncAdbCommandExecutor._kill(process)
+            message = f"délai de {timeout}s dépassé pour adb {' '.join(command)}"
+            if handle_errors:
+                return f"Erreur : {message}"
+            raise RuntimeError(f"Échec de la commande ADB : {message}")
+        except asyncio.CancelledError:
+            await AsyncAdbCommandExecutor._kill(process)
+            raise
+
+        if process.returncode != 0:
+            error = stderr.decode('utf-8', errors='replace')
+            if handle_errors:
+                return f"Erreur : {error}"
+            raise RuntimeError(f"Échec de la commande ADB : {error}")
+        return stdout.decode('utf-8', errors='replace').strip()
+
+    @staticmethod
+    async def stream(command: List[str], serial: Optional[str] = None,
+                     chunk_size: int = 65536) -> AsyncIterator[bytes]:
+        """
+        Diffuse la sortie standard brute d'une commande ADB par blocs, sans la mettre en mémoire.
+
+        Lève RuntimeError si la commande échoue sans avoir rien produit. Le processus
+        adb (ou la connexion au serveur) est fermé dès que le consommateur s'arrête.
+        """
+        if AdbCommandExecutor.backend == "socket":
+            from adb.adb_host_client import AsyncAdbHostClient, AdbUnsupportedCommand, translate_command
+            try:
+                target, kind, request = translate_command(AsyncAdbCommandExecutor.build_command(command, serial))
+                if kind != "service":
+                    raise AdbUnsupportedCommand(request)
+                reader, writer = await AsyncAdbHostClient.default().open_service(request, target)
+            except (AdbUnsupportedCommand, ConnectionRefusedError):
+                pass  # Repli sur le binaire adb
+            else:
+                try:
+                    while True:
+                        chunk = await reader.read(chunk_size)
+                        if not chunk:
+                            return
+                        yield chunk
+                finally:
+                    await AsyncAdbHostClient._close(writer)
+
+        process = await asyncio.create_subprocess_exec(
+            adb_path(), *AsyncAdbCommandExecutor.build_command(command, serial),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        produced = False
+        try:
+            while True:
+                chunk = await process.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                produced = True
+                yield chunk
+            await process.wait()
+            if process.returncode != 0 and not produced:
+                error = (await process.stderr.read()).decode('utf-8', errors='replace')
+                raise RuntimeError(f"Échec de la commande ADB : {error}")
+        finally:
+            await AsyncAdbCommandExecutor._kill(process)
+            await process.communicate()  # Vide et ferme les tubes du processus tué
+
+    @staticmethod
+    async def _execute_in_session(command: List[str], handle_errors: bool,
+                                  timeout: float, serial: Optional[str]) -> str:
+        """Exécute `adb shell ...` dans la session persistante du périphérique."""
+        from adb.adb_shell_session import DeviceShellSession, ShellSessionError
+        try:
+            output, code = await DeviceShellSession.for_serial(serial).execute(" ".join(command[1:]), timeout=timeout)
+        except asyncio.TimeoutError:
+            message = f"délai de {timeout}s dépassé pour adb {' '.join(command)}"
+            if handle_errors:
+                return f"Erreur : {message}"
+            raise RuntimeError(f"Échec de la commande ADB : {message}")
+        except (ShellSessionError, OSError) as e:
+            if handle_errors:
+                return f"Erreur : {e}"
+            raise RuntimeError(f"Échec de la commande ADB : {e}")
+
+        if code != 0:
+            if handle_errors:
+                return f"Erreur : {output}"
+            raise RuntimeError(f"Échec de la commande ADB : {output}")
+        return output.strip()
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        """Termine un processus adb encore actif et récupère son code de sortie."""
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
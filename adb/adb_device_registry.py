@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+import logging
+
+from adb.adb_host_client import AdbProtocolError, AdbServiceRefused, AsyncAdbHostClient
+from adb.adb_services_server import AdbServer
+
+logger = logging.getLogger(__name__)
+
+
+def parse_device_list(payload: str) -> Dict[str, Dict[str, str]]:
+    """Analyse une trame de host:track-devices(-l) : `serial<TAB ou espaces>état [clé:valeur ...]`."""
+    devices = {}
+    for line in payload.splitlines():
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        serial, state = parts[0], parts[1]
+        details = dict(part.split(":", 1) for part in parts[2:] if ":" in part)
+        if "device" in details:
+            details["device_name"] = details.pop("device")  # "device" désigne le numéro de série
+        details["transport"] = "tcp" if ":" in serial else "usb"
+        devices[serial] = {"state": state, **details}
+    return devices
+
+
+class DeviceRegistry:
+    """
+    Registre en mémoire des périphériques ADB, alimenté par le flux host:track-devices.
+
+    Le serveur ADB pousse la liste complète à chaque changement : le registre la
+    compare à l'état précédent et publie des événements added / removed / state.
+    """
+
+    _instance: Optional["DeviceRegistry"] = None
+
+    def __init__(self, client: Optional[AsyncAdbHostClient] = None, retry_delay: float = 2.0):
+        self.client = client or AsyncAdbHostClient.default()
+        self.retry_delay = retry_delay
+        self.devices: Dict[str, Dict[str, Any]] = {}
+        self.ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    @classmethod
+    def instance(cls) -> "DeviceRegistry":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    # --- Cycle de vie ---
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._track_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.ready.clear()
+
+    async def _track_loop(self) -> None:
+        request = "host:track-devices-l"
+        while True:
+            try:
+                async for payload in self.client.track_devices(request):
+                    self._apply(parse_device_list(payload))
+            except asyncio.CancelledError:
+                raise
+            except AdbServiceRefused as e:
+                if request != "host:track-devices":
+                    # Serveur ADB ancien : la variante -l est refusée (FAIL)
+                    logger.info(f"host:track-devices-l refusé ({e}), suivi sans les détails des périphériques")
+                    request = "host:track-devices"
+                else:
+                    logger.warning(f"Suivi des périphériques ADB refusé : {e}")
+            except AdbProtocolError as e:
+                # Connexion coupée, serveur redémarré... : la variante -l est conservée
+                logger.warning(f"Suivi des périphériques ADB interrompu : {e}")
+            except ConnectionRefusedError:
+                logger.warning("Serveur ADB injoignable, tentative de démarrage")
+                await AdbServer.start_server_async()
+            except (OSError, ValueError) as e:
+                logger.warning(f"Suivi des périphériques ADB interrompu : {e}")
+            self.ready.clear()
+            await asyncio.sleep(self.retry_delay)
+
+    # --- État ---
+
+    def _apply(self, current: Dict[str, Dict[str, str]]) -> None:
+        now = datetime.now().isoformat()
+        events = []
+        for serial in list(self.devices):
+            if serial not in current:
+                previous = self.devices.pop(serial)
+                events.append({"type": "removed", "device": serial, "previous": previous["state"]})
+        for serial, details in current.items():
+            entry = self.devices.get(serial)
+            if entry is None:
+                self.devices[serial] = {"device": serial, "first_seen": now, "last_seen": now, **details}
+                events.append({"type": "added", "device": serial, "state": details["state"]})
+                continue
+            if entry["state"] != details["state"]:
+                events.append({"type": "state", "device": serial, "state": details["state"],
+                               "previous": entry["state"]})
+            entry.update(details, last_seen=now)
+        self.ready.set()
+        for event in events:
+            event["time"] = now
+            self._publish(event)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [dict(entry) for entry in self.devices.values()]
+
+    def get(self, serial: str) -> Optional[Dict[str, Any]]:
+        entry = self.devices.get(serial)
+        return dict(entry) if entry else None
+
+    def online_serials(self) -> List[str]:
+        return [serial for serial, entry in self.devices.items() if entry["state"] == "device"]
+
+    # --- Événements ---
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Enregistre un rappel synchrone appelé pour chaque événement."""
+        self._listeners.append(listener)
+
+    def subscribe(self, max_events: int = 100) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_events)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        logger.info(f"Périphérique {event['device']} : {event['type']}")
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Erreur dans un écouteur du registre : {e}")
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()  # Abonné trop lent : on abandonne l'événement le plus ancien
+            queue.put_nowait(event)
@@ -0,0 +1,123 @@
+import asyncio
+import inspect
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import logging
+
+from adb.adb_apk_store import ApkStore
+from adb.adb_device_registry import DeviceRegistry
+from adb.adb_services_applications import AdbApplications
+from adb.adb_services_devices import AdbDevice
+from adb.adb_system import AdbSystem
+
+logger = logging.getLogger(__name__)
+
+
+def _collect_operations() -> Dict[str, Callable[..., Awaitable[Any]]]:
+    """Recense les méthodes *_async ciblant un périphérique (paramètre serial)."""
+    operations = {}
+    for prefix, service in (("system", AdbSystem), ("applications", AdbApplications), ("device", AdbDevice)):
+        for name in dir(service):
+            if not name.endswith("_async") or name.startswith("_"):
+                continue
+            method = getattr(service, name)
+            if "serial" in inspect.signature(method).parameters:
+                operations[f"{prefix}.{name[:-len('_async')]}"] = method
+    return operations
+
+
+class AdbFleet:
+    """Exécute une même opération ADB sur plusieurs périphériques en parallèle."""
+
+    OPERATIONS: Dict[str, Callable[..., Awaitable[Any]]] = _collect_operations()
+
+    @staticmethod
+    async def online_serials() -> List[str]:
+        """Numéros de série des périphériques connectés et autorisés."""
+        registry = DeviceRegistry.instance()
+        if registry.ready.is_set():
+            return registry.online_serials()
+        devices = await AdbDevice.list_devices_async()
+        return [device["device"] for device in devices if device["state"] == "device"]
+
+    @staticmethod
+    async def _run_one(serial: str, operation: Callable[..., Awaitable[Any]], args: Dict[str, Any],
+                       semaphore: asyncio.Semaphore, timeout: float) -> Dict[str, Any]:
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(operation(**args, serial=serial), timeout=timeout)
+                if isinstance(result, str) and result.startswith("Erreur"):
+                    outcome = {"statut": "Erreur", "message": result}
+                else:
+                    outcome = {"statut": "Succès", "resultat": result}
+            except asyncio.TimeoutError:
+                outcome = {"statut": "Erreur", "message": f"Délai de {timeout}s dépassé"}
+            except Exception as e:
+                logger.error(f"Erreur sur le périphérique {serial} : {e}")
+                outcome = {"statut": "Erreur", "message": str(e)}
+            outcome.update({"serial": serial, "duree_ms": round((time.monotonic() - start) * 1000)})
+            return outcome
+
+    @staticmethod
+    async def run(operation: str, serials: Optional[List[str]] = None, args: Optional[Dict[str, Any]] = None,
+                  concurrency: int = 8, timeout: float = 30.0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Lance l'opération sur chaque périphérique et produit les résultats au fil de l'eau.
+
+        Sans liste de numéros de série, cible tous les périphériques en ligne.
+        Les tâches restantes sont annulées si le consommateur s'arrête.
+        """
+        if operation not in AdbFleet.OPERATIONS:
+            raise ValueError(f"Opération inconnue : {operation}")
+        async for result in AdbFleet._fan_out(AdbFleet.OPERATIONS[operation], serials, args or {}, concurrency, timeout):
+            yield result
+
+    @staticmethod
+    async def _fan_out(method: Callable[..., Awaitable[Any]], serials: Optional[List[str]], args: Dict[str, Any],
+                       concurrency: int, timeout: float) -> AsyncIterator[Dict[str, Any]]:
+        if concurrency < 1:
+            raise ValueError("La concurrence doit être au moins égale à 1")
+        # Une liste vide explicite ne cible aucun périphérique
+        if serials is None:
+            serials = await AdbFleet.online_serials()
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = [
+            asyncio.ensure_future(AdbFleet._run_one(serial, method, args, semaphore, timeout))
+            for serial in dict.fromkeys(serials)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _install_if_needed(paths: List[str], package: str, version_code: Optional[int],
+                                 force: bool = False, serial: Optional[str] = None) -> Any:
+        if not force and version_code is not None:
+            versions = await AdbApplications.installed_versions_async(serial)
+            if isinstance(versions, str):
+                return versions
+            if versions.get(package) == version_code:
+                return {"action": "ignoré", "package": package, "version_code": version_code}
+        result = await AdbApplications.install_apks_async(paths, serial)
+        if result.startswith("Erreur"):
+            return result
+        return {"action": "installé", "package": package, "version_code": version_code, "sortie": result}
+
+    @staticmethod
+    async def install(sha256s: List[str], serials: Optional[List[str]] = None, force: bool = False,
+                      concurrency: int = 4, timeout: float = 900.0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Installe un APK du dépôt (et ses splits) sur plusieurs périphériques en parallèle.
+
+        Les périphériques qui ont déjà ce versionCode sont ignorés, sauf si force est vrai.
+        """
+        bundle = ApkStore.instance().resolve_bundle(sha256s)
+        args = {"paths": bundle["paths"], "package": bundle["package"],
+                "version_code": bundle["version_code"], "force": force}
+        async for result in AdbFleet._fan_out(AdbFleet._install_if_needed, serials, args, concurrency, timeout):
+            yield result
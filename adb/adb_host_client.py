@@ -0,0 +1,543 @@
+import asyncio
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADB_SERVER_HOST = os.getenv("ADB_SERVER_HOST", "127.0.0.1")
+ADB_SERVER_PORT = int(os.getenv("ADB_SERVER_PORT", "5037"))
+
+SYNC_DATA_MAX = 64 * 1024
+
+# Identifiants des paquets du protocole shell v2 (ID sur 1 octet, longueur sur 4 octets, données)
+SHELL_STDOUT = 1
+SHELL_STDERR = 2
+SHELL_EXIT = 3
+# Marqueur du code de sortie pour les périphériques sans shell v2
+STATUS_MARKER = "__XRSTATUS_"
+
+
+class AdbProtocolError(RuntimeError):
+    """Réponse FAIL ou trame invalide renvoyée par le serveur ADB."""
+
+
+class AdbServiceRefused(AdbProtocolError):
+    """Le serveur ADB a répondu FAIL à la requête (service inconnu, périphérique absent...)."""
+
+
+class AdbUnsupportedCommand(Exception):
+    """Commande sans équivalent dans le protocole hôte (install, push, ...)."""
+
+
+def encode_request(payload: str) -> bytes:
+    """Encode une requête hôte : longueur sur 4 caractères hexadécimaux puis la charge utile."""
+    data = payload.encode("utf-8")
+    return f"{len(data):04x}".encode("ascii") + data
+
+
+def translate_command(command: List[str]) -> Tuple[Optional[str], str, str]:
+    """
+    Traduit des arguments de la ligne de commande adb en requête du protocole hôte.
+
+    Retourne (serial, type, requête) où type vaut "host" pour une requête traitée
+    par le serveur ou "service" pour un service ouvert sur le périphérique.
+    Lève AdbUnsupportedCommand si la commande doit passer par le binaire adb.
+    """
+    serial = None
+    if len(command) >= 2 and command[0] == "-s":
+        serial, command = command[1], command[2:]
+    if not command:
+        raise AdbUnsupportedCommand("commande vide")
+
+    verb, args = command[0], command[1:]
+    if verb == "devices" and not args:
+        return serial, "host", "host:devices"
+    if verb == "version":
+        return serial, "host", "host:version"
+    if verb == "connect" and args:
+        return serial, "host", f"host:connect:{args[0]}"
+    if verb == "disconnect":
+        return serial, "host", f"host:disconnect:{args[0] if args else ''}"
+    if verb == "get-state":
+        return serial, "host", f"host-serial:{serial}:get-state" if serial else "host:get-state"
+    if verb == "shell" and args:
+        return serial, "service", "shell:" + " ".join(args)
+    if verb == "exec-out" and args:
+        return serial, "service", "exec:" + " ".join(args)
+    if verb == "reboot":
+        return serial, "service", "reboot:" + (args[0] if args else "")
+    if verb == "remount":
+        return serial, "service", "remount:"
+    if verb == "tcpip" and args:
+        return serial, "service", f"tcpip:{args[0]}"
+    if verb == "usb":
+        return serial, "service", "usb:"
+    raise AdbUnsupportedCommand(verb)
+
+
+def parse_shell_v2(data: bytes) -> Tuple[bytes, bytes, int]:
+    """Découpe la sortie d'un service shell,v2 en (stdout, stderr, code de sortie)."""
+    stdout, stderr, code, offset = [], [], 0, 0
+    while offset + 5 <= len(data):
+        packet_id, length = data[offset], struct.unpack("<I", data[offset + 1:offset + 5])[0]
+        payload = data[offset + 5:offset + 5 + length]
+        offset += 5 + length
+        if packet_id == SHELL_STDOUT:
+            stdout.append(payload)
+        elif packet_id == SHELL_STDERR:
+            stderr.append(payload)
+        elif packet_id == SHELL_EXIT and payload:
+            code = payload[0]
+    return b"".join(stdout), b"".join(stderr), code
+
+
+def legacy_shell_request(command: str) -> str:
+    """Service shell: sans shell v2 : le code de sortie est ajouté en fin de sortie."""
+    return f"shell:{command} ; echo {STATUS_MARKER}$?"
+
+
+def parse_legacy_shell(data: bytes) -> Tuple[bytes, bytes, int]:
+    output, marker, status = data.rpartition(STATUS_MARKER.encode())
+    if not marker:
+        return data, b"", 0
+    try:
+        return output, b"", int(status.strip() or 0)
+    except ValueError:
+        return data, b"", 0
+
+
+def shell_result(stdout: bytes, stderr: bytes, code: int) -> str:
+    """Même contrat que le binaire adb : la sortie standard, ou une erreur si la commande a échoué."""
+    if code != 0:
+        error = (stderr or stdout).decode("utf-8", errors="replace").strip()
+        raise AdbProtocolError(error or f"code de sortie {code}")
+    return stdout.decode("utf-8", errors="replace").strip()
+
+
+def features_request(serial: Optional[str]) -> str:
+    return f"host-serial:{serial}:features" if serial else "host:features"
+
+
+def format_host_reply(request: str, reply: str) -> str:
+    """Met en forme la réponse d'une requête hôte comme le ferait le binaire adb."""
+    if request == "host:devices":
+        return ("List of devices attached\n" + reply).strip()
+    if request == "host:version":
+        return f"Android Debug Bridge version 1.0.{int(reply, 16)}"
+    return reply.strip()
+
+
+class AdbHostClient:
+    """
+    Client du protocole « smart socket » du serveur ADB (port 5037).
+
+    Le serveur ferme la connexion après chaque service : une socket ne sert qu'une
+    fois. Le pool conserve donc des sockets ouvertes à l'avance, et chaque prise
+    d'une socket relance en arrière-plan son remplissage : l'établissement de la
+    connexion ne pèse plus sur la requête suivante.
+    """
+
+    _default: Optional["AdbHostClient"] = None
+
+    def __init__(self, host: str = ADB_SERVER_HOST, port: int = ADB_SERVER_PORT,
+                 pool_size: int = 4, timeout: float = 10.0, max_idle: float = 30.0):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._pool: Deque[Tuple[socket.socket, float]] = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._shell_v2: Dict[Optional[str], bool] = {}
+
+    @classmethod
+    def default(cls) -> "AdbHostClient":
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    # --- Gestion des connexions ---
+
+    def _connect(self) -> socket.socket:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _healthy(self, sock: socket.socket) -> bool:
+        """Une socket en attente ne doit rien avoir reçu : sinon le serveur l'a fermée (redémarrage...)."""
+        try:
+            sock.setblocking(False)
+            return sock.recv(1, socket.MSG_PEEK) != b""
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        finally:
+            sock.settimeout(self.timeout)
+
+    def _acquire(self) -> socket.socket:
+        now = time.monotonic()
+        sock = None
+        with self._lock:
+            while self._pool and sock is None:
+                candidate, created = self._pool.pop()
+                if now - created < self.max_idle and self._healthy(candidate):
+                    sock = candidate
+                else:
+                    candidate.close()
+            refill = self.pool_size > 0 and not self._refilling
+            self._refilling = self._refilling or refill
+        if refill:
+            threading.Thread(target=self._refill, daemon=True).start()
+        return sock or self._connect()
+
+    def _refill(self) -> None:
+        try:
+            self.warm_up()
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def warm_up(self) -> None:
+        """Complète le pool avec des connexions ouvertes à l'avance."""
+        while True:
+            with self._lock:
+                if len(self._pool) >= self.pool_size:
+                    return
+            try:
+                sock = self._connect()
+            except OSError:
+                return
+            with self._lock:
+                self._pool.append((sock, time.monotonic()))
+
+    def close(self) -> None:
+        with self._lock:
+            while self._pool:
+                self._pool.pop()[0].close()
+
+    # --- Primitives du protocole ---
+
+    @staticmethod
+    def _read_exact(sock: socket.socket, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = sock.recv(size)
+            if not chunk:
+                raise AdbProtocolError("Connexion fermée par le serveur ADB")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    @classmethod
+    def _read_string(cls, sock: socket.socket) -> str:
+        length = int(cls._read_exact(sock, 4), 16)
+        return cls._read_exact(sock, length).decode("utf-8", errors="replace")
+
+    @classmethod
+    def _read_status(cls, sock: socket.socket) -> None:
+        status = cls._read_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbServiceRefused(cls._read_string(sock))
+        raise AdbProtocolError(f"Réponse inattendue du serveur ADB : {status!r}")
+
+    @staticmethod
+    def _read_all(sock: socket.socket) -> bytes:
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def _request(self, sock: socket.socket, payload: str) -> None:
+        sock.sendall(encode_request(payload))
+        self._read_status(sock)
+
+    # --- Requêtes ---
+
+    def host_query(self, request: str) -> str:
+        """Envoie une requête host:* et retourne la chaîne préfixée par sa longueur renvoyée par le serveur."""
+        sock = self._acquire()
+        try:
+            self._request(sock, request)
+            return self._read_string(sock)
+        finally:
+            sock.close()
+
+    def open_service(self, service: str, serial: Optional[str] = None) -> socket.socket:
+        """Bascule la connexion sur le transport du périphérique puis ouvre le service."""
+        sock = self._acquire()
+        try:
+            self._request(sock, f"host:transport:{serial}" if serial else "host:transport-any")
+            self._request(sock, service)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def service(self, service: str, serial: Optional[str] = None) -> bytes:
+        sock = self.open_service(service, serial)
+        try:
+            return self._read_all(sock)
+        finally:
+            sock.close()
+
+    def supports_shell_v2(self, serial: Optional[str] = None) -> bool:
+        """Le périphérique annonce-t-il shell_v2 (sorties séparées et code de sortie) ? Mis en cache."""
+        supported = self._shell_v2.get(serial)
+        if supported is None:
+            supported = self._shell_v2[serial] = "shell_v2" in self.host_query(features_request(serial)).split(",")
+        return supported
+
+    def shell(self, command: str, serial: Optional[str] = None) -> str:
+        """Sortie standard de la commande ; lève AdbProtocolError si son code de sortie n'est pas nul."""
+        if self.supports_shell_v2(serial):
+            return shell_result(*parse_shell_v2(self.service(f"shell,v2,raw:{command}", serial)))
+        return shell_result(*parse_legacy_shell(self.service(legacy_shell_request(command), serial)))
+
+    def exec_out(self, command: str, serial: Optional[str] = None) -> bytes:
+        return self.service(f"exec:{command}", serial)
+
+    def stat(self, path: str, serial: Optional[str] = None) -> Dict[str, int]:
+        """Retourne mode, taille et date de modification d'un fichier via le service sync:."""
+        sock = self.open_service("sync:", serial)
+        try:
+            encoded = path.encode("utf-8")
+            sock.sendall(b"STAT" + struct.pack("<I", len(encoded)) + encoded)
+            header = self._read_exact(sock, 16)
+            if header[:4] != b"STAT":
+                raise AdbProtocolError(f"Réponse sync inattendue : {header[:4]!r}")
+            mode, size, mtime = struct.unpack("<III", header[4:])
+            return {"mode": mode, "size": size, "mtime": mtime}
+        finally:
+            sock.close()
+
+    def pull(self, path: str, serial: Optional[str] = None) -> Iterator[bytes]:
+        """Lit un fichier du périphérique par blocs via le service sync: (RECV)."""
+        sock = self.open_service("sync:", serial)
+        try:
+            encoded = path.encode("utf-8")
+            sock.sendall(b"RECV" + struct.pack("<I", len(encoded)) + encoded)
+            while True:
+                header = self._read_exact(sock, 8)
+                tag, length = header[:4], struct.unpack("<I", header[4:])[0]
+                if tag == b"DATA":
+                    yield self._read_exact(sock, length)
+                elif tag == b"DONE":
+                    return
+                elif tag == b"FAIL":
+                    raise AdbProtocolError(self._read_exact(sock, length).decode("utf-8", errors="replace"))
+                else:
+                    raise AdbProtocolError(f"Réponse sync inattendue : {tag!r}")
+        finally:
+            sock.close()
+
+    def run(self, command: List[str]) -> str:
+        """Exécute des arguments adb (ex. ["-s", serial, "shell", "getprop"]) via le protocole."""
+        serial, kind, request = translate_command(command)
+        if kind == "host":
+            return format_host_reply(request, self.host_query(request))
+        if request.startswith("shell:"):
+            return self.shell(request[len("shell:"):], serial)
+        return self.service(request, serial).decode("utf-8", errors="replace").strip()
+
+
+class AsyncAdbHostClient:
+    """Variante asyncio d'AdbHostClient, avec le même pool de connexions ouvertes à l'avance."""
+
+    _default: Optional["AsyncAdbHostClient"] = None
+
+    def __init__(self, host: str = ADB_SERVER_HOST, port: int = ADB_SERVER_PORT,
+                 pool_size: int = 4, max_idle: float = 30.0):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.max_idle = max_idle
+        self._pool: Deque[Tuple[asyncio.StreamReader, asyncio.StreamWriter, float]] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._shell_v2: Dict[Optional[str], bool] = {}
+
+    @classmethod
+    def default(cls) -> "AsyncAdbHostClient":
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def _acquire(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        now = time.monotonic()
+        connection = None
+        while self._pool and connection is None:
+            reader, writer, created = self._pool.pop()
+            # Une socket fermée par le serveur (redémarrage...) a reçu EOF
+            if now - created < self.max_idle and not reader.at_eof() and not writer.is_closing():
+                connection = reader, writer
+            else:
+                writer.close()
+        if self.pool_size > 0 and (self._refill_task is None or self._refill_task.done()):
+            self._refill_task = asyncio.ensure_future(self.warm_up())
+        return connection or await self._connect()
+
+    async def warm_up(self) -> None:
+        """Complète le pool avec des connexions ouvertes à l'avance."""
+        while len(self._pool) < self.pool_size:
+            try:
+                reader, writer = await self._connect()
+            except OSError:
+                return
+            self._pool.append((reader, writer, time.monotonic()))
+
+    def close(self) -> None:
+        while self._pool:
+            self._pool.pop()[1].close()
+
+    @staticmethod
+    async def _read_exact(reader: asyncio.StreamReader, size: int) -> bytes:
+        try:
+            return await reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            raise AdbProtocolError("Connexion fermée par le serveur ADB")
+
+    @classmethod
+    async def _read_string(cls, reader: asyncio.StreamReader) -> str:
+        length = int(await cls._read_exact(reader, 4), 16)
+        return (await cls._read_exact(reader, length)).decode("utf-8", errors="replace")
+
+    @classmethod
+    async def _read_status(cls, reader: asyncio.StreamReader) -> None:
+        status = await cls._read_exact(reader, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbServiceRefused(await cls._read_string(reader))
+        raise AdbProtocolError(f"Réponse inattendue du serveur ADB : {status!r}")
+
+    async def _request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, payload: str) -> None:
+        writer.write(encode_request(payload))
+        await writer.drain()
+        await self._read_status(reader)
+
+    @staticmethod
+    async def _close(writer: asyncio.StreamWriter) -> None:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    async def host_query(self, request: str) -> str:
+        reader, writer = await self._acquire()
+        try:
+            await self._request(reader, writer, request)
+            return await self._read_string(reader)
+        finally:
+            await self._close(writer)
+
+    async def open_service(self, service: str, serial: Optional[str] = None
+                           ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await self._acquire()
+        try:
+            await self._request(reader, writer, f"host:transport:{serial}" if serial else "host:transport-any")
+            await self._request(reader, writer, service)
+        except BaseException:
+            await self._close(writer)
+            raise
+        return reader, writer
+
+    async def service(self, service: str, serial: Optional[str] = None) -> bytes:
+        reader, writer = await self.open_service(service, serial)
+        try:
+            return await reader.read()
+        finally:
+            await self._close(writer)
+
+    async def stream(self, service: str, serial: Optional[str] = None,
+                     chunk_size: int = 65536) -> AsyncIterator[bytes]:
+        """Diffuse la sortie d'un service par blocs, sans la mettre en mémoire."""
+        reader, writer = await self.open_service(service, serial)
+        try:
+            while True:
+                chunk = await reader.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            await self._close(writer)
+
+    async def push(self, path: str, chunks: AsyncIterator[bytes], serial: Optional[str] = None,
+                   mode: int = 0o644, mtime: Optional[int] = None,
+                   progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Écrit un flux d'octets dans un fichier du périphérique via le service sync: (SEND/DATA/DONE).
+
+        Chaque bloc DATA (64 Kio au plus) attend que le socket se vide avant de lire
+        la suite du flux : un périphérique lent ralentit donc l'émetteur. Retourne le
+        nombre d'octets envoyés ; progress reçoit le total après chaque bloc.
+        """
+        reader, writer = await self.open_service("sync:", serial)
+        sent = 0
+        try:
+            header = f"{path},{mode}".encode("utf-8")
+            writer.write(b"SEND" + struct.pack("<I", len(header)) + header)
+            async for chunk in chunks:
+                for offset in range(0, len(chunk), SYNC_DATA_MAX):
+                    block = chunk[offset:offset + SYNC_DATA_MAX]
+                    writer.write(b"DATA" + struct.pack("<I", len(block)) + block)
+                    await writer.drain()
+                    sent += len(block)
+                    if progress:
+                        progress(sent)
+            writer.write(b"DONE" + struct.pack("<I", int(time.time() if mtime is None else mtime)))
+            await writer.drain()
+            reply = await self._read_exact(reader, 8)
+            tag, length = reply[:4], struct.unpack("<I", reply[4:])[0]
+            if tag == b"FAIL":
+                raise AdbProtocolError((await self._read_exact(reader, length)).decode("utf-8", errors="replace"))
+            if tag != b"OKAY":
+                raise AdbProtocolError(f"Réponse sync inattendue : {tag!r}")
+            return sent
+        finally:
+            await self._close(writer)
+
+    async def track_devices(self, request: str = "host:track-devices-l") -> AsyncIterator[str]:
+        """Produit chaque liste de périphériques poussée par le serveur ADB à chaque changement."""
+        reader, writer = await self._connect()
+        try:
+            await self._request(reader, writer, request)
+            while True:
+                yield await self._read_string(reader)
+        finally:
+            await self._close(writer)
+
+    async def supports_shell_v2(self, serial: Optional[str] = None) -> bool:
+        supported = self._shell_v2.get(serial)
+        if supported is None:
+            features = await self.host_query(features_request(serial))
+            supported = self._shell_v2[serial] = "shell_v2" in features.split(",")
+        return supported
+
+    async def shell(self, command: str, serial: Optional[str] = None) -> str:
+        """Sortie standard de la commande ; lève AdbProtocolError si son code de sortie n'est pas nul."""
+        if await self.supports_shell_v2(serial):
+            return shell_result(*parse_shell_v2(await self.service(f"shell,v2,raw:{command}", serial)))
+        return shell_result(*parse_legacy_shell(await self.service(legacy_shell_request(command), serial)))
+
+    async def run(self, command: List[str]) -> str:
+        serial, kind, request = translate_command(command)
+        if kind == "host":
+            return format_host_reply(request, await self.host_query(request))
+        if request.startswith("shell:"):
+            return await self.shell(request[len("shell:"):], serial)
+        return (await self.service(request, serial)).decode("utf-8", errors="replace").strip()
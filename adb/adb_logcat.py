@@ -0,0 +1,286 @@
+import asyncio
+import os
+import re
+import struct
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import logging
+
+from adb.adb_command_executor import AsyncAdbCommandExecutor
+
+logger = logging.getLogger(__name__)
+
+LOGCAT_RING_SIZE = int(os.getenv("LOGCAT_RING_SIZE", "5000"))
+
+# En-tête commun des entrées binaires (struct logger_entry) : longueur de la charge utile,
+# taille de l'en-tête (0 pour la v1, qui en fait 20), pid, tid, secondes, nanosecondes
+ENTRY_PREFIX = struct.Struct("<HHiIII")
+ENTRY_V1_HEADER_SIZE = 20
+
+PRIORITIES = {2: "V", 3: "D", 4: "I", 5: "W", 6: "E", 7: "F", 8: "S"}
+PRIORITY_LEVELS = {letter: level for level, letter in PRIORITIES.items()}
+
+
+class LogEntry(NamedTuple):
+    timestamp: float
+    pid: int
+    tid: int
+    priority: int
+    tag: str
+    message: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"timestamp": self.timestamp, "pid": self.pid, "tid": self.tid,
+                "priority": PRIORITIES.get(self.priority, "?"), "tag": self.tag, "message": self.message}
+
+
+def parse_entries(buffer: bytes) -> Tuple[List[LogEntry], bytes]:
+    """
+    Découpe la sortie de `logcat -B` en entrées ; retourne aussi les octets d'une entrée incomplète.
+
+    Seules les entrées texte (priorité, tag, message terminés par NUL) sont conservées :
+    les entrées binaires du tampon events sont ignorées.
+    """
+    entries = []
+    offset = 0
+    while len(buffer) - offset >= ENTRY_PREFIX.size:
+        length, header_size, pid, tid, seconds, nanoseconds = ENTRY_PREFIX.unpack_from(buffer, offset)
+        header_size = header_size or ENTRY_V1_HEADER_SIZE
+        end = offset + header_size + length
+        if end > len(buffer):
+            break
+        payload = buffer[offset + header_size:end]
+        offset = end
+        if len(payload) < 3:
+            continue
+        tag_end = payload.find(b"\0", 1)
+        if tag_end < 0:
+            continue
+        message = payload[tag_end + 1:].rstrip(b"\0\n")
+        entries.append(LogEntry(seconds + nanoseconds / 1e9, pid, tid, payload[0],
+                                payload[1:tag_end].decode("utf-8", "replace"),
+                                message.decode("utf-8", "replace")))
+    return entries, buffer[offset:]
+
+
+class LogcatFilter:
+    """Filtre côté serveur : tags, priorité minimale, pid et expression régulière sur le message."""
+
+    def __init__(self, tags: Optional[Iterable[str]] = None, priority: str = "V", pid: Optional[int] = None,
+                 pattern: Optional[str] = None):
+        if priority.upper() not in PRIORITY_LEVELS:
+            raise ValueError(f"Priorité inconnue : {priority}. Utilisez : {', '.join(PRIORITY_LEVELS)}")
+        self.tags: Optional[Set[str]] = set(tags) if tags else None
+        self.min_priority = PRIORITY_LEVELS[priority.upper()]
+        self.pid = pid
+        try:
+            self.pattern = re.compile(pattern) if pattern else None
+        except re.error as e:
+            raise ValueError(f"Expression régulière invalide : {e}")
+
+    def matches(self, entry: LogEntry) -> bool:
+        return (entry.priority >= self.min_priority
+                and (self.tags is None or entry.tag in self.tags)
+                and (self.pid is None or entry.pid == self.pid)
+                and (self.pattern is None or self.pattern.search(entry.message) is not None))
+
+
+class _Tail:
+    """File d'attente bornée d'un abonné ; les entrées en excès sont abandonnées et comptées."""
+
+    def __init__(self, log_filter: LogcatFilter, max_entries: int):
+        self.filter = log_filter
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_entries)
+        self.dropped = 0
+
+
+_CLOSED = object()
+
+
+class LogcatReader:
+    """
+    Lecture continue du journal d'un périphérique (`logcat -B`), partagée entre ses abonnés.
+
+    Les entrées sont décodées une seule fois et conservées dans un tampon circulaire
+    borné ; chaque abonné reçoit uniquement celles qui passent son filtre. Le processus
+    logcat est relancé s'il s'interrompt (redémarrage du casque) et arrêté idle_timeout
+    secondes après le départ du dernier abonné.
+    """
+
+    _readers: Dict[Optional[str], "LogcatReader"] = {}
+
+    def __init__(self, serial: Optional[str] = None, ring_size: int = LOGCAT_RING_SIZE,
+                 idle_timeout: float = 300.0, retry_delay: float = 2.0):
+        self.serial = serial
+        self.ring: Deque[LogEntry] = deque(maxlen=ring_size)
+        self.idle_timeout = idle_timeout
+        self.retry_delay = retry_delay
+        self.received = 0
+        self.error: Optional[str] = None
+        self._tails: Set[_Tail] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+        self._loaded = asyncio.Event()
+
+    @classmethod
+    def for_device(cls, serial: Optional[str] = None) -> "LogcatReader":
+        reader = cls._readers.get(serial)
+        if reader is None:
+            reader = cls._readers[serial] = cls(serial)
+        return reader
+
+    @classmethod
+    def running(cls) -> List["LogcatReader"]:
+        return [reader for reader in cls._readers.values() if reader.active]
+
+    @classmethod
+    async def close_all(cls) -> None:
+        for reader in list(cls._readers.values()):
+            await reader.stop()
+        cls._readers.clear()
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # --- Cycle de vie ---
+
+    def start(self) -> None:
+        self._cancel_idle()
+        # Un lecteur retiré par un arrêt antérieur reprend sa place
+        LogcatReader._readers.setdefault(self.serial, self)
+        if not self.active:
+            self.error = None
+            self._task = asyncio.ensure_future(self._run())
+            logger.info(f"Lecture de logcat démarrée pour {self.serial or 'le périphérique par défaut'}")
+        if not self._tails:
+            self._schedule_idle_stop()
+
+    async def stop(self) -> None:
+        self._cancel_idle()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info(f"Lecture de logcat arrêtée pour {self.serial or 'le périphérique par défaut'}")
+        for tail in list(self._tails):
+            self._close_tail(tail)
+        # Les lecteurs arrêtés ne sont pas conservés (numéros de série inconnus ou disparus)
+        if LogcatReader._readers.get(self.serial) is self:
+            del LogcatReader._readers[self.serial]
+
+    def _schedule_idle_stop(self) -> None:
+        self._cancel_idle()
+        self._idle_handle = asyncio.get_running_loop().call_later(
+            self.idle_timeout, lambda: asyncio.ensure_future(self._stop_if_idle())
+        )
+
+    def _cancel_idle(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    async def _stop_if_idle(self) -> None:
+        if not self._tails:
+            await self.stop()
+
+    # --- Lecture ---
+
+    async def _read(self, command: List[str], after: Optional[float] = None) -> None:
+        rest = b""
+        async with aclosing(AsyncAdbCommandExecutor.stream(command, serial=self.serial)) as stream:
+            async for chunk in stream:
+                entries, rest = parse_entries(rest + chunk)
+                for entry in entries:
+                    if after is None or entry.timestamp > after:
+                        self._publish(entry)
+                self._loaded.set()
+
+    async def _run(self) -> None:
+        while True:
+            if self.ring:
+                # Reprise : uniquement les entrées postérieures à la dernière reçue (-T accepte l'heure epoch)
+                after = self.ring[-1].timestamp
+                command = ["exec-out", "logcat", "-B", "-T", f"{after:.3f}"]
+            else:
+                # Premier lancement : l'historique du périphérique remplit le tampon
+                after = None
+                command = ["exec-out", "logcat", "-B", "-T", str(self.ring.maxlen)]
+            try:
+                await self._read(command, after)
+                self.error = None
+            except RuntimeError as e:
+                self.error = str(e)
+                self._loaded.set()
+                logger.warning(f"logcat interrompu pour {self.serial or 'le périphérique par défaut'} : {e}")
+            await asyncio.sleep(self.retry_delay)
+
+    def _publish(self, entry: LogEntry) -> None:
+        self.ring.append(entry)
+        self.received += 1
+        for tail in self._tails:
+            if tail.filter.matches(entry):
+                self._offer(tail, entry)
+
+    @staticmethod
+    def _offer(tail: _Tail, entry: LogEntry) -> None:
+        if tail.queue.full():
+            tail.queue.get_nowait()  # Les entrées les plus anciennes sont sacrifiées
+            tail.dropped += 1
+        tail.queue.put_nowait(entry)
+
+    def _close_tail(self, tail: _Tail) -> None:
+        while not tail.queue.empty():
+            tail.queue.get_nowait()
+        tail.queue.put_nowait(_CLOSED)
+
+    # --- Consultation ---
+
+    async def wait_loaded(self, timeout: float = 2.0) -> None:
+        """Attend (au plus timeout secondes) que l'historique du périphérique commence à arriver."""
+        try:
+            await asyncio.wait_for(self._loaded.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def recent(self, log_filter: LogcatFilter, limit: int = 200) -> List[LogEntry]:
+        """Dernières entrées du tampon qui passent le filtre, de la plus ancienne à la plus récente."""
+        matched: Deque[LogEntry] = deque(maxlen=limit)
+        for entry in self.ring:
+            if log_filter.matches(entry):
+                matched.append(entry)
+        return list(matched)
+
+    async def tail(self, log_filter: LogcatFilter, history: int = 0, max_entries: int = 1000,
+                   heartbeat: Optional[float] = None) -> AsyncIterator[Optional[LogEntry]]:
+        """
+        Produit les history dernières entrées correspondantes, puis les nouvelles au fil de l'eau.
+
+        Avec heartbeat, None est produit après heartbeat secondes sans entrée (maintien de
+        la connexion). Le désabonnement est automatique à la sortie de la boucle.
+        """
+        tail = _Tail(log_filter, max_entries)
+        for entry in self.recent(log_filter, history) if history else ():
+            self._offer(tail, entry)
+        self._tails.add(tail)
+        self.start()
+        try:
+            while True:
+                try:
+                    entry = await asyncio.wait_for(tail.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if entry is _CLOSED:
+                    return
+                yield entry
+        finally:
+            self._tails.discard(tail)
+            if not self._tails and self.active:
+                self._schedule_idle_stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"serial": self.serial, "active": self.active, "subscribers": len(self._tails),
+                "buffered": len(self.ring), "received": self.received,
+                "dropped": sum(tail.dropped for tail in self._tails), "error": self.error}
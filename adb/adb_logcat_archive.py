@@ -0,0 +1,304 @@
+import asyncio
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+from contextlib import aclosing
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+import logging
+
+from adb.adb_logcat import LogcatFilter, LogcatReader, LogEntry
+
+logger = logging.getLogger(__name__)
+
+LOGCAT_ARCHIVE_DIR = os.getenv(
+    "LOGCAT_ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "logcat_archive")
+)
+LOGCAT_ARCHIVE_RETENTION_DAYS = float(os.getenv("LOGCAT_ARCHIVE_RETENTION_DAYS", "7"))
+# Archivage automatique des périphériques dès leur connexion
+LOGCAT_ARCHIVE_AUTO = os.getenv("LOGCAT_ARCHIVE_AUTO", "0") == "1"
+
+BLOCKS_FILE = "blocks.z"
+INDEX_FILE = "index.jsonl"
+PARTITION_FORMAT = "%Y%m%d%H"  # Une partition par heure (UTC)
+
+
+def device_directory(serial: str) -> str:
+    """Nom de répertoire sûr et réversible pour un numéro de série (les séries TCP contiennent « : »)."""
+    if not serial:
+        raise ValueError("Numéro de série vide")
+    name = quote(serial, safe="")
+    # quote laisse les points intacts : « . » et « .. » désigneraient l'archive ou son parent
+    return name.replace(".", "%2E") if name in (".", "..") else name
+
+
+def partition_name(timestamp: float) -> str:
+    return time.strftime(PARTITION_FORMAT, time.gmtime(timestamp))
+
+
+class ArchiveWriter:
+    """
+    Ajout des entrées d'un périphérique dans des blocs compressés, partitionnés par heure.
+
+    Chaque partition contient blocks.z (blocs zlib de lignes JSON mis bout à bout) et
+    index.jsonl : une ligne par bloc avec sa position, ses bornes temporelles, la liste
+    de ses tags et sa priorité maximale. Une requête ne décompresse que les blocs dont
+    l'index correspond.
+    """
+
+    def __init__(self, serial: str, directory: str = LOGCAT_ARCHIVE_DIR, block_entries: int = 1000,
+                 block_seconds: float = 30.0):
+        self.serial = serial
+        self.directory = os.path.join(directory, device_directory(serial))
+        self.block_entries = block_entries
+        self.block_seconds = block_seconds
+        self.last_timestamp, self._last_entries = self._last_archived()
+        self._pending: List[LogEntry] = []
+        self._opened = time.monotonic()
+
+    def _last_archived(self) -> Tuple[float, Set[LogEntry]]:
+        """
+        Horodatage de la dernière entrée archivée et entrées de cet instant, pour ne pas
+        réécrire l'historique rejoué par logcat.
+        """
+        if not os.path.isdir(self.directory):
+            return 0.0, set()
+        for partition in sorted(os.listdir(self.directory), reverse=True):
+            path = os.path.join(self.directory, partition)
+            blocks = read_index(path)
+            if not blocks:
+                continue
+            last = max(block["end"] for block in blocks)
+            entries: Set[LogEntry] = set()
+            with open(os.path.join(path, BLOCKS_FILE), "rb") as f:
+                for block in blocks:
+                    if block["end"] == last:
+                        entries.update(entry for entry in read_block(f, block) if entry.timestamp == last)
+            return last, entries
+        return 0.0, set()
+
+    def append(self, entry: LogEntry) -> bool:
+        """
+        Ajoute une entrée au bloc en cours ; retourne True si le bloc doit être écrit.
+
+        Logcat émet souvent plusieurs lignes à la même milliseconde : seules les entrées
+        antérieures à la dernière archivée, ou identiques à une entrée déjà archivée au
+        même instant, sont écartées.
+        """
+        if entry.timestamp < self.last_timestamp:
+            return False
+        if entry.timestamp == self.last_timestamp:
+            if entry in self._last_entries:
+                return False
+            self._last_entries.add(entry)
+        else:
+            self.last_timestamp = entry.timestamp
+            self._last_entries = {entry}
+        if self._pending and partition_name(entry.timestamp) != partition_name(self._pending[0].timestamp):
+            self.flush()  # Changement d'heure : le bloc ne doit pas chevaucher deux partitions
+        if not self._pending:
+            self._opened = time.monotonic()
+        self._pending.append(entry)
+        return self.due()
+
+    def due(self) -> bool:
+        return bool(self._pending) and (len(self._pending) >= self.block_entries
+                                        or time.monotonic() - self._opened >= self.block_seconds)
+
+    def take(self) -> List[LogEntry]:
+        entries, self._pending = self._pending, []
+        return entries
+
+    def flush(self) -> None:
+        self.write_block(self.take())
+
+    def write_block(self, entries: List[LogEntry]) -> None:
+        """Compresse et ajoute un bloc (appelé hors de la boucle d'événements)."""
+        if not entries:
+            return
+        partition = os.path.join(self.directory, partition_name(entries[0].timestamp))
+        os.makedirs(partition, exist_ok=True)
+        payload = zlib.compress("\n".join(json.dumps(entry, ensure_ascii=False) for entry in entries).encode(), 6)
+        with open(os.path.join(partition, BLOCKS_FILE), "ab") as f:
+            offset = f.tell()
+            f.write(payload)
+        block = {
+            "offset": offset, "length": len(payload), "count": len(entries),
+            "start": entries[0].timestamp, "end": entries[-1].timestamp,
+            "max_priority": max(entry.priority for entry in entries),
+            "tags": sorted({entry.tag for entry in entries}),
+        }
+        # L'index n'est écrit qu'après le bloc : une ligne d'index désigne toujours des octets présents
+        with open(os.path.join(partition, INDEX_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(block, ensure_ascii=False) + "\n")
+
+
+def read_block(f: BinaryIO, block: Dict[str, Any]) -> List[LogEntry]:
+    """Décompresse un bloc de blocks.z désigné par sa ligne d'index."""
+    f.seek(block["offset"])
+    return [LogEntry(*json.loads(line)) for line in zlib.decompress(f.read(block["length"])).decode().split("\n")]
+
+
+_index_cache: Dict[str, Tuple[float, int, List[Dict[str, Any]]]] = {}
+_index_lock = threading.Lock()
+
+
+def read_index(partition: str) -> List[Dict[str, Any]]:
+    """Index d'une partition, relu uniquement si le fichier a changé."""
+    path = os.path.join(partition, INDEX_FILE)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return []
+    with _index_lock:
+        cached = _index_cache.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime, stat.st_size):
+            return cached[2]
+    blocks = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                blocks.append(json.loads(line))
+            except json.JSONDecodeError:
+                break  # Ligne tronquée par un arrêt brutal
+    with _index_lock:
+        _index_cache[path] = (stat.st_mtime, stat.st_size, blocks)
+    return blocks
+
+
+def query_archive(serials: Iterable[str], start: float, end: float, log_filter: LogcatFilter,
+                  limit: int = 1000, directory: str = LOGCAT_ARCHIVE_DIR) -> List[Dict[str, Any]]:
+    """
+    Entrées archivées entre start et end (epoch) qui passent le filtre, triées par date.
+
+    Les partitions hors de l'intervalle ne sont pas ouvertes et, dans une partition,
+    seuls les blocs dont l'index recoupe l'intervalle, les tags et la priorité sont lus.
+    """
+    first, last = partition_name(start), partition_name(end)
+    results = []
+    for serial in serials:
+        root = os.path.join(directory, device_directory(serial))
+        if not os.path.isdir(root):
+            continue
+        # Les blocs d'un périphérique sont écrits dans l'ordre chronologique : inutile d'aller au-delà de limit
+        device_results: List[Dict[str, Any]] = []
+        for partition in sorted(name for name in os.listdir(root) if first <= name <= last):
+            if len(device_results) >= limit:
+                break
+            path = os.path.join(root, partition)
+            blocks = [
+                block for block in read_index(path)
+                if block["end"] >= start and block["start"] <= end
+                and block["max_priority"] >= log_filter.min_priority
+                and (log_filter.tags is None or not log_filter.tags.isdisjoint(block["tags"]))
+            ]
+            if not blocks:
+                continue
+            with open(os.path.join(path, BLOCKS_FILE), "rb") as f:
+                for block in blocks:
+                    if len(device_results) >= limit:
+                        break
+                    for entry in read_block(f, block):
+                        if start <= entry.timestamp <= end and log_filter.matches(entry):
+                            device_results.append({"serial": serial, **entry.to_dict()})
+        results.extend(device_results[:limit])
+    results.sort(key=lambda entry: entry["timestamp"])
+    return results[:limit]
+
+
+def prune_archive(retention_days: float = LOGCAT_ARCHIVE_RETENTION_DAYS,
+                  directory: str = LOGCAT_ARCHIVE_DIR) -> int:
+    """Supprime les partitions plus anciennes que la durée de rétention ; retourne leur nombre."""
+    if not os.path.isdir(directory):
+        return 0
+    oldest = partition_name(time.time() - retention_days * 86400)
+    removed = 0
+    for serial in os.listdir(directory):
+        root = os.path.join(directory, serial)
+        for partition in os.listdir(root) if os.path.isdir(root) else ():
+            if partition < oldest:
+                shutil.rmtree(os.path.join(root, partition), ignore_errors=True)
+                removed += 1
+    return removed
+
+
+class LogcatArchive:
+    """
+    Archivage sur disque des journaux des périphériques, alimenté par leur LogcatReader.
+
+    L'archive est un abonné comme les autres : la lecture logcat d'un périphérique reste
+    unique, qu'elle serve des spectateurs, l'archive ou les deux.
+    """
+
+    _instance: Optional["LogcatArchive"] = None
+
+    def __init__(self, directory: str = LOGCAT_ARCHIVE_DIR):
+        self.directory = directory
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._pruned = 0.0
+
+    @classmethod
+    def instance(cls) -> "LogcatArchive":
+        if cls._instance is None:
+            from adb.adb_device_registry import DeviceRegistry
+            cls._instance = cls()
+            if LOGCAT_ARCHIVE_AUTO:
+                DeviceRegistry.instance().add_listener(cls._instance.on_device_event)
+        return cls._instance
+
+    def on_device_event(self, event: Dict[str, Any]) -> None:
+        if event.get("state") == "device":
+            self.start(event["device"])
+
+    def archived_serials(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(unquote(name) for name in os.listdir(self.directory))
+
+    def active(self) -> List[str]:
+        return [serial for serial, task in self._tasks.items() if not task.done()]
+
+    def start(self, serial: str) -> None:
+        task = self._tasks.get(serial)
+        if task is None or task.done():
+            self._tasks[serial] = asyncio.ensure_future(self._archive(serial))
+            logger.info(f"Archivage de logcat démarré pour {serial}")
+
+    async def stop(self, serial: str) -> None:
+        task = self._tasks.pop(serial, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            logger.info(f"Archivage de logcat arrêté pour {serial}")
+
+    async def stop_all(self) -> None:
+        for serial in list(self._tasks):
+            await self.stop(serial)
+
+    async def _write(self, writer: ArchiveWriter) -> None:
+        await asyncio.to_thread(writer.write_block, writer.take())
+        if time.time() - self._pruned > 3600:
+            self._pruned = time.time()
+            await asyncio.to_thread(prune_archive, LOGCAT_ARCHIVE_RETENTION_DAYS, self.directory)
+
+    async def _archive(self, serial: str) -> None:
+        writer = ArchiveWriter(serial, self.directory)
+        reader = LogcatReader.for_device(serial)
+        try:
+            async with aclosing(reader.tail(LogcatFilter(), history=len(reader.ring), max_entries=20000,
+                                            heartbeat=writer.block_seconds)) as entries:
+                async for entry in entries:
+                    if (entry is not None and writer.append(entry)) or (entry is None and writer.due()):
+                        await self._write(writer)
+        finally:
+            # Dernier bloc, y compris à l'annulation : écrit de manière synchrone
+            writer.flush()
+
+    async def query(self, serials: Optional[List[str]], start: float, end: float, log_filter: LogcatFilter,
+                    limit: int = 1000) -> List[Dict[str, Any]]:
+        serials = serials or self.archived_serials()
+        return await asyncio.to_thread(query_archive, serials, start, end, log_filter, limit, self.directory)
+
@@ -0,0 +1,170 @@
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+GETPROP_PATTERN = re.compile(r"^\[(.*?)\]: \[(.*)\]$")
+
+
+def parse_getprop(output: str) -> Dict[str, str]:
+    """Analyse la sortie de `getprop` (`[clé]: [valeur]`), y compris les valeurs contenant ':'."""
+    properties = {}
+    for line in output.splitlines():
+        match = GETPROP_PATTERN.match(line.strip())
+        if match:
+            properties[match.group(1)] = match.group(2)
+    return properties
+
+
+def is_error(output: str) -> bool:
+    return output.startswith("Erreur")
+
+
+class DevicePropertyCache:
+    """
+    Cache à durée de vie des données statiques d'un périphérique (getprop, cpuinfo).
+
+    Les entrées d'un périphérique sont invalidées lorsqu'il redémarre, se
+    déconnecte ou change d'état dans le registre des périphériques.
+    """
+
+    _instance: Optional["DevicePropertyCache"] = None
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[Optional[str], str], Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple[Optional[str], str], asyncio.Future] = {}
+
+    @classmethod
+    def instance(cls) -> "DevicePropertyCache":
+        if cls._instance is None:
+            from adb.adb_device_registry import DeviceRegistry
+            cls._instance = cls()
+            DeviceRegistry.instance().add_listener(cls._instance.on_device_event)
+        return cls._instance
+
+    def get(self, serial: Optional[str], key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get((serial, key))
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[(serial, key)]
+            self.misses += 1
+            return None
+
+    def set(self, serial: Optional[str], key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[(serial, key)] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def get_or_load(self, serial: Optional[str], key: str, loader: Callable[[], str],
+                    parser: Callable[[str], Any] = lambda output: output) -> Any:
+        """Retourne la valeur en cache ou la charge ; les sorties en erreur ne sont pas conservées."""
+        value = self.get(serial, key)
+        if value is not None:
+            return value
+        output = loader()
+        if is_error(output):
+            return parser(output)
+        value = parser(output)
+        self.set(serial, key, value)
+        return value
+
+    async def get_or_load_async(self, serial: Optional[str], key: str, loader: Callable[[], Awaitable[str]],
+                                parser: Callable[[str], Any] = lambda output: output,
+                                ttl: Optional[float] = None) -> Any:
+        """
+        Variante asynchrone : les appels simultanés pour une même clé partagent un seul chargement.
+
+        Le chargement s'exécute dans sa propre tâche : l'annulation d'un appelant ne
+        l'interrompt pas pour les autres, et un chargement en échec est retiré pour
+        pouvoir être relancé.
+        """
+        value = self.get(serial, key)
+        if value is not None:
+            return value
+        task = self._loading.get((serial, key))
+        if task is None:
+            task = asyncio.ensure_future(self._load(serial, key, loader, parser, ttl))
+            self._loading[(serial, key)] = task
+            task.add_done_callback(lambda done: self._loaded((serial, key), done))
+        return await asyncio.shield(task)
+
+    async def _load(self, serial: Optional[str], key: str, loader: Callable[[], Awaitable[str]],
+                    parser: Callable[[str], Any], ttl: Optional[float]) -> Any:
+        output = await loader()
+        value = parser(output)
+        if not is_error(output):
+            self.set(serial, key, value, ttl)
+        return value
+
+    def _loaded(self, cache_key: Tuple[Optional[str], str], task: asyncio.Future) -> None:
+        if self._loading.get(cache_key) is task:
+            del self._loading[cache_key]
+        if not task.cancelled():
+            task.exception()  # Évite l'avertissement si personne n'attendait ce chargement
+
+    def discard(self, serial: Optional[str], key: str) -> None:
+        """Supprime une seule entrée (par exemple après une installation)."""
+        with self._lock:
+            self._entries.pop((serial, key), None)
+
+    def invalidate(self, serial: Optional[str] = None) -> None:
+        """Supprime les entrées d'un périphérique, ou tout le cache sans numéro de série."""
+        with self._lock:
+            if serial is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] in (serial, None)]:
+                    del self._entries[key]
+        logger.debug(f"Cache des propriétés invalidé pour {serial or 'tous les périphériques'}")
+
+    def on_device_event(self, event: Dict[str, Any]) -> None:
+        if event["type"] in ("removed", "state"):
+            self.invalidate(event["device"])
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "ttl": self.ttl
+        }
+
+
+def _parse_properties_output(output: str) -> Any:
+    """Conserve le message d'erreur ADB tel quel, sinon analyse la sortie de getprop."""
+    return output if is_error(output) else parse_getprop(output)
+
+
+def cached_properties(serial: Optional[str] = None) -> Any:
+    """Propriétés getprop du périphérique (dict), ou le message d'erreur ADB."""
+    from adb.adb_command_executor import AdbCommandExecutor
+    command = ["-s", serial, "shell", "getprop"] if serial else ["shell", "getprop"]
+    return DevicePropertyCache.instance().get_or_load(
+        serial, "getprop", lambda: AdbCommandExecutor.execute(command), _parse_properties_output
+    )
+
+
+async def cached_properties_async(serial: Optional[str] = None) -> Any:
+    """Variante asynchrone de cached_properties."""
+    from adb.adb_command_executor import AsyncAdbCommandExecutor
+    return await DevicePropertyCache.instance().get_or_load_async(
+        serial, "getprop", lambda: AsyncAdbCommandExecutor.execute(["shell", "getprop"], serial=serial),
+        _parse_properties_output
+    )
+
+
+def property_value(properties: Any, key: str) -> str:
+    """Extrait une propriété, ou renvoie le message d'erreur si la lecture a échoué."""
+    return properties if isinstance(properties, str) else properties.get(key, "")
@@ -0,0 +1,107 @@
+import asyncio
+import re
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional, Tuple
+import logging
+
+from adb.adb_command_executor import AsyncAdbCommandExecutor
+
+logger = logging.getLogger(__name__)
+
+# screenrecord s'arrête de lui-même au bout de 3 minutes sur la plupart des versions d'Android
+SCREENRECORD_TIME_LIMIT = 180
+
+NAL_START_CODE = b"\x00\x00\x01"
+ANNEX_B_PREFIX = b"\x00\x00\x00\x01"
+
+# Dimensions acceptées pour screenrecord --size (ex. 1280x720)
+SIZE_PATTERN = re.compile(r"\d+x\d+")
+
+NAL_IDR = 5
+NAL_SPS = 7
+NAL_PPS = 8
+
+
+def split_nal_units(buffer: bytes) -> Tuple[List[bytes], bytes]:
+    """
+    Découpe un flux H.264 Annex-B en unités NAL complètes.
+
+    Retourne les unités (préfixées par 00 00 00 01) et le reste non terminé, à
+    compléter avec les données suivantes : une unité n'est complète qu'une fois
+    le code de démarrage suivant reçu.
+    """
+    starts = []
+    position = buffer.find(NAL_START_CODE)
+    while position != -1:
+        starts.append(position)
+        position = buffer.find(NAL_START_CODE, position + 3)
+    if len(starts) < 2:
+        return [], buffer[starts[0]:] if starts else buffer
+    units = []
+    for begin, end in zip(starts, starts[1:]):
+        # Les zéros finaux appartiennent au code de démarrage sur 4 octets suivant
+        payload = buffer[begin + 3:end].rstrip(b"\x00")
+        if payload:
+            units.append(ANNEX_B_PREFIX + payload)
+    return units, buffer[starts[-1]:]
+
+
+def check_stream_options(size: Optional[str], bit_rate: int) -> None:
+    """Valide les options de screenrecord, transmises telles quelles au shell du périphérique."""
+    if size is not None and not SIZE_PATTERN.fullmatch(size):
+        raise ValueError(f"Taille invalide : {size!r} (format attendu : LARGEURxHAUTEUR)")
+    if isinstance(bit_rate, bool) or not isinstance(bit_rate, int) or bit_rate <= 0:
+        raise ValueError(f"Débit invalide : {bit_rate!r} (entier positif attendu)")
+
+
+def nal_type(unit: bytes) -> int:
+    """Type d'une unité NAL préfixée par un code de démarrage sur 4 octets."""
+    return unit[4] & 0x1F
+
+
+class H264ScreenStream:
+    """
+    Flux H.264 de l'écran d'un périphérique produit par un seul processus `screenrecord`.
+
+    Le processus écrit le flux brut sur sa sortie standard (`--output-format=h264 -`) ;
+    il est relancé automatiquement lorsqu'il atteint sa limite de durée.
+    """
+
+    def __init__(self, serial: Optional[str] = None, size: Optional[str] = None,
+                 bit_rate: int = 4_000_000, max_failures: int = 3):
+        check_stream_options(size, bit_rate)
+        self.serial = serial
+        self.size = size
+        self.bit_rate = bit_rate
+        self.max_failures = max_failures
+
+    def command(self) -> List[str]:
+        command = ["exec-out", "screenrecord", "--output-format=h264",
+                   f"--time-limit={SCREENRECORD_TIME_LIMIT}", f"--bit-rate={self.bit_rate}"]
+        if self.size:
+            command.append(f"--size={self.size}")
+        return command + ["-"]
+
+    async def units(self) -> AsyncIterator[bytes]:
+        """Produit les unités NAL au fil de l'eau, en enchaînant les sessions screenrecord."""
+        failures = 0
+        while True:
+            buffer = b""
+            produced = False
+            try:
+                async with aclosing(AsyncAdbCommandExecutor.stream(self.command(), serial=self.serial)) as chunks:
+                    async for chunk in chunks:
+                        units, buffer = split_nal_units(buffer + chunk)
+                        for unit in units:
+                            produced = True
+                            yield unit
+            except RuntimeError as e:
+                logger.warning(f"screenrecord interrompu sur {self.serial or 'le périphérique par défaut'} : {e}")
+            if produced:
+                failures = 0
+                logger.info(f"Redémarrage de screenrecord sur {self.serial or 'le périphérique par défaut'}")
+                continue
+            failures += 1
+            if failures >= self.max_failures:
+                raise RuntimeError("screenrecord ne produit aucune image (codec indisponible ou écran verrouillé ?)")
+            await asyncio.sleep(1.0)
@@ -0,0 +1,302 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+import logging
+
+from adb.adb_command_executor import AsyncAdbCommandExecutor
+from adb.adb_screen import H264ScreenStream, NAL_IDR, NAL_PPS, NAL_SPS, nal_type
+from adb.adb_screen_pacing import AdaptiveRate, FrameChangeDetector
+from adb.adb_system import AdbSystem
+
+logger = logging.getLogger(__name__)
+
+
+class Frame(NamedTuple):
+    seq: int
+    timestamp: float
+    data: bytes
+    keyframe: bool = True
+
+
+class _Subscriber:
+    """File d'attente bornée d'un spectateur ; les images en retard sont abandonnées."""
+
+    def __init__(self, max_frames: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_frames)
+        self.waiting_keyframe = False
+        self.dropped = 0
+
+
+_CLOSED = object()
+
+
+class ScreenBroadcaster:
+    """
+    Capture unique de l'écran d'un périphérique, partagée entre tous ses spectateurs.
+
+    La capture démarre au premier abonné et s'arrête peu après le départ du dernier.
+    Mode "png" : captures `screencap -p` successives, la dernière est conservée ;
+    les captures inchangées ne sont pas diffusées et la cadence s'adapte au
+    mouvement, au rythme des spectateurs et à l'état thermique du périphérique.
+    Mode "h264" : unités NAL de screenrecord, le GOP courant (SPS/PPS + images
+    depuis la dernière IDR) est conservé pour qu'un nouveau spectateur puisse décoder
+    immédiatement. Un spectateur trop lent perd des images ; en H.264 il reprend
+    à l'image clé suivante pour ne pas corrompre le décodage.
+    """
+
+    _broadcasters: Dict[Tuple[Optional[str], str], "ScreenBroadcaster"] = {}
+
+    THERMAL_POLL_INTERVAL = 30.0
+
+    def __init__(self, serial: Optional[str] = None, mode: str = "png", interval: float = 0.5,
+                 idle_timeout: float = 5.0, size: Optional[str] = None, bit_rate: int = 4_000_000,
+                 max_gop_frames: int = 300, min_interval: float = 0.1, max_interval: float = 2.0,
+                 motion_threshold: float = 2.0):
+        if mode not in ("png", "h264"):
+            raise ValueError(f"Mode de capture inconnu : {mode}")
+        self.serial = serial
+        self.mode = mode
+        self.rate = AdaptiveRate(interval, min_interval, max_interval)
+        self.detector = FrameChangeDetector(motion_threshold)
+        self.skipped = 0
+        self.idle_timeout = idle_timeout
+        self.size = size
+        self.bit_rate = bit_rate
+        self.latest: Optional[Frame] = None
+        self.error: Optional[str] = None
+        self._ring: Deque[Frame] = deque(maxlen=max_gop_frames if mode == "h264" else 1)
+        self._config: Dict[int, Frame] = {}
+        self._subscribers: Set[_Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+        self._seq = itertools.count(1)
+
+    @classmethod
+    def for_device(cls, serial: Optional[str] = None, mode: str = "png", **options) -> "ScreenBroadcaster":
+        """Retourne le diffuseur du périphérique ; les options ne servent qu'à sa création."""
+        broadcaster = cls._broadcasters.get((serial, mode))
+        if broadcaster is None:
+            broadcaster = cls._broadcasters[(serial, mode)] = cls(serial, mode, **options)
+        return broadcaster
+
+    @classmethod
+    def running(cls) -> List["ScreenBroadcaster"]:
+        return [broadcaster for broadcaster in cls._broadcasters.values() if broadcaster.active]
+
+    @classmethod
+    async def close_all(cls) -> None:
+        for broadcaster in list(cls._broadcasters.values()):
+            await broadcaster.stop()
+        cls._broadcasters.clear()
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def viewers(self) -> int:
+        return len(self._subscribers)
+
+    # --- Cycle de vie ---
+
+    def start(self) -> None:
+        self._cancel_idle()
+        if not self.active:
+            self.error = None
+            self._task = asyncio.ensure_future(self._run())
+            logger.info(f"Capture {self.mode} démarrée pour {self.serial or 'le périphérique par défaut'}")
+        if not self._subscribers:
+            # Démarrage explicite sans spectateur : arrêt si personne ne s'abonne
+            self._schedule_idle_stop()
+
+    async def stop(self) -> None:
+        self._cancel_idle()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info(f"Capture {self.mode} arrêtée pour {self.serial or 'le périphérique par défaut'}")
+        for subscriber in list(self._subscribers):
+            self._close_subscriber(subscriber)
+
+    def _schedule_idle_stop(self) -> None:
+        self._cancel_idle()
+        self._idle_handle = asyncio.get_running_loop().call_later(
+            self.idle_timeout, lambda: asyncio.ensure_future(self._stop_if_idle())
+        )
+
+    def _cancel_idle(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    async def _stop_if_idle(self) -> None:
+        if not self._subscribers:
+            await self.stop()
+
+    # --- Capture ---
+
+    async def _run(self) -> None:
+        try:
+            if self.mode == "h264":
+                await self._capture_h264()
+            else:
+                await self._capture_png()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Capture {self.mode} interrompue pour {self.serial or 'le périphérique par défaut'} : {e}")
+            for subscriber in list(self._subscribers):
+                self._close_subscriber(subscriber)
+
+    async def _capture_png(self) -> None:
+        failures = 0
+        thermal_checked = 0.0
+        self.detector.reset()
+        while True:
+            started = time.monotonic()
+            if started - thermal_checked > self.THERMAL_POLL_INTERVAL:
+                thermal_checked = started
+                self.rate.set_thermal(await AdbSystem.thermal_info_async(self.serial))
+            chunks = []
+            try:
+                async with aclosing(AsyncAdbCommandExecutor.stream(["exec-out", "screencap", "-p"],
+                                                                   serial=self.serial)) as stream:
+                    async for chunk in stream:
+                        chunks.append(chunk)
+            except RuntimeError as e:
+                failures += 1
+                if failures >= 3:
+                    raise
+                logger.warning(f"Échec de screencap : {e}")
+            # Retard général : aucun spectateur n'a encore lu l'image précédente
+            backlog = bool(self._subscribers) and all(not s.queue.empty() for s in self._subscribers)
+            data = b"".join(chunks)
+            changed = False
+            if data:
+                failures = 0
+                if self.detector.uses_tiles:
+                    changed = await asyncio.to_thread(self.detector.changed, data)
+                else:
+                    changed = self.detector.changed(data)
+                if changed:
+                    self._publish(Frame(next(self._seq), time.time(), data))
+                else:
+                    self.skipped += 1
+            interval = self.rate.update(changed, backlog)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def _capture_h264(self) -> None:
+        async with aclosing(H264ScreenStream(self.serial, self.size, self.bit_rate).units()) as units:
+            async for unit in units:
+                keyframe = nal_type(unit) in (NAL_SPS, NAL_PPS, NAL_IDR)
+                self._publish(Frame(next(self._seq), time.time(), unit, keyframe=keyframe))
+
+    # --- Diffusion ---
+
+    def _replay(self) -> List[Frame]:
+        """Images à envoyer d'abord à un nouveau spectateur pour qu'il puisse afficher/décoder."""
+        return [self._config[kind] for kind in (NAL_SPS, NAL_PPS) if kind in self._config] + list(self._ring)
+
+    def _publish(self, frame: Frame) -> None:
+        if self.mode == "h264":
+            kind = nal_type(frame.data)
+            if kind in (NAL_SPS, NAL_PPS):
+                # Paramètres du flux (renvoyés à chaque redémarrage de screenrecord)
+                self._config[kind] = frame
+                for subscriber in self._subscribers:
+                    if subscriber.queue.full():
+                        self._drain(subscriber)
+                        subscriber.waiting_keyframe = True
+                    elif not subscriber.waiting_keyframe:
+                        subscriber.queue.put_nowait(frame)
+                return
+            if kind == NAL_IDR:
+                self._ring.clear()  # Nouveau GOP
+        self._ring.append(frame)
+        self.latest = frame
+        for subscriber in self._subscribers:
+            self._offer(subscriber, frame)
+
+    def _offer(self, subscriber: _Subscriber, frame: Frame) -> None:
+        if self.mode == "png":
+            if subscriber.queue.full():
+                subscriber.queue.get_nowait()  # Seule la dernière image compte
+                subscriber.dropped += 1
+            subscriber.queue.put_nowait(frame)
+            return
+        if subscriber.waiting_keyframe:
+            if nal_type(frame.data) != NAL_IDR:
+                subscriber.dropped += 1
+                return
+            subscriber.waiting_keyframe = False
+            for config in self._replay()[:-1]:
+                if subscriber.queue.full():
+                    break
+                subscriber.queue.put_nowait(config)
+        if subscriber.queue.full():
+            # Retard trop important : on vide la file et on attend la prochaine image clé
+            self._drain(subscriber)
+            subscriber.waiting_keyframe = nal_type(frame.data) != NAL_IDR
+            if subscriber.waiting_keyframe:
+                return
+            for config in self._replay()[:-1]:
+                subscriber.queue.put_nowait(config)
+        subscriber.queue.put_nowait(frame)
+
+    @staticmethod
+    def _drain(subscriber: _Subscriber) -> None:
+        subscriber.dropped += subscriber.queue.qsize()
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+
+    def _close_subscriber(self, subscriber: _Subscriber) -> None:
+        self._drain(subscriber)
+        subscriber.queue.put_nowait(_CLOSED)
+
+    async def frames(self, max_frames: Optional[int] = None) -> AsyncIterator[Frame]:
+        """
+        Abonne l'appelant et produit les images au fil de la capture.
+
+        Le désabonnement est automatique à la sortie de la boucle ; lève RuntimeError
+        si la capture s'arrête sur une erreur.
+        """
+        if max_frames is None:
+            max_frames = 2 if self.mode == "png" else 120
+        replay = self._replay()
+        subscriber = _Subscriber(max(max_frames, len(replay) + 1))
+        if self.mode == "h264" and self._ring and nal_type(self._ring[0].data) != NAL_IDR:
+            subscriber.waiting_keyframe = True  # GOP trop long pour le tampon : attendre la prochaine IDR
+        else:
+            for frame in replay:
+                subscriber.queue.put_nowait(frame)
+        self._subscribers.add(subscriber)
+        self.start()
+        try:
+            while True:
+                frame = await subscriber.queue.get()
+                if frame is _CLOSED:
+                    if self.error:
+                        raise RuntimeError(self.error)
+                    return
+                yield frame
+        finally:
+            self._subscribers.discard(subscriber)
+            if not self._subscribers and self.active:
+                self._schedule_idle_stop()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "serial": self.serial, "mode": self.mode, "active": self.active, "viewers": self.viewers,
+            "last_seq": self.latest.seq if self.latest else None,
+            "last_frame": self.latest.timestamp if self.latest else None,
+            "dropped": sum(subscriber.dropped for subscriber in self._subscribers),
+            "skipped": self.skipped,
+            "interval": round(self.rate.interval, 3) if self.mode == "png" else None,
+            "thermal_status": self.rate.thermal_status,
+            "error": self.error
+        }
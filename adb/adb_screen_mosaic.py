@@ -0,0 +1,94 @@
+import asyncio
+import math
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import logging
+
+from adb.adb_screen_broadcaster import ScreenBroadcaster
+from adb.adb_screen_transcoder import CV2_DISPONIBLE, ScreenTranscoder
+
+if CV2_DISPONIBLE:
+    import cv2
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ScreenMosaic:
+    """
+    Grille de vignettes de plusieurs périphériques diffusée comme une seule image.
+
+    Chaque vignette est alimentée par le diffuseur partagé de son périphérique et
+    se met à jour à son propre rythme ; la grille n'est réencodée que lorsqu'au
+    moins une vignette a changé, au plus fps fois par seconde.
+    """
+
+    def __init__(self, serials: List[str], tile_width: int = 320, tile_height: int = 180,
+                 columns: Optional[int] = None, fps: float = 2.0, quality: int = 60, retry_delay: float = 5.0):
+        if not CV2_DISPONIBLE:
+            raise RuntimeError("OpenCV (cv2) n'est pas installé sur le serveur")
+        if not serials:
+            raise ValueError("Aucun périphérique à afficher")
+        self.serials = list(dict.fromkeys(serials))
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.columns = columns or math.ceil(math.sqrt(len(self.serials)))
+        self.rows = math.ceil(len(self.serials) / self.columns)
+        self.fps = fps
+        self.quality = quality
+        self.retry_delay = retry_delay
+        self.canvas = np.zeros((self.rows * tile_height, self.columns * tile_width, 3), dtype=np.uint8)
+        self.updated: Dict[str, float] = {}
+        self._changed = asyncio.Event()
+
+    def _position(self, index: int) -> Tuple[int, int]:
+        row, column = divmod(index, self.columns)
+        return row * self.tile_height, column * self.tile_width
+
+    def _place(self, index: int, tile, label: str) -> None:
+        top, left = self._position(index)
+        cv2.putText(tile, label, (6, self.tile_height - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1,
+                    cv2.LINE_AA)
+        self.canvas[top:top + self.tile_height, left:left + self.tile_width] = tile
+        self._changed.set()
+
+    def _placeholder(self, index: int, serial: str, message: str) -> None:
+        tile = np.full((self.tile_height, self.tile_width, 3), 40, dtype=np.uint8)
+        cv2.putText(tile, message, (6, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 255), 1, cv2.LINE_AA)
+        self._place(index, tile, serial)
+
+    async def _feed(self, index: int, serial: str) -> None:
+        """Met à jour une vignette à partir du flux de son périphérique, en reprenant après une erreur."""
+        transcoder = ScreenTranscoder.instance()
+        self._placeholder(index, serial, "connexion...")
+        while True:
+            try:
+                async with aclosing(ScreenBroadcaster.for_device(serial).frames()) as frames:
+                    async for frame in frames:
+                        tile = await transcoder.run(transcoder.tile, frame.data, self.tile_width, self.tile_height)
+                        if tile is not None:
+                            self._place(index, tile, serial)
+                            self.updated[serial] = frame.timestamp
+            except RuntimeError as e:
+                logger.warning(f"Vignette {serial} indisponible : {e}")
+            self._placeholder(index, serial, "hors ligne")
+            await asyncio.sleep(self.retry_delay)
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """Produit la grille en JPEG à chaque changement, sans dépasser fps images par seconde."""
+        transcoder = ScreenTranscoder.instance()
+        feeds = [asyncio.ensure_future(self._feed(index, serial)) for index, serial in enumerate(self.serials)]
+        try:
+            while True:
+                await self._changed.wait()
+                started = time.monotonic()
+                self._changed.clear()
+                jpeg = await transcoder.run(transcoder.encode_jpeg, self.canvas.copy(), self.quality)
+                if jpeg is not None:
+                    yield jpeg
+                await asyncio.sleep(max(0.0, 1 / self.fps - (time.monotonic() - started)))
+        finally:
+            for feed in feeds:
+                feed.cancel()
+            await asyncio.gather(*feeds, return_exceptions=True)
@@ -0,0 +1,96 @@
+import hashlib
+from typing import Any, Dict, Optional
+import logging
+
+try:
+    import cv2
+    import numpy as np
+    CV2_DISPONIBLE = True
+except ImportError:
+    CV2_DISPONIBLE = False
+
+logger = logging.getLogger(__name__)
+
+# Intervalle minimal multiplié selon l'état thermique Android (0 aucun ... 6 arrêt imminent)
+THERMAL_FACTORS = {0: 1, 1: 1, 2: 2, 3: 4, 4: 8, 5: 8, 6: 8}
+
+
+class FrameChangeDetector:
+    """
+    Détecte les captures identiques, ou presque, à la dernière image diffusée.
+
+    Une empreinte des octets repère d'abord les captures strictement identiques
+    (scène figée). Avec OpenCV, l'image est ensuite réduite à une grille de tuiles
+    en niveaux de gris : elle n'est considérée comme modifiée que si une tuile
+    varie d'au moins threshold niveaux, ce qui ignore le bruit de compression.
+    """
+
+    def __init__(self, threshold: float = 2.0, grid: tuple = (16, 16)):
+        self.threshold = threshold
+        self.grid = grid
+        self._digest: Optional[bytes] = None
+        self._tiles: Optional[Any] = None
+
+    @property
+    def uses_tiles(self) -> bool:
+        return CV2_DISPONIBLE and self.threshold > 0
+
+    def changed(self, data: bytes) -> bool:
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest == self._digest:
+            return False
+        self._digest = digest
+        if not self.uses_tiles:
+            return True
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            return True
+        tiles = cv2.resize(image, self.grid, interpolation=cv2.INTER_AREA).astype(np.int16)
+        if self._tiles is None or self._tiles.shape != tiles.shape:
+            self._tiles = tiles
+            return True
+        if np.abs(tiles - self._tiles).max() < self.threshold:
+            # La référence n'est pas mise à jour : une dérive lente finit par être détectée
+            return False
+        self._tiles = tiles
+        return True
+
+    def reset(self) -> None:
+        self._digest = None
+        self._tiles = None
+
+
+class AdaptiveRate:
+    """
+    Intervalle entre deux captures, ajusté à l'activité de l'écran.
+
+    Il diminue tant que l'image change et que les spectateurs suivent, augmente
+    quand la scène est figée ou que tous les spectateurs ont du retard, et ne
+    descend pas sous un plancher relevé quand le périphérique chauffe.
+    """
+
+    def __init__(self, initial: float = 0.5, min_interval: float = 0.1, max_interval: float = 2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = initial
+        self.thermal_status = 0
+
+    @property
+    def floor(self) -> float:
+        return min(self.max_interval, self.min_interval * THERMAL_FACTORS.get(self.thermal_status, 8))
+
+    def update(self, changed: bool, backlog: bool) -> float:
+        if backlog:
+            self.interval *= 1.5
+        elif changed:
+            self.interval *= 0.5
+        else:
+            self.interval *= 1.25
+        self.interval = min(self.max_interval, max(self.floor, self.interval))
+        return self.interval
+
+    def set_thermal(self, thermal: Dict[str, str]) -> None:
+        status = thermal.get("Thermal Status", "")
+        if status.isdigit() and int(status) != self.thermal_status:
+            self.thermal_status = int(status)
+            logger.info(f"État thermique {self.thermal_status} : intervalle minimal de capture {self.floor:.2f}s")
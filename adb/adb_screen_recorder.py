@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+import re
+import uuid
+from contextlib import aclosing
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional
+import logging
+
+from adb.adb_screen import NAL_IDR, NAL_PPS, NAL_SPS, nal_type
+from adb.adb_screen_broadcaster import ScreenBroadcaster
+
+logger = logging.getLogger(__name__)
+
+RECORDINGS_DIR = os.getenv(
+    "RECORDINGS_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "recordings")
+)
+RECORDING_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ScreenRecorder:
+    """
+    Enregistrement côté serveur du flux H.264 partagé d'un périphérique.
+
+    L'enregistreur est un abonné comme les autres du ScreenBroadcaster : regarder et
+    enregistrer n'utilisent qu'un seul encodeur sur le casque. Le flux est découpé en
+    segments d'environ segment_seconds secondes, coupés sur une image IDR et précédés
+    des SPS/PPS pour être lisibles séparément ; index.json décrit chaque segment.
+    """
+
+    _active: Dict[str, "ScreenRecorder"] = {}
+
+    def __init__(self, serial: Optional[str] = None, segment_seconds: float = 10.0,
+                 directory: str = RECORDINGS_DIR):
+        self.id = uuid.uuid4().hex
+        self.serial = serial
+        self.segment_seconds = segment_seconds
+        self.directory = os.path.join(directory, self.id)
+        self.index: Dict[str, Any] = {
+            "id": self.id, "serial": serial, "format": "h264-annexb", "segment_seconds": segment_seconds,
+            "started": datetime.now().isoformat(), "stopped": None, "segments": []
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._file: Optional[BinaryIO] = None
+        self._segment: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def start(cls, serial: Optional[str] = None, segment_seconds: float = 10.0) -> "ScreenRecorder":
+        recorder = cls(serial, segment_seconds)
+        os.makedirs(recorder.directory, exist_ok=True)
+        recorder._save_index()
+        recorder._task = asyncio.ensure_future(recorder._run())
+        cls._active[recorder.id] = recorder
+        logger.info(f"Enregistrement {recorder.id} démarré pour {serial or 'le périphérique par défaut'}")
+        return recorder
+
+    @classmethod
+    def get(cls, recording_id: str) -> Optional["ScreenRecorder"]:
+        return cls._active.get(recording_id)
+
+    @classmethod
+    def active(cls) -> List["ScreenRecorder"]:
+        return list(cls._active.values())
+
+    @classmethod
+    async def stop_all(cls) -> None:
+        for recorder in list(cls._active.values()):
+            await recorder.stop()
+
+    async def stop(self) -> Dict[str, Any]:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        ScreenRecorder._active.pop(self.id, None)
+        return self.index
+
+    # --- Segments ---
+
+    def _save_index(self) -> None:
+        temporary = os.path.join(self.directory, "index.json.tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(temporary, os.path.join(self.directory, "index.json"))
+
+    def _open_segment(self, timestamp: float, config: List[bytes]) -> None:
+        self._close_segment(timestamp)
+        name = f"segment_{len(self.index['segments']) + 1:05d}.h264"
+        self._file = open(os.path.join(self.directory, name), "wb")
+        self._segment = {"file": name, "start": timestamp, "end": timestamp, "duration": 0.0,
+                         "bytes": 0, "units": 0}
+        for unit in config:
+            self._write(unit, timestamp)
+
+    def _write(self, unit: bytes, timestamp: float) -> None:
+        self._file.write(unit)
+        self._segment["bytes"] += len(unit)
+        self._segment["units"] += 1
+        self._segment["end"] = timestamp
+
+    def _close_segment(self, timestamp: Optional[float] = None) -> None:
+        """Finalise le segment en cours ; il se termine au début du suivant, ou à sa dernière unité."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        end = timestamp if timestamp is not None else self._segment["end"]
+        self._segment["duration"] = round(end - self._segment["start"], 3)
+        self.index["segments"].append(self._segment)
+        self._segment = None
+        self._save_index()
+
+    async def _run(self) -> None:
+        broadcaster = ScreenBroadcaster.for_device(self.serial, "h264")
+        config: Dict[int, bytes] = {}
+        try:
+            async with aclosing(broadcaster.frames(max_frames=2000)) as frames:
+                async for frame in frames:
+                    kind = nal_type(frame.data)
+                    if kind in (NAL_SPS, NAL_PPS):
+                        config[kind] = frame.data
+                        continue
+                    if kind == NAL_IDR and (
+                        self._segment is None or frame.timestamp - self._segment["start"] >= self.segment_seconds
+                    ):
+                        self._open_segment(frame.timestamp, [config[k] for k in sorted(config)])
+                    if self._segment is not None:
+                        self._write(frame.data, frame.timestamp)
+        except RuntimeError as e:
+            self.index["error"] = str(e)
+            logger.error(f"Enregistrement {self.id} interrompu : {e}")
+        finally:
+            self._close_segment()
+            self.index["stopped"] = datetime.now().isoformat()
+            self._save_index()
+            ScreenRecorder._active.pop(self.id, None)
+            logger.info(f"Enregistrement {self.id} terminé : {len(self.index['segments'])} segment(s)")
+
+    # --- Consultation ---
+
+    @staticmethod
+    def list_recordings(directory: str = RECORDINGS_DIR) -> List[Dict[str, Any]]:
+        recordings = []
+        if not os.path.isdir(directory):
+            return recordings
+        for name in sorted(os.listdir(directory)):
+            index = ScreenRecorder.load_index(name, directory)
+            if index is not None:
+                recordings.append({key: value for key, value in index.items() if key != "segments"}
+                                  | {"segments": len(index["segments"])})
+        return recordings
+
+    @staticmethod
+    def load_index(recording_id: str, directory: str = RECORDINGS_DIR) -> Optional[Dict[str, Any]]:
+        if not RECORDING_ID_PATTERN.match(recording_id):
+            return None
+        path = os.path.join(directory, recording_id, "index.json")
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def segment_path(recording_id: str, segment: str, directory: str = RECORDINGS_DIR) -> Optional[str]:
+        index = ScreenRecorder.load_index(recording_id, directory)
+        if index is None or segment not in {entry["file"] for entry in index["segments"]}:
+            return None
+        return os.path.join(directory, recording_id, segment)
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Optional, Tuple
+import logging
+
+from adb.adb_screen_broadcaster import Frame
+
+try:
+    import cv2
+    import numpy as np
+    CV2_DISPONIBLE = True
+except ImportError:
+    CV2_DISPONIBLE = False
+
+logger = logging.getLogger(__name__)
+
+TRANSCODE_WORKERS = int(os.getenv("SCREEN_TRANSCODE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Largeur maximale (le ratio de l'écran est conservé) et qualité JPEG
+PROFILES: Dict[str, Dict[str, int]] = {
+    "low": {"width": 320, "quality": 50},
+    "medium": {"width": 640, "quality": 70},
+    "high": {"width": 1280, "quality": 85},
+}
+
+
+class ScreenTranscoder:
+    """
+    Conversion des captures PNG en JPEG redimensionnés, hors de la boucle d'événements.
+
+    OpenCV libère le GIL pendant le décodage, le redimensionnement et l'encodage :
+    un pool de threads suffit à répartir le travail sur plusieurs cœurs. Chaque
+    thread réutilise ses tampons de sortie d'une image à l'autre, et une image
+    n'est convertie qu'une fois par profil quel que soit le nombre de spectateurs.
+    """
+
+    _instance: Optional["ScreenTranscoder"] = None
+
+    def __init__(self, workers: int = TRANSCODE_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcode")
+        self._local = threading.local()
+        self._results: Dict[Tuple[Hashable, str], Tuple[int, asyncio.Future]] = {}
+
+    @classmethod
+    def instance(cls) -> "ScreenTranscoder":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def close(cls) -> None:
+        if cls._instance is not None:
+            cls._instance._pool.shutdown(wait=False, cancel_futures=True)
+            cls._instance = None
+
+    def _buffer(self, profile: str, shape: Tuple[int, int, int]) -> Any:
+        """Tampon de sortie du redimensionnement, propre au thread et réalloué si la taille change."""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        buffer = buffers.get(profile)
+        if buffer is None or buffer.shape != shape:
+            buffer = buffers[profile] = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def decode(self, image_data: bytes) -> Optional[Any]:
+        return cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def resize(self, image: Any, profile: str) -> Any:
+        settings = PROFILES[profile]
+        height, width = image.shape[:2]
+        if width <= settings["width"]:
+            return image
+        target = (settings["width"], max(1, round(height * settings["width"] / width)))
+        buffer = self._buffer(profile, (target[1], target[0], 3))
+        return cv2.resize(image, target, dst=buffer, interpolation=cv2.INTER_AREA)
+
+    def to_jpeg(self, image_data: bytes, profile: str = "medium") -> Optional[bytes]:
+        """Conversion synchrone (exécutée dans le pool) ; None si la capture est illisible."""
+        image = self.decode(image_data)
+        if image is None:
+            return None
+        resized = self.resize(image, profile)
+        ok, encoded = cv2.imencode(".jpg", resized, [int(cv2.IMWRITE_JPEG_QUALITY), PROFILES[profile]["quality"]])
+        return encoded.tobytes() if ok else None
+
+    def tile(self, image_data: bytes, width: int, height: int) -> Optional[Any]:
+        """Vignette width x height de la capture, ratio conservé et bandes noires si besoin."""
+        image = self.decode(image_data)
+        if image is None:
+            return None
+        source_height, source_width = image.shape[:2]
+        scale = min(width / source_width, height / source_height)
+        size = (max(1, int(source_width * scale)), max(1, int(source_height * scale)))
+        resized = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        tile = np.zeros((height, width, 3), dtype=np.uint8)
+        top, left = (height - size[1]) // 2, (width - size[0]) // 2
+        tile[top:top + size[1], left:left + size[0]] = resized
+        return tile
+
+    def encode_jpeg(self, image: Any, quality: int) -> Optional[bytes]:
+        ok, encoded = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return encoded.tobytes() if ok else None
+
+    async def run(self, function, *args) -> Any:
+        """Exécute une fonction de conversion dans le pool."""
+        return await asyncio.get_running_loop().run_in_executor(self._pool, function, *args)
+
+    async def jpeg(self, source: Hashable, frame: Frame, profile: str = "medium") -> Optional[bytes]:
+        """
+        JPEG de l'image pour ce profil, partagé entre tous les spectateurs de la même source.
+
+        source identifie le flux (par exemple le numéro de série) : seule la dernière
+        image convertie de chaque couple (source, profil) est conservée.
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Profil inconnu : {profile}")
+        cached = self._results.get((source, profile))
+        if cached is not None and cached[0] == frame.seq:
+            return await asyncio.shield(cached[1])
+        future = asyncio.ensure_future(self.run(self.to_jpeg, frame.data, profile))
+        self._results[(source, profile)] = (frame.seq, future)
+        return await asyncio.shield(future)
@@ -0,0 +1,107 @@
+import asyncio
+import struct
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional
+import logging
+
+from adb.adb_screen_broadcaster import Frame
+
+logger = logging.getLogger(__name__)
+
+# En-tête de chaque message binaire : type (u8), séquence (u32), horodatage en ms (u64), longueur (u32)
+FRAME_HEADER = struct.Struct(">BIQI")
+FRAME_PNG = 1
+FRAME_JPEG = 2
+
+
+def pack_frame(kind: int, seq: int, timestamp: float, payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(kind, seq & 0xFFFFFFFF, int(timestamp * 1000), len(payload)) + payload
+
+
+def unpack_frame(message: bytes) -> Dict[str, Any]:
+    kind, seq, timestamp, length = FRAME_HEADER.unpack_from(message)
+    return {"type": kind, "seq": seq, "timestamp": timestamp / 1000,
+            "payload": message[FRAME_HEADER.size:FRAME_HEADER.size + length]}
+
+
+class FrameSender:
+    """
+    Envoi d'images sur un WebSocket avec contrôle de flux par acquittements.
+
+    Au plus window images peuvent être envoyées sans acquittement ({"ack": seq}) ;
+    au-delà, seule la plus récente est conservée et les précédentes sont abandonnées
+    côté serveur au lieu de s'accumuler dans le tampon du socket. Le client peut
+    aussi changer de qualité ({"quality": "low"}) ou demander ses statistiques
+    ({"stats": true}).
+    """
+
+    def __init__(self, websocket, window: int = 2, quality: str = "medium"):
+        self.websocket = websocket
+        self.window = max(1, window)
+        self.quality = quality
+        self.sent = 0
+        self.acked = 0
+        self.dropped = 0
+        self._latest: Optional[Frame] = None
+        self._condition = asyncio.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self.sent - self.acked
+
+    async def _produce(self, frames: AsyncIterator[Frame]) -> None:
+        async with aclosing(frames) as source:
+            async for frame in source:
+                async with self._condition:
+                    if self._latest is not None:
+                        self.dropped += 1  # Jamais envoyée : remplacée par une image plus récente
+                    self._latest = frame
+                    self._condition.notify_all()
+
+    async def _receive(self, qualities) -> None:
+        while True:
+            message = await self.websocket.receive_json()
+            async with self._condition:
+                if isinstance(message.get("ack"), int):
+                    self.acked = min(self.sent, max(self.acked, message["ack"]))
+                if message.get("quality") in qualities:
+                    self.quality = message["quality"]
+                self._condition.notify_all()
+            if message.get("stats"):
+                await self.websocket.send_json(self.stats())
+
+    async def run(self, frames: AsyncIterator[Frame], encode, qualities=()) -> None:
+        """
+        Envoie les images de frames jusqu'à la déconnexion du client.
+
+        encode(frame, quality) retourne (type, octets) ou None pour ignorer l'image.
+        """
+        producer = asyncio.ensure_future(self._produce(frames))
+        receiver = asyncio.ensure_future(self._receive(qualities))
+        try:
+            while True:
+                async with self._condition:
+                    await self._condition.wait_for(
+                        lambda: self._latest is not None and self.in_flight < self.window
+                        or producer.done() or receiver.done()
+                    )
+                    frame, self._latest = self._latest, None
+                for task in (producer, receiver):
+                    if task.done():
+                        task.result()  # Propage l'erreur (déconnexion, capture interrompue)
+                        return
+                encoded = await encode(frame, self.quality)
+                if encoded is None:
+                    continue
+                kind, payload = encoded
+                self.sent += 1
+                await self.websocket.send_bytes(pack_frame(kind, self.sent, frame.timestamp, payload))
+        finally:
+            for task in (producer, receiver):
+                task.cancel()
+            await asyncio.gather(producer, receiver, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sent": self.sent, "acked": self.acked, "dropped": self.dropped, "window": self.window,
+                "quality": self.quality, "time": time.time()}
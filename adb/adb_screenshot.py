@@ -0,0 +1,210 @@
+import asyncio
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import Dict, NamedTuple, Optional, Tuple
+import logging
+
+from adb.adb_command_executor import AsyncAdbCommandExecutor
+from adb.adb_screen_broadcaster import ScreenBroadcaster
+from adb.adb_screen_transcoder import CV2_DISPONIBLE, ScreenTranscoder
+
+if CV2_DISPONIBLE:
+    import cv2
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Formats de pixels de screencap (android.graphics.PixelFormat) codés sur 4 octets
+PIXEL_RGBA_8888 = 1
+PIXEL_RGBX_8888 = 2
+PIXEL_BGRA_8888 = 5
+SUPPORTED_PIXEL_FORMATS = (PIXEL_RGBA_8888, PIXEL_RGBX_8888, PIXEL_BGRA_8888)
+
+# En-tête : largeur, hauteur, format (12 octets), suivi de l'espace colorimétrique depuis Android 10 (16 octets)
+RAW_HEADER_SIZES = (12, 16)
+
+IMAGE_FORMATS: Dict[str, str] = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+class RawScreenshot(NamedTuple):
+    timestamp: float
+    width: int
+    height: int
+    pixel_format: int
+    pixels: bytes
+
+
+class Screenshot(NamedTuple):
+    data: bytes
+    media_type: str
+    timestamp: float
+    source: str  # "live" (diffusion en cours), "cache" ou "device"
+
+
+def parse_raw_screencap(data: bytes, timestamp: Optional[float] = None) -> RawScreenshot:
+    """
+    Décode la sortie brute de `screencap` (sans -p).
+
+    La taille de l'en-tête dépend de la version d'Android : elle est déduite de la
+    longueur totale une fois les dimensions connues.
+    """
+    if len(data) < RAW_HEADER_SIZES[0]:
+        raise ValueError("Capture brute tronquée")
+    width, height, pixel_format = struct.unpack_from("<III", data)
+    if pixel_format not in SUPPORTED_PIXEL_FORMATS:
+        raise ValueError(f"Format de pixels non pris en charge : {pixel_format}")
+    header = len(data) - width * height * 4
+    if header not in RAW_HEADER_SIZES:
+        raise ValueError(f"Taille de capture incohérente ({len(data)} octets pour {width}x{height})")
+    return RawScreenshot(timestamp if timestamp is not None else time.time(), width, height, pixel_format,
+                         data[header:])
+
+
+def encode_png_zlib(raw: RawScreenshot, level: int = 3) -> bytes:
+    """Encodeur PNG minimal (RGBA, sans filtre), utilisé lorsqu'OpenCV n'est pas installé."""
+    pixels = raw.pixels
+    if raw.pixel_format == PIXEL_BGRA_8888:
+        swapped = bytearray(pixels)
+        swapped[0::4], swapped[2::4] = pixels[2::4], pixels[0::4]
+        pixels = bytes(swapped)
+    stride = raw.width * 4
+    scanlines = b"".join(b"\x00" + pixels[row:row + stride] for row in range(0, stride * raw.height, stride))
+
+    def chunk(kind: bytes, payload: bytes) -> bytes:
+        return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", raw.width, raw.height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(scanlines, level))
+            + chunk(b"IEND", b""))
+
+
+def encode_image(image, image_format: str, quality: int) -> Optional[bytes]:
+    """Encode une image OpenCV (BGR) au format demandé."""
+    if image_format == "png":
+        ok, encoded = cv2.imencode(".png", image, [int(cv2.IMWRITE_PNG_COMPRESSION), 3])
+    elif image_format == "jpeg":
+        ok, encoded = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    else:
+        ok, encoded = cv2.imencode(".webp", image, [int(cv2.IMWRITE_WEBP_QUALITY), quality])
+    return encoded.tobytes() if ok else None
+
+
+def encode_raw(raw: RawScreenshot, image_format: str, quality: int) -> Optional[bytes]:
+    if not CV2_DISPONIBLE:
+        if image_format != "png":
+            raise RuntimeError("OpenCV (cv2) est nécessaire pour les formats JPEG et WebP")
+        return encode_png_zlib(raw)
+    pixels = np.frombuffer(raw.pixels, dtype=np.uint8).reshape(raw.height, raw.width, 4)
+    conversion = cv2.COLOR_BGRA2BGR if raw.pixel_format == PIXEL_BGRA_8888 else cv2.COLOR_RGBA2BGR
+    return encode_image(cv2.cvtColor(pixels, conversion), image_format, quality)
+
+
+def reencode_png(data: bytes, image_format: str, quality: int) -> Optional[bytes]:
+    """Réencode une image de la diffusion (PNG de `screencap -p`) dans un autre format."""
+    image = ScreenTranscoder.instance().decode(data)
+    return None if image is None else encode_image(image, image_format, quality)
+
+
+class ScreenshotCache:
+    """
+    Captures d'écran à la demande, servies depuis la mémoire quand c'est possible.
+
+    Ordre de priorité : dernière image d'une diffusion PNG en cours, dernière capture
+    brute de moins de max_age secondes, puis `exec-out screencap` (sans PNG, la
+    compression est faite par le serveur). Des demandes simultanées pour un même
+    périphérique partagent une seule capture, et le résultat encodé est conservé
+    par format et qualité pour la dernière image de chaque périphérique seulement.
+    """
+
+    _instance: Optional["ScreenshotCache"] = None
+
+    def __init__(self, max_raw_frames: int = 4):
+        self.max_raw_frames = max_raw_frames
+        self._raw: "OrderedDict[Optional[str], RawScreenshot]" = OrderedDict()
+        self._pending: Dict[Optional[str], asyncio.Future] = {}
+        self._encoded: Dict[Tuple[Optional[str], str, int], Tuple[float, bytes]] = {}
+
+    @classmethod
+    def instance(cls) -> "ScreenshotCache":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def _live_frame(serial: Optional[str]):
+        for broadcaster in ScreenBroadcaster.running():
+            # Une scène figée n'est pas rediffusée : la dernière image reste à jour tant que la capture tourne
+            if broadcaster.serial == serial and broadcaster.mode == "png" and broadcaster.latest is not None:
+                return broadcaster.latest
+        return None
+
+    async def _capture(self, serial: Optional[str]) -> RawScreenshot:
+        chunks = []
+        async with aclosing(AsyncAdbCommandExecutor.stream(["exec-out", "screencap"], serial=serial)) as stream:
+            async for chunk in stream:
+                chunks.append(chunk)
+        raw = parse_raw_screencap(b"".join(chunks))
+        self._raw[serial] = raw
+        self._raw.move_to_end(serial)
+        self._forget_encoded(serial, raw.timestamp)
+        while len(self._raw) > self.max_raw_frames:
+            evicted, _ = self._raw.popitem(last=False)  # Une capture brute pèse largeur x hauteur x 4 octets
+            self._forget_encoded(evicted)
+        return raw
+
+    def _forget_encoded(self, serial: Optional[str], keep_timestamp: Optional[float] = None) -> None:
+        """Supprime les encodages d'un périphérique, sauf ceux de l'image keep_timestamp."""
+        for key in [key for key, (timestamp, _) in self._encoded.items()
+                    if key[0] == serial and timestamp != keep_timestamp]:
+            del self._encoded[key]
+
+    def _store_encoded(self, key: Tuple[Optional[str], str, int], timestamp: float, data: bytes) -> None:
+        """Conserve un encodage ; seuls ceux de l'image la plus récente du périphérique sont gardés."""
+        serial = key[0]
+        if any(other[0] == serial and cached[0] > timestamp for other, cached in self._encoded.items()):
+            return  # Encodage d'une image déjà remplacée
+        self._forget_encoded(serial, timestamp)
+        self._encoded[key] = (timestamp, data)
+
+    async def raw(self, serial: Optional[str] = None, max_age: float = 1.0) -> Tuple[RawScreenshot, str]:
+        cached = self._raw.get(serial)
+        if cached is not None and time.time() - cached.timestamp <= max_age:
+            return cached, "cache"
+        pending = self._pending.get(serial)
+        if pending is None:
+            pending = self._pending[serial] = asyncio.ensure_future(self._capture(serial))
+            pending.add_done_callback(lambda _: self._pending.pop(serial, None))
+        return await asyncio.shield(pending), "device"
+
+    async def capture(self, serial: Optional[str] = None, image_format: str = "png", quality: int = 80,
+                      max_age: float = 1.0) -> Screenshot:
+        """Capture d'écran encodée ; lève RuntimeError si le périphérique ne répond pas."""
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Format inconnu : {image_format}")
+        media_type = IMAGE_FORMATS[image_format]
+        key = (serial, image_format, quality)
+        encoded = self._encoded.get(key)
+        if encoded is not None and time.time() - encoded[0] <= max_age:
+            return Screenshot(encoded[1], media_type, encoded[0], "cache")
+
+        transcoder = ScreenTranscoder.instance()
+        live = self._live_frame(serial)
+        if live is not None:
+            if image_format == "png":
+                return Screenshot(live.data, media_type, live.timestamp, "live")
+            if not CV2_DISPONIBLE:
+                raise RuntimeError("OpenCV (cv2) est nécessaire pour les formats JPEG et WebP")
+            data = await transcoder.run(reencode_png, live.data, image_format, quality)
+            timestamp, source = live.timestamp, "live"
+        else:
+            raw, source = await self.raw(serial, max_age)
+            data = await transcoder.run(encode_raw, raw, image_format, quality)
+            timestamp = raw.timestamp
+        if data is None:
+            raise RuntimeError("Échec de l'encodage de la capture")
+        self._store_encoded(key, timestamp, data)
+        return Screenshot(data, media_type, timestamp, source)
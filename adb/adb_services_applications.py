@@ -1,5 +1,8 @@
-from typing import List, Dict, Any
-from adb.adb_command_executor import AdbCommandExecutor
+import re
+import shlex
+from typing import List, Dict, Any, Optional
+from adb.adb_command_executor import AdbCommandExecutor, AsyncAdbCommandExecutor
+from adb.adb_property_cache import DevicePropertyCache, is_error
 import logging
 
 
@@ -11,10 +14,52 @@ class AdbApplications:
     def list_installed_apps() -> Dict[str, Any]:
         """Liste toutes les applications installées sur l'appareil Android."""
         output = AdbCommandExecutor.execute(["shell", "pm", "list", "packages"])
-        if output.get("statut") == "Succès":
-            apps = [line.split(":")[1] for line in output.get("sortie", "").splitlines()]
-            return {"statut": "Succès", "applications": apps}
-        return output
+        return AdbApplications._parse_packages(output)
+
+    @staticmethod
+    def _parse_packages(output: str) -> Dict[str, Any]:
+        if output.startswith("Erreur"):
+            return {"statut": "Erreur", "message": output}
+        apps = [line.split(":", 1)[1] for line in output.splitlines() if ":" in line]
+        return {"statut": "Succès", "applications": apps}
+
+    @staticmethod
+    def _parse_versions(output: str) -> Any:
+        """Analyse `pm list packages --show-versioncode` ; conserve le message d'erreur tel quel."""
+        if is_error(output):
+            return output
+        versions = {}
+        for line in output.splitlines():
+            fields = dict(part.split(":", 1) for part in line.split() if ":" in part)
+            if "package" in fields and fields.get("versionCode", "").isdigit():
+                versions[fields["package"]] = int(fields["versionCode"])
+        return versions
+
+    @staticmethod
+    def _parse_package_info(package_name: str, output: str) -> Dict[str, Any]:
+        """Extrait version et dates d'installation de `dumpsys package <paquet>`."""
+        if is_error(output):
+            return {"statut": "Erreur", "message": output}
+        if f"Package [{package_name}]" not in output:
+            return {"statut": "Succès", "package": package_name, "installed": False}
+        version_code = re.search(r"\bversionCode=(\d+)", output)
+        version_name = re.search(r"\bversionName=(\S+)", output)
+        first_install = re.search(r"\bfirstInstallTime=([^\r\n]+)", output)
+        last_update = re.search(r"\blastUpdateTime=([^\r\n]+)", output)
+        return {
+            "statut": "Succès", "package": package_name, "installed": True,
+            "version_code": int(version_code.group(1)) if version_code else None,
+            "version_name": version_name.group(1) if version_name else None,
+            "first_install_time": first_install.group(1).strip() if first_install else None,
+            "last_update_time": last_update.group(1).strip() if last_update else None,
+        }
+
+    @staticmethod
+    def _parse_pidof(package_name: str, output: str) -> Dict[str, Any]:
+        if is_error(output):
+            return {"statut": "Erreur", "message": output}
+        pids = [int(pid) for pid in output.split() if pid.isdigit()]
+        return {"statut": "Succès", "package": package_name, "running": bool(pids), "pids": pids}
 
     @staticmethod
     def install_app(apk_path: str) -> Dict[str, Any]:
@@ -36,7 +81,85 @@ class AdbApplications:
         """Démarre une application spécifique."""
         return AdbCommandExecutor.execute(["shell", "am", "start", "-n", f"{package_name}/{activity}"])
 
+    @staticmethod
+    def launch_app(package_name: str) -> Dict[str, Any]:
+        """Démarre l'activité principale d'une application sans connaître son nom."""
+        return AdbCommandExecutor.execute(["shell", "monkey", "-p", package_name, "-c", "android.intent.category.LAUNCHER", "1"])
+
     @staticmethod
     def stop_app(package_name: str) -> Dict[str, Any]:
         """Arrête une application spécifique."""
         return AdbCommandExecutor.execute(["shell", "am", "force-stop", package_name])
+
+    # --- Variantes asynchrones ---
+
+    @staticmethod
+    async def list_installed_apps_async(serial: Optional[str] = None) -> Dict[str, Any]:
+        """Liste les applications installées sans bloquer la boucle d'événements."""
+        output = await AsyncAdbCommandExecutor.execute(["shell", "pm", "list", "packages"], serial=serial)
+        return AdbApplications._parse_packages(output)
+
+    @staticmethod
+    async def install_app_async(apk_path: str, serial: Optional[str] = None) -> str:
+        """Installe une application via un fichier APK."""
+        result = await AsyncAdbCommandExecutor.execute(["install", apk_path], serial=serial, timeout=600)
+        DevicePropertyCache.instance().discard(serial, "versions")
+        return result
+
+    @staticmethod
+    async def install_apks_async(apk_paths: List[str], serial: Optional[str] = None) -> str:
+        """Installe un APK, ou un APK de base et ses splits en une seule session (install-multiple)."""
+        verb = "install-multiple" if len(apk_paths) > 1 else "install"
+        result = await AsyncAdbCommandExecutor.execute([verb, "-r", *apk_paths], serial=serial, timeout=600)
+        DevicePropertyCache.instance().discard(serial, "versions")
+        return result
+
+    @staticmethod
+    async def installed_versions_async(serial: Optional[str] = None) -> Any:
+        """versionCode de chaque paquet installé (dict), mis en cache quelques minutes par périphérique."""
+        return await DevicePropertyCache.instance().get_or_load_async(
+            serial, "versions",
+            lambda: AsyncAdbCommandExecutor.execute(["shell", "pm", "list", "packages", "--show-versioncode"], serial=serial),
+            AdbApplications._parse_versions, ttl=300
+        )
+
+    @staticmethod
+    async def uninstall_app_async(package_name: str, serial: Optional[str] = None) -> str:
+        """Désinstalle une application."""
+        result = await AsyncAdbCommandExecutor.execute(["uninstall", package_name], serial=serial)
+        DevicePropertyCache.instance().discard(serial, "versions")
+        return result
+
+    @staticmethod
+    async def clear_app_data_async(package_name: str, serial: Optional[str] = None) -> str:
+        """Efface les données d'une application spécifique."""
+        return await AsyncAdbCommandExecutor.execute(["shell", "pm", "clear", package_name], serial=serial)
+
+    @staticmethod
+    async def start_app_async(package_name: str, activity: str, serial: Optional[str] = None) -> str:
+        """Démarre une application spécifique."""
+        return await AsyncAdbCommandExecutor.execute(["shell", "am", "start", "-n", f"{package_name}/{activity}"], serial=serial)
+
+    @staticmethod
+    async def launch_app_async(package_name: str, serial: Optional[str] = None) -> str:
+        """Démarre l'activité principale d'une application sans connaître son nom."""
+        return await AsyncAdbCommandExecutor.execute(["shell", "monkey", "-p", package_name, "-c", "android.intent.category.LAUNCHER", "1"], serial=serial)
+
+    @staticmethod
+    async def stop_app_async(package_name: str, serial: Optional[str] = None) -> str:
+        """Arrête une application spécifique."""
+        return await AsyncAdbCommandExecutor.execute(["shell", "am", "force-stop", package_name], serial=serial)
+
+    @staticmethod
+    async def app_info_async(package_name: str, serial: Optional[str] = None) -> Dict[str, Any]:
+        """Version et dates d'installation d'une application."""
+        output = await AsyncAdbCommandExecutor.execute(["shell", f"dumpsys package {shlex.quote(package_name)}"],
+                                                       serial=serial)
+        return AdbApplications._parse_package_info(package_name, output)
+
+    @staticmethod
+    async def is_running_async(package_name: str, serial: Optional[str] = None) -> Dict[str, Any]:
+        """Indique si une application a un processus en cours (pidof sort en erreur sinon)."""
+        output = await AsyncAdbCommandExecutor.execute(["shell", f"pidof {shlex.quote(package_name)} || true"],
+                                                       serial=serial)
+        return AdbApplications._parse_pidof(package_name, output)
@@ -1,5 +1,6 @@
-from adb.adb_command_executor import AdbCommandExecutor
-from typing import List, Dict, Any
+from adb.adb_command_executor import AdbCommandExecutor, AsyncAdbCommandExecutor
+from adb.adb_property_cache import DevicePropertyCache, cached_properties, cached_properties_async
+from typing import List, Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,6 +10,10 @@ class AdbDevice:
     def list_devices() -> List[Dict[str, str]]:
         """Liste les périphériques connectés via ADB et leur état."""
         output = AdbCommandExecutor.execute(["devices"])
+        return AdbDevice._parse_devices(output)
+
+    @staticmethod
+    def _parse_devices(output: str) -> List[Dict[str, str]]:
         devices = []
         for line in output.splitlines()[1:]:
             if 'device' in line or 'offline' in line or 'unauthorized' in line:
@@ -20,18 +25,20 @@ class AdbDevice:
     @staticmethod
     def device_info(serial: str = None) -> Dict[str, str]:
         """Récupère les informations d'un périphérique spécifique via ADB."""
-        cmd = ["-s", serial, "shell", "getprop"] if serial else ["shell", "getprop"]
-        output = AdbCommandExecutor.execute(cmd)
-        return {
-            line.split(': ')[0].strip('[]'): line.split(': ')[1].strip('[]')
-            for line in output.splitlines()
-            if ': ' in line
-        }
+        return AdbDevice._device_info_dict(cached_properties(serial))
+
+    @staticmethod
+    def _device_info_dict(properties: Any) -> Dict[str, str]:
+        return dict(properties) if isinstance(properties, dict) else {"Erreur": properties}
 
     @staticmethod
     def connect(ip: str, port: int = 5555) -> Dict[str, str]:
         """Connecte un périphérique via son adresse IP et port."""
         output = AdbCommandExecutor.execute(["connect", f"{ip}:{port}"])
+        return AdbDevice._parse_connect(ip, output)
+
+    @staticmethod
+    def _parse_connect(ip: str, output: str) -> Dict[str, str]:
         if "cannot connect" not in output.lower():
             return {"statut": "Succès", "message": "Connecté", "detail": f"Périphérique {ip} connecté avec succès"}
         return {"statut": "Erreur", "message": "La connexion a échoué", "detail": output}
@@ -40,6 +47,10 @@ class AdbDevice:
     def disconnect(ip: str) -> Dict[str, str]:
         """Déconnecte un périphérique spécifique par IP."""
         output = AdbCommandExecutor.execute(["disconnect", ip])
+        return AdbDevice._parse_disconnect(ip, output)
+
+    @staticmethod
+    def _parse_disconnect(ip: str, output: str) -> Dict[str, str]:
         if "disconnected" in output.lower():
             return {"statut": "Succès", "message": "Déconnecté", "detail": f"Périphérique {ip} déconnecté avec succès"}
         return {"statut": "Erreur", "message": f"La déconnexion a échoué sur {ip}"}
@@ -47,12 +58,14 @@ class AdbDevice:
     @staticmethod
     def reboot(serial: str = None) -> str:
         """Redémarre un périphérique spécifique."""
+        DevicePropertyCache.instance().invalidate(serial)
         cmd = ["-s", serial, "reboot"] if serial else ["reboot"]
         return AdbCommandExecutor.execute(cmd)
 
     @staticmethod
     def shutdown(serial: str = None) -> str:
         """Éteint un périphérique spécifique."""
+        DevicePropertyCache.instance().invalidate(serial)
         cmd = ["-s", serial, "shell", "reboot", "-p"] if serial else ["shell", "reboot", "-p"]
         return AdbCommandExecutor.execute(cmd)
 
@@ -64,8 +77,8 @@ class AdbDevice:
 
     @staticmethod
     def get_logcat(serial: str = None) -> str:
-        """Récupère les journaux du périphérique."""
-        cmd = ["-s", serial, "logcat"] if serial else ["logcat"]
+        """Récupère les journaux du périphérique (contenu actuel du tampon, sans suivre les nouvelles entrées)."""
+        cmd = ["-s", serial, "logcat", "-d"] if serial else ["logcat", "-d"]
         return AdbCommandExecutor.execute(cmd)
 
     @staticmethod
@@ -115,10 +128,89 @@ class AdbDevice:
     def get_ip(device: str)-> str: 
         try:
             result=AdbCommandExecutor.execute(["-s", device, "shell", "ip", "a", "show", "wlan0"])
-            for line in result.splitlines():
-                if "inet " in line:
-                    ip_address = line.split()[1].split('/')[0]  # Extraction de l'adresse IP
-                    return ip_address
-            return None  # Si aucune adresse IP n'est trouvée
+            return AdbDevice._parse_ip(result)
         except Exception as e:
-            return None  # En cas d'erreur
\ No newline at end of file
+            return None  # En cas d'erreur
+
+    @staticmethod
+    def _parse_ip(result: str) -> Optional[str]:
+        for line in result.splitlines():
+            if "inet " in line:
+                ip_address = line.split()[1].split('/')[0]  # Extraction de l'adresse IP
+                return ip_address
+        return None  # Si aucune adresse IP n'est trouvée
+
+    # --- Variantes asynchrones ---
+
+    @staticmethod
+    async def list_devices_async() -> List[Dict[str, str]]:
+        """Liste les périphériques connectés via ADB sans bloquer la boucle d'événements."""
+        output = await AsyncAdbCommandExecutor.execute(["devices"])
+        return AdbDevice._parse_devices(output)
+
+    @staticmethod
+    async def device_info_async(serial: str = None) -> Dict[str, str]:
+        return AdbDevice._device_info_dict(await cached_properties_async(serial))
+
+    @staticmethod
+    async def connect_async(ip: str, port: int = 5555) -> Dict[str, str]:
+        output = await AsyncAdbCommandExecutor.execute(["connect", f"{ip}:{port}"])
+        return AdbDevice._parse_connect(ip, output)
+
+    @staticmethod
+    async def disconnect_async(ip: str) -> Dict[str, str]:
+        output = await AsyncAdbCommandExecutor.execute(["disconnect", ip])
+        return AdbDevice._parse_disconnect(ip, output)
+
+    @staticmethod
+    async def reboot_async(serial: str = None) -> str:
+        DevicePropertyCache.instance().invalidate(serial)
+        return await AsyncAdbCommandExecutor.execute(["reboot"], serial=serial)
+
+    @staticmethod
+    async def shutdown_async(serial: str = None) -> str:
+        DevicePropertyCache.instance().invalidate(serial)
+        return await AsyncAdbCommandExecutor.execute(["shell", "reboot", "-p"], serial=serial)
+
+    @staticmethod
+    async def remount_async(serial: str = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["remount"], serial=serial)
+
+    @staticmethod
+    async def get_logcat_async(serial: str = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["logcat", "-d"], serial=serial)
+
+    @staticmethod
+    async def screen_record_async(destination: str = "/sdcard/screenrecord.mp4", serial: str = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "screenrecord", destination], serial=serial, timeout=200)
+
+    @staticmethod
+    async def screenshot_async(destination: str = "/sdcard/screenshot.png", serial: str = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "screencap", "-p", destination], serial=serial)
+
+    @staticmethod
+    async def install_apk_async(apk_path: str, serial: str = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["install", apk_path], serial=serial, timeout=600)
+
+    @staticmethod
+    async def uninstall_apk_async(package_name: str, serial: str = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["uninstall", package_name], serial=serial)
+
+    @staticmethod
+    async def clear_app_data_async(package_name: str, serial: str = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "pm", "clear", package_name], serial=serial)
+
+    @staticmethod
+    async def set_mode_async(mode: str, port: str = "5555") -> str:
+        if mode not in ["wifi", "usb"]:
+            raise ValueError("Mode invalide. Utilisez 'wifi' ou 'usb'.")
+        cmd = ["tcpip", port] if mode == "wifi" else ["usb"]
+        return await AsyncAdbCommandExecutor.execute(cmd)
+
+    @staticmethod
+    async def get_ip_async(device: str) -> Optional[str]:
+        try:
+            result = await AsyncAdbCommandExecutor.execute(["shell", "ip", "a", "show", "wlan0"], serial=device)
+            return AdbDevice._parse_ip(result)
+        except Exception:
+            return None
@@ -1,6 +1,9 @@
-from adb.adb_command_executor import AdbCommandExecutor
-from typing import List, Dict, Any
+from adb.adb_command_executor import AdbCommandExecutor, AsyncAdbCommandExecutor
+from adb.adb_host_client import AsyncAdbHostClient
+from adb.adb_services_server import AdbServer
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional
 import logging
+import shlex
 
 
 logger = logging.getLogger(__name__)
@@ -124,3 +127,176 @@ class AdbFiles:
     @staticmethod
     def count_files(path: str) -> str:
         return AdbCommandExecutor.execute(["shell", "find", path, "-type", "f", "|", "wc", "-l"])
+
+
+    # --- Variantes asynchrones ---
+
+    @staticmethod
+    async def list_files_async(path: str = "/sdcard", serial: Optional[str] = None) -> List[str]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "ls", path], serial=serial)
+        return output.splitlines()
+
+    @staticmethod
+    async def pull_async(source: str, destination: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["pull", source, destination], serial=serial, timeout=600)
+
+    @staticmethod
+    async def push_async(source: str, destination: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["push", source, destination], serial=serial, timeout=600)
+
+    @staticmethod
+    async def delete_file_async(path: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "rm", path], serial=serial)
+
+    @staticmethod
+    async def file_details_async(path: str, serial: Optional[str] = None) -> Dict[str, str]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "ls", "-l", path], serial=serial)
+        return {"details": output}
+
+    @staticmethod
+    async def create_directory_async(path: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "mkdir", "-p", path], serial=serial)
+
+    @staticmethod
+    async def change_permissions_async(path: str, permissions: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "chmod", permissions, path], serial=serial)
+
+    @staticmethod
+    async def search_files_async(path: str, pattern: str, serial: Optional[str] = None) -> List[str]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "find", path, "-name", pattern], serial=serial)
+        return output.splitlines()
+
+    @staticmethod
+    async def move_file_async(source: str, destination: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "mv", source, destination], serial=serial)
+
+    @staticmethod
+    async def copy_file_async(source: str, destination: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "cp", source, destination], serial=serial)
+
+    @staticmethod
+    async def file_size_async(path: str, serial: Optional[str] = None) -> str:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "stat", "-c", "%s", path], serial=serial)
+        return f"{output} bytes"
+
+    @staticmethod
+    async def file_type_async(path: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "file", path], serial=serial)
+
+    @staticmethod
+    async def check_file_exists_async(path: str, serial: Optional[str] = None) -> bool:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "test", "-e", path, "&&", "echo", "exists"], serial=serial)
+        return output.strip() == "exists"
+
+    @staticmethod
+    async def read_file_async(path: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "cat", path], serial=serial)
+
+    @staticmethod
+    async def write_to_file_async(path: str, content: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "echo", f"{content}", ">", path], serial=serial)
+
+    @staticmethod
+    async def tail_file_async(path: str, lines: int = 10, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "tail", f"-n {lines}", path], serial=serial)
+
+    @staticmethod
+    async def head_file_async(path: str, lines: int = 10, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "head", f"-n {lines}", path], serial=serial)
+
+    @staticmethod
+    async def zip_directory_async(source: str, destination: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "zip", "-r", destination, source], serial=serial, timeout=600)
+
+    @staticmethod
+    async def unzip_file_async(source: str, destination: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "unzip", source, "-d", destination], serial=serial, timeout=600)
+
+    @staticmethod
+    async def disk_usage_async(path: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "du", "-sh", path], serial=serial)
+
+    @staticmethod
+    async def list_open_files_async(serial: Optional[str] = None) -> List[str]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "lsof"], serial=serial)
+        return output.splitlines()
+
+    @staticmethod
+    async def sync_files_async(serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["sync"], serial=serial)
+
+    @staticmethod
+    async def get_file_checksum_async(path: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "md5sum", path], serial=serial)
+
+    @staticmethod
+    async def create_symlink_async(source: str, destination: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "ln", "-s", source, destination], serial=serial)
+
+    @staticmethod
+    async def list_directory_detailed_async(path: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "ls", "-alh", path], serial=serial)
+
+    @staticmethod
+    async def truncate_file_async(path: str, size: int, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "truncate", f"-s {size}", path], serial=serial)
+
+    @staticmethod
+    async def rename_file_async(old_name: str, new_name: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "mv", old_name, new_name], serial=serial)
+
+    @staticmethod
+    async def count_files_async(path: str, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "find", path, "-type", "f", "|", "wc", "-l"], serial=serial)
+
+    # --- Diffusion binaire ---
+
+    @staticmethod
+    async def stat_size_async(path: str, serial: Optional[str] = None) -> Optional[int]:
+        """
+        Taille du fichier en octets, ou None s'il n'existe pas.
+
+        Lève RuntimeError si la taille ne peut pas être lue (périphérique injoignable, accès refusé...).
+        """
+        try:
+            output = await AsyncAdbCommandExecutor.execute(["shell", "stat", "-c", "%s", shlex.quote(path)],
+                                                           handle_errors=False, serial=serial)
+        except RuntimeError as e:
+            if "No such file or directory" in str(e):
+                return None
+            raise
+        if not output.isdigit():
+            raise RuntimeError(f"Taille illisible pour {path} : {output}")
+        return int(output)
+
+    @staticmethod
+    def stream_file_async(path: str, start: int = 0, length: Optional[int] = None,
+                          serial: Optional[str] = None, chunk_size: int = 65536) -> AsyncIterator[bytes]:
+        """
+        Diffuse les octets d'un fichier du périphérique via `adb exec-out`, sans passer par le disque.
+
+        start et length délimitent une plage d'octets (requêtes HTTP Range).
+        """
+        command = f"cat {shlex.quote(path)}"
+        if start:
+            command = f"tail -c +{start + 1} {shlex.quote(path)}"
+        if length is not None:
+            command += f" | head -c {length}"
+        return AsyncAdbCommandExecutor.stream(["exec-out", command], serial=serial, chunk_size=chunk_size)
+
+    @staticmethod
+    async def push_stream_async(destination: str, chunks: AsyncIterator[bytes], serial: Optional[str] = None,
+                                mode: int = 0o644, progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Écrit un flux d'octets directement sur le périphérique (protocole sync), sans fichier temporaire.
+
+        Retourne le nombre d'octets écrits ; lève AdbProtocolError si le périphérique refuse l'écriture.
+        """
+        client = AsyncAdbHostClient.default()
+        try:
+            return await client.push(destination, chunks, serial=serial, mode=mode, progress=progress)
+        except ConnectionRefusedError:
+            # Aucun octet n'a encore été lu : on peut relancer le serveur et réessayer
+            logger.warning("Serveur ADB injoignable, tentative de démarrage")
+            await AdbServer.start_server_async()
+            return await client.push(destination, chunks, serial=serial, mode=mode, progress=progress)
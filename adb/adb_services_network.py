@@ -1,5 +1,5 @@
-from adb.adb_command_executor import AdbCommandExecutor
-from typing import List, Dict, Any
+from adb.adb_command_executor import AdbCommandExecutor, AsyncAdbCommandExecutor
+from typing import List, Dict, Any, Optional
 import logging
 import re
 
@@ -22,25 +22,13 @@ class AdbNetwork:
     def get_connected_ssid() -> Dict[str, Any]:
         """Récupère le SSID du réseau WiFi connecté."""
         output = AdbCommandExecutor.execute(["shell", "dumpsys", "wifi", "|", "grep", "SSID"])
-        if output.get("statut") == "Succès":
-            match = re.search(r'SSID: (.+)', output.get("sortie", ""))
-            return {
-                "statut": "Succès",
-                "SSID": match.group(1).strip() if match else "SSID non disponible"
-            }
-        return output
+        return AdbNetwork._parse_ssid(output)
 
     @staticmethod
     def get_wifi_ip() -> Dict[str, Any]:
         """Récupère l'adresse IP du WiFi."""
         output = AdbCommandExecutor.execute(["shell", "ifconfig", "wlan0"])
-        if output.get("statut") == "Succès":
-            match = re.search(r'inet addr:(\d+\.\d+\.\d+\.\d+)', output.get("sortie", ""))
-            return {
-                "statut": "Succès",
-                "adresse_ip": match.group(1) if match else "Adresse IP non disponible"
-            }
-        return output
+        return AdbNetwork._parse_wifi_ip(output)
 
     @staticmethod
     def reset_wifi() -> Dict[str, Any]:
@@ -51,22 +39,98 @@ class AdbNetwork:
     def wifi_signal_strength() -> Dict[str, Any]:
         """Récupère la force du signal WiFi."""
         output = AdbCommandExecutor.execute(["shell", "dumpsys", "wifi", "|", "grep", "RSSI"])
-        if output.get("statut") == "Succès":
-            match = re.search(r'RSSI: (-?\d+)', output.get("sortie", ""))
-            return {
-                "statut": "Succès",
-                "force_signal": match.group(1) if match else "Force du signal non disponible"
-            }
-        return output
+        return AdbNetwork._parse_signal_strength(output)
 
     @staticmethod
     def wifi_frequency() -> Dict[str, Any]:
         """Récupère la fréquence du réseau WiFi actuel."""
         output = AdbCommandExecutor.execute(["shell", "dumpsys", "wifi", "|", "grep", "Frequency"])
-        if output.get("statut") == "Succès":
-            match = re.search(r'Frequency: (\d+)', output.get("sortie", ""))
-            return {
-                "statut": "Succès",
-                "frequence": match.group(1) if match else "Fréquence non disponible"
-            }
-        return output
+        return AdbNetwork._parse_frequency(output)
+
+    # --- Analyse des sorties ---
+
+    @staticmethod
+    def _error(output: str) -> Optional[Dict[str, Any]]:
+        """Retourne un dictionnaire d'erreur si la commande ADB a échoué."""
+        if output.startswith("Erreur"):
+            return {"statut": "Erreur", "message": output}
+        return None
+
+    @staticmethod
+    def _parse_ssid(output: str) -> Dict[str, Any]:
+        error = AdbNetwork._error(output)
+        if error:
+            return error
+        match = re.search(r'SSID: (.+)', output)
+        return {
+            "statut": "Succès",
+            "SSID": match.group(1).strip() if match else "SSID non disponible"
+        }
+
+    @staticmethod
+    def _parse_wifi_ip(output: str) -> Dict[str, Any]:
+        error = AdbNetwork._error(output)
+        if error:
+            return error
+        match = re.search(r'inet addr:(\d+\.\d+\.\d+\.\d+)', output)
+        return {
+            "statut": "Succès",
+            "adresse_ip": match.group(1) if match else "Adresse IP non disponible"
+        }
+
+    @staticmethod
+    def _parse_signal_strength(output: str) -> Dict[str, Any]:
+        error = AdbNetwork._error(output)
+        if error:
+            return error
+        match = re.search(r'RSSI: (-?\d+)', output)
+        return {
+            "statut": "Succès",
+            "force_signal": match.group(1) if match else "Force du signal non disponible"
+        }
+
+    @staticmethod
+    def _parse_frequency(output: str) -> Dict[str, Any]:
+        error = AdbNetwork._error(output)
+        if error:
+            return error
+        match = re.search(r'Frequency: (\d+)', output)
+        return {
+            "statut": "Succès",
+            "frequence": match.group(1) if match else "Fréquence non disponible"
+        }
+
+    # --- Variantes asynchrones ---
+
+    @staticmethod
+    async def toggle_wifi_async(enable: bool, serial: Optional[str] = None) -> str:
+        state = "enable" if enable else "disable"
+        return await AsyncAdbCommandExecutor.execute(["shell", f"svc wifi {state}"], serial=serial)
+
+    @staticmethod
+    async def wifi_status_async(serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "dumpsys", "wifi"], serial=serial)
+
+    @staticmethod
+    async def get_connected_ssid_async(serial: Optional[str] = None) -> Dict[str, Any]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "dumpsys", "wifi", "|", "grep", "SSID"], serial=serial)
+        return AdbNetwork._parse_ssid(output)
+
+    @staticmethod
+    async def get_wifi_ip_async(serial: Optional[str] = None) -> Dict[str, Any]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "ifconfig", "wlan0"], serial=serial)
+        return AdbNetwork._parse_wifi_ip(output)
+
+    @staticmethod
+    async def reset_wifi_async(serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "svc wifi disable && svc wifi enable"], serial=serial)
+
+    @staticmethod
+    async def wifi_signal_strength_async(serial: Optional[str] = None) -> Dict[str, Any]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "dumpsys", "wifi", "|", "grep", "RSSI"], serial=serial)
+        return AdbNetwork._parse_signal_strength(output)
+
+    @staticmethod
+    async def wifi_frequency_async(serial: Optional[str] = None) -> Dict[str, Any]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "dumpsys", "wifi", "|", "grep", "Frequency"], serial=serial)
+        return AdbNetwork._parse_frequency(output)
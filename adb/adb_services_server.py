@@ -1,4 +1,4 @@
-from adb.adb_command_executor import AdbCommandExecutor
+from adb.adb_command_executor import AdbCommandExecutor, AsyncAdbCommandExecutor
 from typing import List, Dict, Any
 import logging
 
@@ -43,3 +43,42 @@ class AdbServer:
         except Exception as e:
             logger.warning(f"Statut du serveur ADB inconnu : {str(e)}")
             return "Serveur ADB inactif"
+
+    # --- Variantes asynchrones ---
+
+    @classmethod
+    async def start_server_async(cls) -> Dict[str, str]:
+        try:
+            await AsyncAdbCommandExecutor.execute(["start-server"])
+            return {"statut": "Succès", "message": "Serveur ADB démarré"}
+        except Exception as e:
+            logger.error(f"Erreur lors du démarrage du serveur ADB : {str(e)}")
+            return {"statut": "Erreur", "message": str(e)}
+
+    @classmethod
+    async def stop_server_async(cls) -> Dict[str, str]:
+        try:
+            await AsyncAdbCommandExecutor.execute(["kill-server"])
+            return {"statut": "Succès", "message": "Serveur ADB arrêté"}
+        except Exception as e:
+            logger.error(f"Erreur lors de l'arrêt du serveur ADB : {str(e)}")
+            return {"statut": "Erreur", "message": str(e)}
+
+    @classmethod
+    async def restart_server_async(cls) -> Dict[str, str]:
+        try:
+            await cls.stop_server_async()
+            await cls.start_server_async()
+            return {"statut": "Succès", "message": "Serveur ADB redémarré"}
+        except Exception as e:
+            logger.error(f"Erreur lors du redémarrage du serveur ADB : {str(e)}")
+            return {"statut": "Erreur", "message": str(e)}
+
+    @classmethod
+    async def server_status_async(cls) -> str:
+        try:
+            output = await AsyncAdbCommandExecutor.execute(["version"])
+            return f"Serveur ADB actif : {output}"
+        except Exception as e:
+            logger.warning(f"Statut du serveur ADB inconnu : {str(e)}")
+            return "Serveur ADB inactif"
@@ -0,0 +1,178 @@
+import asyncio
+import itertools
+import re
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import logging
+
+from adb.adb_command_executor import adb_path
+
+logger = logging.getLogger(__name__)
+
+SENTINEL = "__XRSH_"
+SENTINEL_PATTERN = re.compile(r"^__XRSH_(\d+)_(\d+)__$")
+
+
+class ShellSessionError(RuntimeError):
+    """Session shell interrompue ou désynchronisée."""
+
+
+class ShellSessionBusy(ShellSessionError):
+    """Trop d'appelants attendent déjà la session."""
+
+
+class DeviceShellSession:
+    """
+    Shell `adb shell` longue durée pour un périphérique, réservé aux lots courts en lecture seule.
+
+    Les commandes d'un lot sont écrites d'affilée sur l'entrée standard, chacune
+    suivie d'un marqueur portant son numéro et son code de sortie : la lecture
+    délimite ainsi les sorties sans attendre la fin de la commande précédente pour
+    envoyer la suivante. Un appelant a la session pour lui seul pendant son lot, et
+    chaque commande s'exécute dans un sous-shell : un `cd`, `exit` ou `exec` ne
+    modifie pas la session. Au délai dépassé ou à l'annulation, la session est tuée
+    (avec la commande en cours sur le périphérique) et recréée au prochain appel.
+    Au-delà de max_pending appelants en attente, les nouveaux sont refusés aussitôt.
+    """
+
+    _sessions: Dict[Optional[str], "DeviceShellSession"] = {}
+
+    def __init__(self, serial: Optional[str] = None, max_pending: int = 64):
+        self.serial = serial
+        self.max_pending = max_pending
+        self._waiting = 0
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Deque[Tuple[int, asyncio.Future]] = deque()
+        self._lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def for_serial(cls, serial: Optional[str] = None) -> "DeviceShellSession":
+        """Retourne la session partagée du périphérique, créée au premier appel."""
+        session = cls._sessions.get(serial)
+        if session is None:
+            session = cls._sessions[serial] = cls(serial)
+        return session
+
+    @classmethod
+    async def close_all(cls) -> None:
+        for session in list(cls._sessions.values()):
+            await session.close()
+        cls._sessions.clear()
+
+    @property
+    def alive(self) -> bool:
+        return (self._process is not None and self._process.returncode is None
+                and self._reader_task is not None and not self._reader_task.done())
+
+    async def _start(self) -> None:
+        args = ["-s", self.serial, "shell"] if self.serial else ["shell"]
+        self._process = await asyncio.create_subprocess_exec(
+            adb_path(), *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+        self._reader_task = asyncio.ensure_future(self._read_loop(self._process))
+        logger.info(f"Session shell ouverte pour {self.serial or 'le périphérique par défaut'}")
+
+    async def _read_loop(self, process: asyncio.subprocess.Process) -> None:
+        lines: List[str] = []
+        try:
+            while True:
+                raw = await process.stdout.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", errors="replace")
+                match = SENTINEL_PATTERN.match(line.rstrip("\r\n"))
+                if not match:
+                    lines.append(line)
+                    continue
+                token, code = int(match.group(1)), int(match.group(2))
+                output = "".join(lines)
+                lines = []
+                # Le marqueur est précédé d'un saut de ligne ajouté par la session
+                if output.endswith("\n"):
+                    output = output[:-1]
+                self._resolve(token, output, code)
+        finally:
+            self._fail_pending(ShellSessionError("Session shell interrompue"))
+
+    def _resolve(self, token: int, output: str, code: int) -> None:
+        while self._pending:
+            expected, future = self._pending.popleft()
+            if expected == token:
+                if not future.done():
+                    future.set_result((output, code))
+                return
+            if not future.done():
+                future.set_exception(ShellSessionError("Réponse de la session shell perdue"))
+
+    def _fail_pending(self, error: Exception) -> None:
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def execute(self, command: str, timeout: Optional[float] = 30.0) -> Tuple[str, int]:
+        """Exécute une commande dans la session et retourne (sortie, code de sortie)."""
+        return (await self.execute_many([command], timeout))[0]
+
+    async def execute_many(self, commands: List[str], timeout: Optional[float] = 30.0) -> List[Tuple[str, int]]:
+        """
+        Envoie plusieurs commandes d'affilée et attend leurs résultats dans l'ordre.
+
+        Le délai couvre l'attente de la session et l'exécution du lot ; lève
+        ShellSessionBusy si max_pending appelants attendent déjà.
+        """
+        if self._waiting >= self.max_pending:
+            raise ShellSessionBusy(f"Session shell saturée ({self.max_pending} appels en attente)")
+        self._waiting += 1
+        try:
+            return await asyncio.wait_for(self._run_batch(commands), timeout=timeout)
+        finally:
+            self._waiting -= 1
+
+    async def _run_batch(self, commands: List[str]) -> List[Tuple[str, int]]:
+        async with self._lock:
+            if not self.alive:
+                await self._start()
+            futures = []
+            for command in commands:
+                token = next(self._ids)
+                future = asyncio.get_running_loop().create_future()
+                self._pending.append((token, future))
+                futures.append(future)
+                self._process.stdin.write(
+                    f"( {command}\n) 2>&1 </dev/null; printf '\\n{SENTINEL}%d_%d__\\n' {token} $?\n".encode("utf-8")
+                )
+            try:
+                await self._process.stdin.drain()
+                return [await future for future in futures]
+            except (ConnectionError, BrokenPipeError) as e:
+                await self._shutdown()
+                raise ShellSessionError(f"Session shell interrompue : {e}")
+            except asyncio.CancelledError:
+                # Délai dépassé ou appel abandonné : la commande en cours est tuée avec la session
+                for future in futures:
+                    future.cancel()
+                await self._shutdown()
+                raise
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._shutdown()
+
+    async def _shutdown(self) -> None:
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        self._fail_pending(ShellSessionError("Session shell fermée"))
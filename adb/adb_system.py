@@ -1,26 +1,49 @@
-from adb.adb_command_executor import AdbCommandExecutor
-from typing import List, Dict, Any
+from adb.adb_command_executor import AdbCommandExecutor, AsyncAdbCommandExecutor
+from adb.adb_property_cache import (
+    DevicePropertyCache, cached_properties, cached_properties_async, property_value
+)
+from typing import List, Dict, Any, Optional
 import logging
 import re
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_MARKER = "@@XR_SECTION"
+SNAPSHOT_PATTERN = re.compile(rf"^{SNAPSHOT_MARKER} (\w+)@@$", re.MULTILINE)
+
+
 class AdbSystem:
+    # Section du snapshot -> (commande shell, analyseur de sortie)
+    SNAPSHOT_SECTIONS: Dict[str, tuple] = {
+        "battery": ("dumpsys battery", "_parse_battery"),
+        "uptime": ("uptime", "_parse_uptime"),
+        "screen": ("dumpsys power", "_parse_screen_status"),
+        "thermal": ("dumpsys thermalservice", "_parse_thermal"),
+        "cpu": ("cat /proc/cpuinfo", "_parse_colon_pairs"),
+        "memory": ("cat /proc/meminfo", "_parse_colon_pairs"),
+    }
+
     @staticmethod
     def get_android_version() -> str:
-        return AdbCommandExecutor.execute(["shell", "getprop", "ro.build.version.release"])
+        return property_value(cached_properties(), "ro.build.version.release")
 
     @staticmethod
     def reboot() -> str:
+        DevicePropertyCache.instance().invalidate()
         return AdbCommandExecutor.execute(["reboot"])
 
     @staticmethod
     def shutdown() -> str:
+        DevicePropertyCache.instance().invalidate()
         return AdbCommandExecutor.execute(["shell", "reboot", "-p"])
 
     @staticmethod
     def battery_info() -> Dict[str, Any]:
         output = AdbCommandExecutor.execute(["shell", "dumpsys", "battery"])
+        return AdbSystem._parse_battery(output)
+
+    @staticmethod
+    def _parse_battery(output: str) -> Dict[str, Any]:
         info = {
             line.split(': ')[0].strip(): line.split(': ')[1].strip()
             for line in output.splitlines()
@@ -38,15 +61,32 @@ class AdbSystem:
     def uptime() -> str:
         return AdbCommandExecutor.execute(["shell", "uptime"])
 
+    @staticmethod
+    def _parse_uptime(output: str) -> Dict[str, str]:
+        infos = output.split(",")
+        return {
+            "uptime": infos[0].strip(),
+            "users": infos[1].strip() if len(infos) > 1 else "N/A",
+            "infos": ",".join(infos[2:]).strip() if len(infos) > 2 else "N/A"
+        }
+
     @staticmethod
     def screen_status() -> str:
         output = AdbCommandExecutor.execute(["shell", "dumpsys", "power"])
+        return AdbSystem._parse_screen_status(output)
+
+    @staticmethod
+    def _parse_screen_status(output: str) -> str:
         match = re.search(r'mScreenOn=(true|false)', output)
         return "On" if match and match.group(1) == "true" else "Off"
 
     @staticmethod
     def thermal_info() -> Dict[str, str]:
         output = AdbCommandExecutor.execute(["shell", "dumpsys", "thermalservice"])
+        return AdbSystem._parse_thermal(output)
+
+    @staticmethod
+    def _parse_thermal(output: str) -> Dict[str, str]:
         return {
             line.split(': ')[0].strip(): line.split(': ')[1].strip()
             for line in output.splitlines()
@@ -55,16 +95,18 @@ class AdbSystem:
 
     @staticmethod
     def get_cpu_info() -> Dict[str, Any]:
-        output = AdbCommandExecutor.execute(["shell", "cat", "/proc/cpuinfo"])
-        return {
-            line.split(':')[0].strip(): line.split(':')[1].strip()
-            for line in output.splitlines()
-            if ':' in line
-        }
+        return DevicePropertyCache.instance().get_or_load(
+            None, "cpuinfo", lambda: AdbCommandExecutor.execute(["shell", "cat", "/proc/cpuinfo"]),
+            AdbSystem._parse_colon_pairs
+        )
 
     @staticmethod
     def memory_info() -> Dict[str, Any]:
         output = AdbCommandExecutor.execute(["shell", "cat", "/proc/meminfo"])
+        return AdbSystem._parse_colon_pairs(output)
+
+    @staticmethod
+    def _parse_colon_pairs(output: str) -> Dict[str, Any]:
         return {
             line.split(':')[0].strip(): line.split(':')[1].strip()
             for line in output.splitlines()
@@ -77,11 +119,11 @@ class AdbSystem:
 
     @staticmethod
     def device_model() -> str:
-        return AdbCommandExecutor.execute(["shell", "getprop", "ro.product.model"])
+        return property_value(cached_properties(), "ro.product.model")
 
     @staticmethod
     def device_manufacturer() -> str:
-        return AdbCommandExecutor.execute(["shell", "getprop", "ro.product.manufacturer"])
+        return property_value(cached_properties(), "ro.product.manufacturer")
 
     @staticmethod
     def clear_cache() -> str:
@@ -106,9 +148,141 @@ class AdbSystem:
 
     @staticmethod
     def system_properties() -> Dict[str, str]:
-        output = AdbCommandExecutor.execute(["shell", "getprop"])
-        return {
-            line.split(':')[0].strip('[]'): line.split(':')[1].strip('[]')
-            for line in output.splitlines()
-            if ':' in line
-        }
+        return AdbSystem._properties_dict(cached_properties())
+
+    @staticmethod
+    def _properties_dict(properties: Any) -> Dict[str, str]:
+        return dict(properties) if isinstance(properties, dict) else {"Erreur": properties}
+
+
+    # --- Snapshot groupé ---
+
+    @staticmethod
+    def _snapshot_fields(fields: Optional[List[str]]) -> List[str]:
+        if not fields:
+            return list(AdbSystem.SNAPSHOT_SECTIONS)
+        unknown = [field for field in fields if field not in AdbSystem.SNAPSHOT_SECTIONS]
+        if unknown:
+            raise ValueError(f"Champs inconnus : {', '.join(unknown)}. "
+                             f"Valeurs possibles : {', '.join(AdbSystem.SNAPSHOT_SECTIONS)}")
+        return list(dict.fromkeys(fields))
+
+    @staticmethod
+    def _snapshot_script(fields: List[str]) -> str:
+        """Construit un script shell unique qui enchaîne les commandes, séparées par des marqueurs."""
+        return "; ".join(
+            f"echo '{SNAPSHOT_MARKER} {field}@@'; {AdbSystem.SNAPSHOT_SECTIONS[field][0]} 2>&1"
+            for field in fields
+        )
+
+    @staticmethod
+    def _parse_snapshot(output: str, fields: List[str]) -> Dict[str, Any]:
+        if output.startswith("Erreur"):
+            raise RuntimeError(output)
+        parts = SNAPSHOT_PATTERN.split(output)
+        sections = dict(zip(parts[1::2], parts[2::2]))
+        snapshot = {}
+        for field in fields:
+            parser = getattr(AdbSystem, AdbSystem.SNAPSHOT_SECTIONS[field][1])
+            snapshot[field] = parser(sections.get(field, "").strip())
+        return snapshot
+
+    @staticmethod
+    def snapshot(fields: Optional[List[str]] = None, serial: Optional[str] = None) -> Dict[str, Any]:
+        """Récupère plusieurs métriques système en un seul appel adb shell."""
+        fields = AdbSystem._snapshot_fields(fields)
+        cmd = ["shell", AdbSystem._snapshot_script(fields)]
+        output = AdbCommandExecutor.execute(["-s", serial] + cmd if serial else cmd)
+        return AdbSystem._parse_snapshot(output, fields)
+
+    # --- Variantes asynchrones ---
+
+    @staticmethod
+    async def get_android_version_async(serial: Optional[str] = None) -> str:
+        return property_value(await cached_properties_async(serial), "ro.build.version.release")
+
+    @staticmethod
+    async def reboot_async(serial: Optional[str] = None) -> str:
+        DevicePropertyCache.instance().invalidate(serial)
+        return await AsyncAdbCommandExecutor.execute(["reboot"], serial=serial)
+
+    @staticmethod
+    async def shutdown_async(serial: Optional[str] = None) -> str:
+        DevicePropertyCache.instance().invalidate(serial)
+        return await AsyncAdbCommandExecutor.execute(["shell", "reboot", "-p"], serial=serial)
+
+    @staticmethod
+    async def battery_info_async(serial: Optional[str] = None) -> Dict[str, Any]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "dumpsys", "battery"], serial=serial)
+        return AdbSystem._parse_battery(output)
+
+    @staticmethod
+    async def uptime_async(serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "uptime"], serial=serial)
+
+    @staticmethod
+    async def screen_status_async(serial: Optional[str] = None) -> str:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "dumpsys", "power"], serial=serial)
+        return AdbSystem._parse_screen_status(output)
+
+    @staticmethod
+    async def thermal_info_async(serial: Optional[str] = None) -> Dict[str, str]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "dumpsys", "thermalservice"], serial=serial)
+        return AdbSystem._parse_thermal(output)
+
+    @staticmethod
+    async def get_cpu_info_async(serial: Optional[str] = None) -> Dict[str, Any]:
+        return await DevicePropertyCache.instance().get_or_load_async(
+            serial, "cpuinfo", lambda: AsyncAdbCommandExecutor.execute(["shell", "cat", "/proc/cpuinfo"], serial=serial),
+            AdbSystem._parse_colon_pairs
+        )
+
+    @staticmethod
+    async def memory_info_async(serial: Optional[str] = None) -> Dict[str, Any]:
+        output = await AsyncAdbCommandExecutor.execute(["shell", "cat", "/proc/meminfo"], serial=serial)
+        return AdbSystem._parse_colon_pairs(output)
+
+    @staticmethod
+    async def date_time_async(serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "date"], serial=serial)
+
+    @staticmethod
+    async def device_model_async(serial: Optional[str] = None) -> str:
+        return property_value(await cached_properties_async(serial), "ro.product.model")
+
+    @staticmethod
+    async def device_manufacturer_async(serial: Optional[str] = None) -> str:
+        return property_value(await cached_properties_async(serial), "ro.product.manufacturer")
+
+    @staticmethod
+    async def clear_cache_async(serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "sync; echo 3 > /proc/sys/vm/drop_caches"], serial=serial)
+
+    @staticmethod
+    async def enable_developer_options_async(serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "settings put global development_settings_enabled 1"], serial=serial)
+
+    @staticmethod
+    async def disable_developer_options_async(serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", "settings put global development_settings_enabled 0"], serial=serial)
+
+    @staticmethod
+    async def airplane_mode_async(enable: bool, serial: Optional[str] = None) -> str:
+        state = '1' if enable else '0'
+        return await AsyncAdbCommandExecutor.execute(["shell", f"settings put global airplane_mode_on {state}"], serial=serial)
+
+    @staticmethod
+    async def toggle_airplane_mode_async(enable: bool, serial: Optional[str] = None) -> str:
+        return await AsyncAdbCommandExecutor.execute(["shell", f"am broadcast -a android.intent.action.AIRPLANE_MODE --ez state {str(enable).lower()}"], serial=serial)
+
+    @staticmethod
+    async def system_properties_async(serial: Optional[str] = None) -> Dict[str, str]:
+        return AdbSystem._properties_dict(await cached_properties_async(serial))
+
+    @staticmethod
+    async def snapshot_async(fields: Optional[List[str]] = None, serial: Optional[str] = None) -> Dict[str, Any]:
+        """Récupère plusieurs métriques système en un seul aller-retour shell."""
+        fields = AdbSystem._snapshot_fields(fields)
+        output = await AsyncAdbCommandExecutor.execute(["shell", AdbSystem._snapshot_script(fields)], serial=serial,
+                                                        session=True)
+        return AdbSystem._parse_snapshot(output, fields)
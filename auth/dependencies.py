@@ -0,0 +1,133 @@
+from typing import Any, Dict, Optional
+import logging
+
+import jwt
+from fastapi import Depends, HTTPException, Request, WebSocket, status
+from starlette.requests import HTTPConnection
+
+from auth.revocation import RevocationStore
+from auth.token_verifier import LocalVerificationUnavailable, TokenVerifier
+from auth.ttl_cache import TTLCache
+from database import get_db, init_async_supabase
+
+logger = logging.getLogger(__name__)
+
+# Profils (table profiles) des utilisateurs authentifiés, relus au plus une fois par minute
+profile_cache = TTLCache(ttl=60.0)
+
+
+def request_token(request: HTTPConnection) -> str:
+    """
+    Jeton d'accès de la requête : cookie sb-access-token ou en-tête Authorization.
+
+    Un navigateur ne peut pas ajouter d'en-tête à une connexion WebSocket : celles-ci
+    acceptent aussi le paramètre access_token.
+    """
+    token = request.cookies.get("sb-access-token") or request.headers.get("Authorization")
+    if not token and request.scope["type"] == "websocket":
+        token = request.query_params.get("access_token")
+    if not token:
+        logger.warning("Tentative d'accès sans token.")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token manquant",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if token.startswith("Bearer "):
+        token = token.split(" ")[1]
+    return token
+
+
+async def _remote_user(token: str):
+    """Vérification par GoTrue (aller-retour réseau) : session révoquée ou utilisateur supprimé détectés."""
+    response = await init_async_supabase().auth.get_user(token)
+    if response is None or response.user is None:
+        logger.error("Token invalide fourni.")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide")
+    return response.user
+
+
+async def authenticate(request: HTTPConnection, remote: bool = False):
+    """
+    Résout l'utilisateur de la requête, une seule fois par requête.
+
+    Le résultat est mémorisé dans request.state.current_user : les dépendances et
+    décorateurs suivants le réutilisent. Une vérification distante (remote) n'est
+    refaite que si la première était locale.
+    """
+    user = getattr(request.state, "current_user", None)
+    if user is not None and (not remote or getattr(request.state, "auth_method", None) == "remote"):
+        return user
+
+    token = request_token(request)
+    if await RevocationStore.instance().is_revoked(token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token révoqué",
+                            headers={"WWW-Authenticate": "Bearer"})
+    verifier = TokenVerifier.instance()
+    try:
+        method = "remote" if remote or verifier.requires_remote(request.url.path) else "local"
+        if method == "local":
+            try:
+                user = await verifier.verify_async(token)
+            except LocalVerificationUnavailable as e:
+                logger.debug(f"Vérification locale impossible ({e}), appel à Supabase")
+                method = "remote"
+        if method == "remote":
+            user = await _remote_user(token)
+    except HTTPException:
+        raise
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token expiré",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    except Exception:
+        logger.exception("Erreur d'authentification JWT")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Erreur d'authentification JWT",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    request.state.current_user = user
+    request.state.auth_method = method
+    return user
+
+
+async def authenticate_websocket(websocket: WebSocket):
+    """Authentifie une connexion WebSocket avant son acceptation ; la refuse (403) sinon."""
+    try:
+        return await authenticate(websocket)
+    except HTTPException as e:
+        logger.warning(f"Connexion WebSocket refusée : {e.detail}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return None
+
+
+async def get_current_user(request: Request):
+    """Dépendance FastAPI : utilisateur authentifié de la requête (401 sinon)."""
+    return await authenticate(request)
+
+
+async def get_current_active_user(current_user=Depends(get_current_user)):
+    """Refuse les utilisateurs bannis ou désactivés."""
+    metadata = getattr(current_user, "app_metadata", None) or {}
+    if getattr(current_user, "banned_until", None) or metadata.get("disabled"):
+        raise HTTPException(status_code=400, detail="Utilisateur inactif")
+    return current_user
+
+
+async def get_current_profile(current_user=Depends(get_current_user), db=Depends(get_db)) -> Optional[Dict[str, Any]]:
+    """Profil (table profiles) de l'utilisateur authentifié, mis en cache quelques instants."""
+
+    async def load():
+        response = await db.table("profiles").select("*").eq("id", current_user.id).execute()
+        return response.data[0] if response.data else None
+
+    return await profile_cache.get_or_load(current_user.id, load)
+
+
+def invalidate_profile(user_id: Optional[str] = None) -> None:
+    """À appeler après une modification de profil (ou de tous les profils si user_id est None)."""
+    profile_cache.invalidate(user_id)
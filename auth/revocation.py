@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import itertools
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import jwt
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_DISPONIBLE = True
+except ImportError:
+    REDIS_DISPONIBLE = False
+
+logger = logging.getLogger(__name__)
+
+# "memory" (un seul processus), "sqlite" (fichier partagé entre workers) ou "redis"
+AUTH_REVOCATION_BACKEND = os.getenv("AUTH_REVOCATION_BACKEND", "sqlite")
+AUTH_REVOCATION_SQLITE = os.getenv(
+    "AUTH_REVOCATION_SQLITE", os.path.join(os.path.dirname(os.path.dirname(__file__)), "revocations.db")
+)
+AUTH_REVOCATION_REDIS_URL = os.getenv("AUTH_REVOCATION_REDIS_URL", "redis://localhost:6379/0")
+# Durée de révocation d'un jeton sans exp
+DEFAULT_REVOCATION_TTL = 24 * 3600
+
+# Chaque stockage numérote ses révocations dans l'ordre où elles sont enregistrées :
+# added_since(curseur) retourne les paires (clé, curseur) postérieures, dans cet ordre.
+# Une horloge murale ne convient pas : une révocation validée plus tard par un autre
+# worker peut porter une date antérieure à celle déjà lue.
+
+
+def token_key(token: str) -> str:
+    """Clé de révocation : jti du jeton s'il existe, sinon empreinte SHA-256 du jeton."""
+    try:
+        jti = jwt.decode(token, options={"verify_signature": False}).get("jti")
+    except jwt.PyJWTError:
+        jti = None
+    return f"jti:{jti}" if jti else hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_expiry(token: str) -> float:
+    """Fin de validité du jeton : au-delà, inutile de le garder dans la liste de révocation."""
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.PyJWTError:
+        exp = None
+    return float(exp) if exp else time.time() + DEFAULT_REVOCATION_TTL
+
+
+class BloomFilter:
+    """Filtre de Bloom : « absent » est certain, « présent » doit être confirmé par le stockage."""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class MemoryRevocationBackend:
+    """Révocations en mémoire, purgées à expiration ; limitées à un seul processus."""
+
+    def __init__(self, sweep_interval: float = 300.0):
+        self.sweep_interval = sweep_interval
+        self._entries: Dict[str, Tuple[int, float]] = {}  # clé -> (numéro d'ajout, expiration)
+        self._sequence = itertools.count(1)
+        self._swept = time.time()
+
+    def _sweep(self) -> None:
+        now = time.time()
+        if now - self._swept >= self.sweep_interval:
+            self._swept = now
+            for key in [key for key, (_, expires) in self._entries.items() if expires <= now]:
+                del self._entries[key]
+
+    async def add(self, key: str, expires: float) -> None:
+        self._sweep()
+        self._entries.pop(key, None)  # Une révocation renouvelée passe en fin d'ordre
+        self._entries[key] = (next(self._sequence), expires)
+
+    async def contains(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[1] > time.time()
+
+    async def added_since(self, cursor: Optional[int]) -> List[Tuple[str, int]]:
+        self._sweep()
+        now = time.time()
+        return [(key, sequence) for key, (sequence, expires) in self._entries.items()
+                if sequence > (cursor or 0) and expires > now]
+
+    async def close(self) -> None:
+        pass
+
+
+class SqliteRevocationBackend:
+    """Révocations dans un fichier SQLite (WAL), partagé par les workers d'une même machine."""
+
+    def __init__(self, path: str = AUTH_REVOCATION_SQLITE, sweep_interval: float = 300.0):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._swept = 0.0
+        self._local = threading.local()
+        with self._connection() as connection:
+            # Verrou d'écriture : les workers qui démarrent ensemble ne migrent qu'une fois
+            connection.execute("BEGIN IMMEDIATE")
+            # AUTOINCREMENT : les numéros ne sont jamais réattribués, même après la purge des dernières lignes
+            connection.execute("CREATE TABLE IF NOT EXISTS revocations ("
+                               "seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE, "
+                               "expires REAL NOT NULL)")
+            legacy = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'revoked'")
+            if legacy.fetchone():
+                # Ancienne table indexée par date d'ajout
+                connection.execute("INSERT OR IGNORE INTO revocations (key, expires) "
+                                   "SELECT key, expires FROM revoked ORDER BY added")
+                connection.execute("DROP TABLE revoked")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def _add(self, key: str, expires: float) -> None:
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO revocations (key, expires) VALUES (?, ?)", (key, expires))
+            if now - self._swept >= self.sweep_interval:
+                self._swept = now
+                connection.execute("DELETE FROM revocations WHERE expires <= ?", (now,))
+
+    def _contains(self, key: str) -> bool:
+        row = self._connection().execute("SELECT 1 FROM revocations WHERE key = ? AND expires > ?",
+                                         (key, time.time())).fetchone()
+        return row is not None
+
+    def _added_since(self, cursor: Optional[int]) -> List[Tuple[str, int]]:
+        return self._connection().execute("SELECT key, seq FROM revocations WHERE seq > ? AND expires > ? "
+                                          "ORDER BY seq", (cursor or 0, time.time())).fetchall()
+
+    async def add(self, key: str, expires: float) -> None:
+        await asyncio.to_thread(self._add, key, expires)
+
+    async def contains(self, key: str) -> bool:
+        return await asyncio.to_thread(self._contains, key)
+
+    async def added_since(self, cursor: Optional[int]) -> List[Tuple[str, int]]:
+        return await asyncio.to_thread(self._added_since, cursor)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisRevocationBackend:
+    """
+    Révocations dans Redis 6.2+ (ou un serveur compatible) : une clé par jeton, expirant avec
+    lui, et un flux (stream) dont les identifiants, attribués par le serveur, servent de
+    curseur à la synchronisation des filtres de Bloom.
+    """
+
+    STREAM = "revoked:stream"
+
+    def __init__(self, url: str = AUTH_REVOCATION_REDIS_URL, client=None):
+        self.client = client if client is not None else aioredis.from_url(url)
+
+    async def add(self, key: str, expires: float) -> None:
+        now = time.time()
+        ttl = max(1, math.ceil(expires - now))
+        oldest = int((now - DEFAULT_REVOCATION_TTL * 30) * 1000)
+        async with self.client.pipeline(transaction=True) as pipeline:
+            pipeline.set(f"revoked:{key}", 1, ex=ttl)
+            pipeline.xadd(self.STREAM, {"key": key}, minid=oldest, approximate=True)
+            await pipeline.execute()
+
+    async def contains(self, key: str) -> bool:
+        return bool(await self.client.exists(f"revoked:{key}"))
+
+    async def added_since(self, cursor: Optional[str]) -> List[Tuple[str, str]]:
+        revocations = []
+        for entry_id, fields in await self.client.xrange(self.STREAM, min=f"({cursor}" if cursor else "-", max="+"):
+            fields = {_decode(name): _decode(value) for name, value in fields.items()}
+            revocations.append((fields["key"], _decode(entry_id)))
+        return revocations
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RevocationStore:
+    """
+    Liste des jetons révoqués (déconnexion), conservés jusqu'à leur expiration.
+
+    Un filtre de Bloom en mémoire répond sans accès au stockage pour l'immense majorité
+    des jetons, qui ne sont pas révoqués ; seuls les positifs sont confirmés par le
+    stockage. Avec un stockage partagé (SQLite, Redis), le filtre récupère toutes les
+    sync_interval secondes les révocations faites par les autres workers.
+    """
+
+    _instance: Optional["RevocationStore"] = None
+
+    def __init__(self, backend=None, bloom_capacity: int = 100000, sync_interval: float = 5.0):
+        self.backend = backend or MemoryRevocationBackend()
+        self.bloom_capacity = bloom_capacity
+        self.sync_interval = sync_interval
+        self.bloom = BloomFilter(bloom_capacity)
+        self.bloom_keys = 0
+        self.checks = 0
+        self.backend_checks = 0
+        self._synced_at = 0.0
+        self._cursor: Any = None
+        self._sync_lock = asyncio.Lock()
+
+    @classmethod
+    def instance(cls) -> "RevocationStore":
+        if cls._instance is None:
+            cls._instance = cls(cls._backend_from_env())
+        return cls._instance
+
+    @staticmethod
+    def _backend_from_env():
+        if AUTH_REVOCATION_BACKEND == "redis":
+            if REDIS_DISPONIBLE:
+                return RedisRevocationBackend()
+            logger.warning("Paquet redis absent : révocations stockées dans SQLite")
+        if AUTH_REVOCATION_BACKEND == "memory":
+            return MemoryRevocationBackend()
+        return SqliteRevocationBackend()
+
+    async def _sync(self) -> None:
+        if time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        async with self._sync_lock:
+            if time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            if self.bloom_keys >= self.bloom_capacity:
+                # Filtre saturé : reconstruit depuis le stockage, sans les révocations expirées
+                self.bloom = BloomFilter(self.bloom_capacity)
+                self.bloom_keys = 0
+                self._cursor = None
+            for key, cursor in await self.backend.added_since(self._cursor):
+                self.bloom.add(key)
+                self.bloom_keys += 1
+                self._cursor = cursor
+            self._synced_at = time.monotonic()
+
+    async def revoke(self, token: str) -> None:
+        key = token_key(token)
+        await self.backend.add(key, token_expiry(token))
+        # La synchronisation suivante la relira : seules les révocations des autres workers manquent au filtre
+        self.bloom.add(key)
+
+    async def is_revoked(self, token: str) -> bool:
+        self.checks += 1
+        await self._sync()
+        key = token_key(token)
+        if key not in self.bloom:
+            return False
+        self.backend_checks += 1
+        return await self.backend.contains(key)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, object]:
+        return {"backend": type(self.backend).__name__, "checks": self.checks,
+                "backend_checks": self.backend_checks, "bloom_keys": self.bloom_keys}
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional
+import logging
+
+from database import init_async_supabase
+
+logger = logging.getLogger(__name__)
+
+# Durée pendant laquelle les rôles chargés sont considérés comme à jour
+AUTH_ROLES_TTL = float(os.getenv("AUTH_ROLES_TTL", "60"))
+# Taille des pages lues dans PostgREST (limité à 1000 lignes par défaut côté serveur)
+PAGE_SIZE = 1000
+
+
+class Authorizations:
+    """
+    Rôles et groupes de tous les utilisateurs, chargés en une fois.
+
+    Les groupes d'un utilisateur sont indexés par identifiant et par nom : in_group
+    accepte l'un ou l'autre.
+    """
+
+    def __init__(self, roles: Dict[str, Iterable[str]], groups: Dict[str, Iterable[str]]):
+        self.roles: Dict[str, FrozenSet[str]] = {user: frozenset(values) for user, values in roles.items()}
+        self.groups: Dict[str, FrozenSet[str]] = {user: frozenset(values) for user, values in groups.items()}
+        self.loaded_at = time.time()
+
+    def has_role(self, user_id: str, *roles: str) -> bool:
+        return not self.roles.get(user_id, frozenset()).isdisjoint(roles)
+
+    def in_group(self, user_id: str, *groups: str) -> bool:
+        return not self.groups.get(user_id, frozenset()).isdisjoint(groups)
+
+    @classmethod
+    def from_rows(cls, user_roles: List[Dict[str, Any]], profiles: List[Dict[str, Any]],
+                  groups: List[Dict[str, Any]]) -> "Authorizations":
+        """Construit l'index depuis les tables user_roles, profiles et groups."""
+        group_names = {str(group["id"]): group.get("name") for group in groups}
+        roles: Dict[str, set] = {}
+        memberships: Dict[str, set] = {}
+        for row in user_roles:
+            if row.get("role"):
+                roles.setdefault(str(row["user_id"]), set()).add(row["role"])
+        for profile in profiles:
+            user_id = str(profile.get("id") or profile.get("user_id"))
+            if profile.get("role"):
+                roles.setdefault(user_id, set()).add(profile["role"])
+            group = profile.get("group_id") or profile.get("group")
+            if group:
+                names = memberships.setdefault(user_id, set())
+                names.add(str(group))
+                if group_names.get(str(group)):
+                    names.add(group_names[str(group)])
+        return cls(roles, memberships)
+
+
+async def _fetch_all(db, table: str, columns: str = "*") -> List[Dict[str, Any]]:
+    """Lit une table entière, page par page."""
+    rows: List[Dict[str, Any]] = []
+    while True:
+        response = await db.table(table).select(columns).range(len(rows), len(rows) + PAGE_SIZE - 1).execute()
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+
+
+async def load_authorizations() -> Authorizations:
+    db = init_async_supabase()
+    user_roles, profiles, groups = await asyncio.gather(_fetch_all(db, "user_roles", "user_id,role"),
+                                                        _fetch_all(db, "profiles"),
+                                                        _fetch_all(db, "groups", "id,name"))
+    return Authorizations.from_rows(user_roles, profiles, groups)
+
+
+class RoleResolver:
+    """
+    Résolution des rôles et groupes pour les contrôles d'accès, sans accès base par requête.
+
+    Toutes les appartenances sont chargées en bloc puis gardées en mémoire. Passé le
+    ttl, l'index en place continue de répondre pendant qu'il est rechargé en tâche de
+    fond ; après une invalidation explicite (modification d'un profil ou d'un groupe),
+    la vérification suivante attend au contraire le rechargement, pour ne pas accorder
+    un droit retiré.
+    """
+
+    _instance: Optional["RoleResolver"] = None
+
+    def __init__(self, loader: Callable[[], Awaitable[Authorizations]] = load_authorizations,
+                 ttl: float = AUTH_ROLES_TTL):
+        self.loader = loader
+        self.ttl = ttl
+        self.loads = 0
+        self._authorizations: Optional[Authorizations] = None
+        self._expires = 0.0
+        self._stale = True
+        self._loading: Optional[asyncio.Future] = None
+
+    @classmethod
+    def instance(cls) -> "RoleResolver":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    async def _load(self, forced: bool) -> Authorizations:
+        try:
+            authorizations = await self.loader()
+        except Exception:
+            logger.exception("Erreur lors du chargement des rôles")
+            # Une invalidation non aboutie reste due : l'index en place n'est plus fiable
+            self._stale = self._stale or forced
+            raise
+        self.loads += 1
+        self._authorizations = authorizations
+        self._expires = time.monotonic() + self.ttl
+        return authorizations
+
+    def _reload(self) -> asyncio.Future:
+        """Un seul rechargement à la fois, partagé par les requêtes qui l'attendent."""
+        if self._loading is None or self._loading.done():
+            forced, self._stale = self._stale, False
+            self._loading = asyncio.ensure_future(self._load(forced))
+            # Récupère l'exception d'un rechargement de fond que personne n'attend
+            self._loading.add_done_callback(lambda future: future.cancelled() or future.exception())
+        return self._loading
+
+    async def authorizations(self) -> Authorizations:
+        # Une invalidation survenue pendant un chargement en impose un nouveau
+        while self._authorizations is None or self._stale:
+            await asyncio.shield(self._reload())
+        if time.monotonic() >= self._expires:
+            self._reload()
+        return self._authorizations
+
+    async def roles(self, user_id: str) -> FrozenSet[str]:
+        return (await self.authorizations()).roles.get(user_id, frozenset())
+
+    async def groups(self, user_id: str) -> FrozenSet[str]:
+        return (await self.authorizations()).groups.get(user_id, frozenset())
+
+    async def has_role(self, user_id: str, *roles: str) -> bool:
+        return (await self.authorizations()).has_role(user_id, *roles)
+
+    async def in_group(self, user_id: str, *groups: str) -> bool:
+        return (await self.authorizations()).in_group(user_id, *groups)
+
+    def invalidate(self) -> None:
+        """À appeler après une modification des rôles, profils ou groupes."""
+        self._stale = True
+
+    def stats(self) -> Dict[str, Any]:
+        authorizations = self._authorizations
+        return {
+            "loads": self.loads,
+            "users": len(authorizations.roles) if authorizations else 0,
+            "loaded_at": authorizations.loaded_at if authorizations else None,
+            "ttl": self.ttl,
+            "stale": self._stale,
+        }
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+import jwt
+from dotenv import load_dotenv
+from jwt import PyJWKClient
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+# Préfixes de routes sensibles toujours vérifiées auprès de Supabase (session révoquée, utilisateur supprimé...)
+AUTH_REMOTE_VERIFY_PATHS = [p for p in os.getenv("AUTH_REMOTE_VERIFY_PATHS", "").split(",") if p]
+
+
+class LocalVerificationUnavailable(RuntimeError):
+    """Le jeton ne peut pas être vérifié localement (clé absente, JWKS injoignable) : vérification distante."""
+
+
+class VerifiedUser:
+    """
+    Utilisateur extrait d'un jeton vérifié localement.
+
+    Expose les mêmes attributs que l'utilisateur GoTrue (id, email, role, app_metadata,
+    user_metadata) pour rester interchangeable avec le résultat de `auth.get_user`.
+    """
+
+    def __init__(self, claims: Dict[str, Any]):
+        self.claims = claims
+        self.id: str = claims["sub"]
+        self.email: Optional[str] = claims.get("email")
+        self.phone: Optional[str] = claims.get("phone")
+        self.role: Optional[str] = claims.get("role")
+        self.aud = claims.get("aud")
+        self.app_metadata: Dict[str, Any] = claims.get("app_metadata") or {}
+        self.user_metadata: Dict[str, Any] = claims.get("user_metadata") or {}
+        self.session_id: Optional[str] = claims.get("session_id")
+        self.expires_at: int = claims["exp"]
+
+    def __repr__(self) -> str:
+        return f"VerifiedUser(id={self.id!r}, email={self.email!r}, role={self.role!r})"
+
+
+class TokenVerifier:
+    """
+    Vérification locale des jetons d'accès Supabase (signature, exp, aud).
+
+    Les jetons HS256 sont vérifiés avec SUPABASE_JWT_SECRET, les jetons asymétriques
+    avec les clés publiées par GoTrue (JWKS, mises en cache). Un jeton déjà vérifié
+    est conservé jusqu'à son expiration dans un cache LRU borné, indexé par son
+    empreinte SHA-256 : le jeton lui-même n'est jamais gardé en mémoire.
+    """
+
+    _instance: Optional["TokenVerifier"] = None
+
+    def __init__(self, secret: Optional[str] = SUPABASE_JWT_SECRET, supabase_url: Optional[str] = SUPABASE_URL,
+                 audience: str = "authenticated", max_entries: int = 10000, leeway: float = 10.0,
+                 remote_paths: Optional[list] = None):
+        self.secret = secret
+        self.audience = audience
+        self.max_entries = max_entries
+        self.leeway = leeway
+        self.remote_paths = AUTH_REMOTE_VERIFY_PATHS if remote_paths is None else remote_paths
+        self.jwks = PyJWKClient(f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json",
+                                cache_keys=True, lifespan=3600) if supabase_url else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, VerifiedUser]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> "TokenVerifier":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def can_verify_locally(self) -> bool:
+        return bool(self.secret) or self.jwks is not None
+
+    def requires_remote(self, path: str) -> bool:
+        """Route sensitive (AUTH_REMOTE_VERIFY_PATHS) ou vérification locale impossible."""
+        return not self.can_verify_locally or any(path.startswith(prefix) for prefix in self.remote_paths)
+
+    @staticmethod
+    def token_hash(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    # --- Cache ---
+
+    def _cached(self, key: bytes) -> Optional[VerifiedUser]:
+        with self._lock:
+            user = self._entries.get(key)
+            if user is None:
+                self.misses += 1
+                return None
+            if user.expires_at + self.leeway <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user
+
+    def _store(self, key: bytes, user: VerifiedUser) -> None:
+        with self._lock:
+            self._entries[key] = user
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        """Retire un jeton du cache (déconnexion)."""
+        with self._lock:
+            self._entries.pop(self.token_hash(token), None)
+
+    # --- Vérification ---
+
+    def _key_for(self, token: str) -> Tuple[Any, str]:
+        algorithm = jwt.get_unverified_header(token).get("alg")
+        if algorithm == "HS256":
+            if not self.secret:
+                raise LocalVerificationUnavailable("SUPABASE_JWT_SECRET n'est pas configuré")
+            return self.secret, algorithm
+        if algorithm not in ("RS256", "ES256"):
+            raise jwt.InvalidAlgorithmError(f"Algorithme non accepté : {algorithm}")
+        if self.jwks is None:
+            raise LocalVerificationUnavailable("SUPABASE_URL n'est pas configuré : JWKS indisponible")
+        try:
+            return self.jwks.get_signing_key_from_jwt(token).key, algorithm
+        except jwt.PyJWKClientConnectionError as e:
+            raise LocalVerificationUnavailable(f"JWKS injoignable : {e}")
+
+    def _decode(self, token: str, key: Any, algorithm: str) -> VerifiedUser:
+        claims = jwt.decode(token, key, algorithms=[algorithm], audience=self.audience, leeway=self.leeway,
+                            options={"require": ["exp", "sub"]})
+        return VerifiedUser(claims)
+
+    def verify(self, token: str) -> VerifiedUser:
+        """
+        Vérifie le jeton ; lève jwt.InvalidTokenError (ou une sous-classe) s'il est refusé,
+        LocalVerificationUnavailable s'il doit être vérifié par Supabase.
+        """
+        key = self.token_hash(token)
+        user = self._cached(key)
+        if user is None:
+            user = self._decode(token, *self._key_for(token))
+            self._store(key, user)
+        return user
+
+    async def verify_async(self, token: str) -> VerifiedUser:
+        """Comme verify, la récupération éventuelle des clés JWKS se faisant hors de la boucle d'événements."""
+        key = self.token_hash(token)
+        user = self._cached(key)
+        if user is None:
+            if jwt.get_unverified_header(token).get("alg") == "HS256":
+                signing_key = self._key_for(token)
+            else:
+                signing_key = await asyncio.to_thread(self._key_for, token)
+            user = self._decode(token, *signing_key)
+            self._store(key, user)
+        return user
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "local": self.can_verify_locally,
+            "remote_paths": self.remote_paths
+        }
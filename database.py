@@ -1,6 +1,9 @@
 import os
+import httpx
 from fastapi import HTTPException
-from supabase import Client
+from supabase import AsyncClient, AsyncClientOptions, Client
+from supabase._async.auth_client import AsyncSupabaseAuthClient
+from postgrest import AsyncPostgrestClient
 from config import settings
 import logging
 from typing import Optional
@@ -23,11 +26,19 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE = os.getenv("SUPABASE_SERVICE_ROLE")  # Utiliser la clé de rôle de service
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")  # Utiliser la clé secrète JWT
 
+# Pool de connexions HTTP/2 vers PostgREST et GoTrue, partagé par toutes les requêtes
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "100"))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", "50"))
+DB_POOL_KEEPALIVE_EXPIRY = float(os.getenv("DB_POOL_KEEPALIVE_EXPIRY", "60"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "30"))
+# Attente maximale d'une connexion libre du pool avant erreur
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
 # Initialisation du client Supabase
 supabase: Optional[Client] = None
 
 def init_supabase() -> Client:
-    """Initialise et retourne le client Supabase"""
+    """Initialise et retourne le client Supabase synchrone (scripts hors du serveur)"""
     global supabase
     if supabase is None:
         try:
@@ -38,9 +49,92 @@ def init_supabase() -> Client:
             raise
     return supabase
 
-def get_db() -> Client:
-    """Retourne le client Supabase pour les dépendances FastAPI"""
-    return init_supabase()
+def _pooled_http_client(**kwargs) -> httpx.AsyncClient:
+    """Client HTTP/2 à connexions persistantes, dimensionné par les variables DB_POOL_*."""
+    return httpx.AsyncClient(
+        http2=True,
+        follow_redirects=True,
+        timeout=httpx.Timeout(DB_TIMEOUT, pool=DB_POOL_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=DB_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=DB_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=DB_POOL_KEEPALIVE_EXPIRY,
+        ),
+        **kwargs
+    )
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """Client PostgREST asynchrone utilisant le pool de connexions configuré."""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+        return _pooled_http_client(base_url=base_url, headers=headers, verify=verify, proxy=proxy)
+
+
+class PooledAsyncClient(AsyncClient):
+    """
+    Client Supabase asynchrone du serveur : requêtes PostgREST et GoTrue sur des
+    connexions HTTP/2 persistantes, sans bloquer la boucle d'événements.
+
+    Le client agit toujours avec la clé service_role : une connexion utilisateur
+    (sign_in_with_password) ne change pas l'en-tête Authorization des requêtes
+    suivantes, qui sont partagées par toutes les requêtes HTTP.
+    """
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=DB_TIMEOUT, verify=True, proxy=None):
+        return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout,
+                                     verify=verify, proxy=proxy)
+
+    @staticmethod
+    def _init_supabase_auth_client(auth_url, client_options, verify=True, proxy=None):
+        return AsyncSupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            flow_type=client_options.flow_type,
+            http_client=_pooled_http_client(verify=verify, proxy=proxy),
+        )
+
+    def _listen_to_auth_events(self, event, session) -> None:
+        pass
+
+
+async_supabase: Optional[AsyncClient] = None
+
+def init_async_supabase() -> AsyncClient:
+    """Initialise et retourne le client Supabase asynchrone partagé"""
+    global async_supabase
+    if async_supabase is None:
+        try:
+            async_supabase = PooledAsyncClient(SUPABASE_URL, SUPABASE_SERVICE_ROLE, AsyncClientOptions(
+                auto_refresh_token=False,
+                persist_session=False,
+                postgrest_client_timeout=DB_TIMEOUT,
+            ))
+            logger.info("Client Supabase asynchrone initialisé")
+        except Exception as e:
+            logger.error(f"Échec de l'initialisation du client Supabase asynchrone : {e}")
+            raise
+    return async_supabase
+
+
+async def get_db() -> AsyncClient:
+    """Retourne le client Supabase asynchrone pour les dépendances FastAPI"""
+    return init_async_supabase()
+
+
+async def close_db() -> None:
+    """Ferme les connexions du pool (arrêt de l'application)."""
+    global async_supabase
+    if async_supabase is None:
+        return
+    client, async_supabase = async_supabase, None
+    if client._postgrest is not None:
+        await client._postgrest.aclose()
+    await client.auth.close()
 
 
 def resolve_token(token: str):
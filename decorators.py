@@ -1,7 +1,9 @@
+import asyncio
 from functools import wraps
 from fastapi import HTTPException, Request, status, Depends
 from config import Settings
-from database import init_supabase
+from auth.dependencies import authenticate
+from auth.roles import RoleResolver
 
 # Charger la configuration
 config = Settings.load_config()
@@ -14,51 +16,38 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def jwt_required(func):
-    @wraps(func)
-    async def wrapper(*args, request: Request, **kwargs):
-        db = init_supabase()
-        try:
-            token = request.cookies.get("sb-access-token") or request.headers.get("Authorization")
-
-            if not token:
-                logger.warning("Tentative d'accès sans token.")
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token manquant",
-                    headers={"WWW-Authenticate": "Bearer"}
-                )
-
-            if token.startswith("Bearer "):
-                token = token.split(" ")[1]
-
-            response = db.auth.get_user(token)
+def jwt_required(func=None, *, remote: bool = False):
+    """
+    Authentifie la requête et place l'utilisateur dans request.state.current_user.
 
-            if response.user is None:
-                logger.error("Token invalide fourni.")
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide")
-
-            request.state.current_user = response.user
-        
-        except Exception as e:
-            logger.exception("Erreur d'authentification JWT")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Erreur d'authentification JWT",
-                headers={"WWW-Authenticate": "Bearer"}
-            )
+    Délègue à auth.dependencies.authenticate, partagé avec la dépendance
+    get_current_user : une requête n'est vérifiée qu'une fois. L'appel à Supabase
+    n'est fait que pour les routes sensibles (@jwt_required(remote=True) ou
+    AUTH_REMOTE_VERIFY_PATHS) et lorsque la vérification locale n'est pas possible.
+    """
+    if func is None:
+        return lambda f: jwt_required(f, remote=remote)
 
+    @wraps(func)
+    async def wrapper(*args, request: Request, **kwargs):
+        await authenticate(request, remote=remote)
         return await func(*args, request=request, **kwargs)
     
     return wrapper
 
 # 📌 Décorateur pour vérifier le rôle de l'utilisateur
-def role_required(required_role: str):
+def role_required(*roles: str):
+    """
+    Réserve la route aux utilisateurs ayant l'un des rôles (tables user_roles / profiles).
+
+    Les rôles sont lus dans l'index en mémoire de RoleResolver : le contrôle n'ajoute
+    aucun accès à la base ni à Supabase Auth.
+    """
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, request: Request, **kwargs):
-            current_user = request.state.current_user
-            if current_user.role != required_role:
+            current_user = await authenticate(request)
+            if not await RoleResolver.instance().has_role(current_user.id, *roles):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Accès refusé : rôle insuffisant"
@@ -66,3 +55,50 @@ def role_required(required_role: str):
             return await func(*args, request=request, **kwargs)
         return wrapper
     return decorator
+
+# 📌 Décorateur pour vérifier l'appartenance à un groupe
+def group_required(*groups: str):
+    """Réserve la route aux membres de l'un des groupes (identifiant ou nom)."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, request: Request, **kwargs):
+            current_user = await authenticate(request)
+            if not await RoleResolver.instance().in_group(current_user.id, *groups):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Accès refusé : groupe non autorisé"
+                )
+            return await func(*args, request=request, **kwargs)
+        return wrapper
+    return decorator
+
+# 📌 Décorateur pour annuler le traitement si le client HTTP se déconnecte
+def cancel_on_disconnect(func):
+    """
+    Exécute le gestionnaire dans une tâche annulée dès que le client se déconnecte.
+
+    L'annulation se propage jusqu'à AsyncAdbCommandExecutor qui tue alors le
+    processus adb en cours. À réserver aux routes qui ne lisent pas elles-mêmes
+    le corps de la requête.
+    """
+    @wraps(func)
+    async def wrapper(*args, request: Request, **kwargs):
+        handler = asyncio.ensure_future(func(*args, request=request, **kwargs))
+        watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+        try:
+            await asyncio.wait({handler, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+        if not handler.done():
+            handler.cancel()
+            logger.info(f"Client déconnecté, requête annulée : {request.url.path}")
+            raise HTTPException(status_code=499, detail="Client déconnecté")
+        return handler.result()
+
+    return wrapper
+
+async def _wait_for_disconnect(request: Request):
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
@@ -1,9 +1,9 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import Depends, FastAPI, HTTPException, status, Request
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from jose import JWTError, jwt
 from config import Settings
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -17,9 +17,22 @@ from routes.applications import router as application_router
 from routes.message import router as phone_router
 from routes.screen import router as screen_router
 from routes.comments import router as comment_router
+from routes.fleet import router as fleet_router
+from routes.logs import router as logs_router
+from routes.files import router as files_router
 
 
-from database import get_db
+from database import close_db, get_db
+from auth.dependencies import authenticate, get_current_user, get_current_active_user, request_token
+from auth.revocation import RevocationStore
+from auth.token_verifier import TokenVerifier
+from adb.adb_shell_session import DeviceShellSession
+from adb.adb_device_registry import DeviceRegistry
+from adb.adb_logcat import LogcatReader
+from adb.adb_logcat_archive import LogcatArchive
+from adb.adb_screen_broadcaster import ScreenBroadcaster
+from adb.adb_screen_recorder import ScreenRecorder
+from adb.adb_screen_transcoder import ScreenTranscoder
 
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 
@@ -32,8 +45,24 @@ logger = logging.getLogger(__name__)
 # Charger la configuration depuis un fichier externe
 config = Settings.load_config()
 
+# Ressources ADB partagées, libérées à l'arrêt du serveur
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    DeviceRegistry.instance().start()
+    LogcatArchive.instance()  # Archivage automatique des périphériques si LOGCAT_ARCHIVE_AUTO=1
+    yield
+    await DeviceRegistry.instance().stop()
+    await ScreenRecorder.stop_all()
+    await ScreenBroadcaster.close_all()
+    ScreenTranscoder.close()
+    await LogcatArchive.instance().stop_all()
+    await LogcatReader.close_all()
+    await DeviceShellSession.close_all()
+    await RevocationStore.instance().close()
+    await close_db()
+
 # Initialisation de l'application FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configuration CORS - doit être avant l'inclusion des routes
 app.add_middleware(
@@ -47,14 +76,18 @@ app.add_middleware(
 )
 
 # Inclure les routeurs
-app.include_router(user_router, dependencies=[Depends(get_db)])
-app.include_router(group_router, dependencies=[Depends(get_db)])
-app.include_router(session_router, dependencies=[Depends(get_db)])
+# Routeurs de données : toutes leurs routes exigent un utilisateur authentifié (résolu une fois par requête)
+app.include_router(user_router, dependencies=[Depends(get_db), Depends(get_current_user)])
+app.include_router(group_router, dependencies=[Depends(get_db), Depends(get_current_user)])
+app.include_router(session_router, dependencies=[Depends(get_db), Depends(get_current_user)])
 app.include_router(device_router, dependencies=[Depends(get_db)])
 app.include_router(system_router, dependencies=[Depends(get_db)])
-app.include_router(application_router, dependencies=[Depends(get_db)])
+app.include_router(application_router, dependencies=[Depends(get_db), Depends(get_current_user)])
+app.include_router(fleet_router)
+app.include_router(logs_router)
+app.include_router(files_router)
 #app.include_router(phone_router, dependencies=[Depends(get_db)])
-#app.include_router(screen_router,dependencies=[Depends(get_db)])
+app.include_router(screen_router)
 # app.include_router(comment_router, dependencies=[Depends(get_db)])
 
 # Modèle Pydantic pour la connexion
@@ -62,17 +95,6 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
-def get_user(db, username: str):
-    try:
-        # Vérifier si la table auth.users existe
-        result = db.table("auth.users").select("*").eq("email", username).execute()
-        if result.data:
-            return result.data[0]
-        return None
-    except Exception as e:
-        logger.error(f"Erreur lors de la récupération de l'utilisateur: {str(e)}")
-        return None
-
 # Route de login
 @app.post("/auth/login")
 async def login(request: Request, db = Depends(get_db)):
@@ -93,7 +115,7 @@ async def login(request: Request, db = Depends(get_db)):
         
         try:
             # Tentative de connexion avec Supabase
-            response = db.auth.sign_in_with_password({
+            response = await db.auth.sign_in_with_password({
                 "email": email, 
                 "password": password
             })
@@ -143,31 +165,16 @@ async def login(request: Request, db = Depends(get_db)):
         )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-blacklist = set()
-
-# --- Dépendances ---
-async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_db)):
-    try:
-        payload = jwt.decode(token, config.get("SECRET_KEY"), algorithms=config.get("ALGORITHM"))
-        username: str = payload.get("sub")
-        if username is None or token in blacklist:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user = get_user(db, username)
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
-
-async def get_current_active_user(current_user = Depends(get_current_user)):
-    if current_user["disabled"]:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
 
 # Route de logout
 @app.post("/auth/logout")
-async def logout(token: str = Depends(oauth2_scheme)):
-    blacklist.add(token)
+async def logout(request: Request):
+    """Révoque le jeton jusqu'à son expiration, pour tous les workers."""
+    # Seul un jeton valide (signature, exp) est enregistré : pas de clés arbitraires dans le stockage
+    await authenticate(request)
+    token = request_token(request)
+    await RevocationStore.instance().revoke(token)
+    TokenVerifier.instance().discard(token)
     return {"message": "Déconnexion réussie"}
 
 # Route de mot de passe oublié
@@ -184,7 +191,7 @@ async def forgot_password(request: Request, db = Depends(get_db)):
     
     try:
         logger.info(f"Envoi d'email de réinitialisation pour: {email}")
-        db.auth.reset_password_for_email(email)
+        await db.auth.reset_password_for_email(email)
         return {
             "message": "Si l'email existe dans notre système, vous recevrez un email de réinitialisation",
             "email": email
@@ -239,7 +246,8 @@ async def custom_404_handler(request: Request, call_next):
 async def custom_http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
-        content={"message": exc.detail}
+        content={"message": exc.detail},
+        headers=getattr(exc, "headers", None)
     )
 
 # Route de développement pour Swagger UI
@@ -1,40 +1,53 @@
+import json
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from adb.adb_apk_store import ApkFormatError, ApkStore
+from adb.adb_fleet import AdbFleet
 from adb.adb_services_applications import AdbApplications
 import os
 import logging
-from decorators import jwt_required
+from decorators import jwt_required, cancel_on_disconnect
 from database import get_db
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+class FleetInstallRequest(BaseModel):
+    apks: List[str]  # Empreintes SHA-256 : l'APK de base et ses éventuels splits
+    serials: Optional[List[str]] = None  # None : tous les périphériques en ligne
+    force: bool = False
+    concurrency: int = 4
+
 @router.post("/app/install")
 @jwt_required
-async def install_application(request:Request, apk_path: str):
+async def install_application(request:Request, apk_path: str, serial: Optional[str] = None):
     """Installe une application à partir d'un fichier APK."""
     logger.debug(f"Entrée dans la fonction install_application avec apk_path={apk_path}")
     if not os.path.isfile(apk_path) or not apk_path.endswith('.apk'):
         logger.warning(f"Chemin APK invalide: {apk_path}")
         raise HTTPException(status_code=400, detail=f"Le chemin APK '{apk_path}' est invalide ou le fichier n'existe pas.")
-    result = AdbApplications.install(apk_path)
+    result = await AdbApplications.install_app_async(apk_path, serial)
     logger.debug(f"Résultat de l'installation: {result}")
     return result
 
 @router.post("/app/uninstall")
 @jwt_required
-async def uninstall_application(request:Request,package_name: str):
+async def uninstall_application(request:Request,package_name: str, serial: Optional[str] = None):
     """Désinstalle une application en utilisant son nom de package."""
     logger.debug(f"Entrée dans la fonction uninstall_application avec package_name={package_name}")
-    result = AdbApplications.uninstall(package_name)
+    result = await AdbApplications.uninstall_app_async(package_name, serial)
     logger.debug(f"Résultat de la désinstallation: {result}")
     return result
 
 @router.get("/app/list/shop")
 @jwt_required
-async def list_applications(request:Request):
+@cancel_on_disconnect
+async def list_applications(request:Request, serial: Optional[str] = None):
     """Liste toutes les applications disponibles (installées et non installées, etc ...) dans la boutique."""
     logger.debug("Entrée dans la fonction list_installed_applications")
-    apps = AdbApplications.list_installed()
+    apps = await AdbApplications.list_installed_apps_async(serial)
     logger.debug(f"Applications installées: {apps}")
     return apps
 
@@ -45,7 +58,7 @@ async def list_applications_available(request:Request,user_id:str,db = Depends(g
     
     logger.debug("Entrée dans la fonction list_applications_available")
     try:
-        response = db.table("applications_users").select(
+        response = await db.table("applications_users").select(
         "applications(name,description,url), status"
         ).eq("user_id", user_id).execute()
 
@@ -60,58 +73,113 @@ async def list_applications_available(request:Request,user_id:str,db = Depends(g
 
 @router.get("/app/list/used")
 @jwt_required
-async def list_used_applications(request:Request):
+@cancel_on_disconnect
+async def list_used_applications(request:Request, serial: Optional[str] = None):
     """
     Liste toutes les applications utilisées sur le périphérique, 
     incluant les applications système.
     """
     logger.debug("Entrée dans la fonction list_used_applications")
-    apps = AdbApplications.list_installed()
+    apps = await AdbApplications.list_installed_apps_async(serial)
     logger.debug(f"Applications installées: {apps}")
     return apps
 
 @router.get("/app/list/uninstalled")
 @jwt_required
-async def list_uninstalled_applications(request:Request):
+@cancel_on_disconnect
+async def list_uninstalled_applications(request:Request, serial: Optional[str] = None):
     """Liste toutes les applications disponibles(non installées)  sur le périphérique."""
     logger.debug("Entrée dans la fonction list_installed_applications")
-    apps = AdbApplications.list_installed()
+    apps = await AdbApplications.list_installed_apps_async(serial)
     logger.debug(f"Applications installées: {apps}")
     return apps
 
 
 @router.get("/app/info")
 @jwt_required
-async def get_application_info(request:Request,package_name: str):
+async def get_application_info(request:Request,package_name: str, serial: Optional[str] = None):
     """Obtient les informations d'une application spécifique."""
     logger.debug(f"Entrée dans la fonction get_application_info avec package_name={package_name}")
-    info = AdbApplications.get_info(package_name)
+    info = await AdbApplications.app_info_async(package_name, serial)
     logger.debug(f"Informations de l'application {package_name}: {info}")
     return info
 
 @router.post("/app/start")
 @jwt_required
-async def start_application(request:Request,package_name: str):
-    """Démarre une application en utilisant son nom de package."""
+async def start_application(request:Request,package_name: str, activity: Optional[str] = None,
+                            serial: Optional[str] = None):
+    """Démarre une application en utilisant son nom de package (activité principale si activity est omis)."""
     logger.debug(f"Entrée dans la fonction start_application avec package_name={package_name}")
-    result = AdbApplications.start(package_name)
+    if activity:
+        result = await AdbApplications.start_app_async(package_name, activity, serial)
+    else:
+        result = await AdbApplications.launch_app_async(package_name, serial)
     logger.debug(f"Résultat du démarrage: {result}")
     return result
 
 @router.post("/app/stop")
 @jwt_required
-async def stop_application(request:Request,package_name: str):
+async def stop_application(request:Request,package_name: str, serial: Optional[str] = None):
     """Arrête une application en utilisant son nom de package."""
     logger.debug(f"Entrée dans la fonction stop_application avec package_name={package_name}")
-    result = AdbApplications.stop(package_name)
+    result = await AdbApplications.stop_app_async(package_name, serial)
     logger.debug(f"Résultat de l'arrêt: {result}")
     return result
 
 @router.get("/app/is_running")
 @jwt_required
-async def is_application_running(request:Request,package_name: str):
+async def is_application_running(request:Request,package_name: str, serial: Optional[str] = None):
     """Vérifie si une application est en cours d'exécution."""
     logger.debug(f"Entrée dans la fonction is_application_running avec package_name={package_name}")
-    result = AdbApplications.is_running(package_name)
+    result = await AdbApplications.is_running_async(package_name, serial)
     logger.debug(f"Résultat de la vérification: {result}")
-    return result
\ No newline at end of file
+    return result
+
+@router.post("/app/store")
+@jwt_required
+async def add_to_store(request: Request, filename: Optional[str] = None):
+    """Ajoute au dépôt l'APK envoyé dans le corps de la requête ; un APK déjà connu n'est pas dupliqué."""
+    logger.debug(f"Entrée dans la fonction add_to_store avec filename={filename}")
+    try:
+        entry = await ApkStore.instance().add_stream(request.stream(), filename)
+        logger.debug(f"APK enregistré dans le dépôt: {entry}")
+        return entry
+    except ApkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/app/store")
+@jwt_required
+async def list_store(request: Request, package: Optional[str] = None):
+    """Liste les APK du dépôt, éventuellement filtrés par paquet."""
+    return {"apks": ApkStore.instance().list(package)}
+
+@router.delete("/app/store/{sha256}")
+@jwt_required
+async def remove_from_store(request: Request, sha256: str):
+    """Supprime un APK du dépôt."""
+    if not ApkStore.instance().remove(sha256):
+        raise HTTPException(status_code=404, detail="APK inconnu")
+    return {"result": "Succès"}
+
+@router.post("/app/fleet/install")
+@jwt_required
+async def install_on_fleet(request: Request, install_request: FleetInstallRequest):
+    """Installe un APK du dépôt sur plusieurs périphériques et diffuse chaque résultat (NDJSON)."""
+    logger.debug(f"Entrée dans la fonction install_on_fleet avec apks={install_request.apks}")
+    if install_request.concurrency < 1:
+        raise HTTPException(status_code=400, detail="La concurrence doit être au moins égale à 1")
+    try:
+        ApkStore.instance().resolve_bundle(install_request.apks)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e).strip("'\""))
+
+    async def stream():
+        try:
+            async for result in AdbFleet.install(install_request.apks, install_request.serials,
+                                                 install_request.force, install_request.concurrency):
+                yield json.dumps(result, default=str, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Erreur lors de l'installation sur la flotte : {e}")
+            yield json.dumps({"statut": "Erreur", "message": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -1,8 +1,14 @@
-import requests
+import asyncio
+import json
+from contextlib import aclosing
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from adb.adb_device_registry import DeviceRegistry
+from adb.adb_logcat import LogcatFilter, LogcatReader
+from adb.adb_property_cache import DevicePropertyCache
 from adb.adb_services_devices import AdbDevice
-from decorators import jwt_required
+from decorators import jwt_required, cancel_on_disconnect
 from typing import Optional
 
 import logging
@@ -17,23 +23,115 @@ class DeviceRequest(BaseModel):
 
 @router.get("/devices/list")
 async def list_devices(request: Request):
-    """Liste les périphériques connectés via ADB."""
+    """Liste les périphériques connectés via ADB, depuis le registre en mémoire."""
     logger.debug("Entrée dans la fonction list_devices")
     try:
-        #devices = AdbDevice.list_devices()
-        response = requests.get("http://128.79.8.91:5465/devices/list")
-        logger.debug(f"Périphériques détectés : {response}")
-        return {"status": "success", "devices": response}
+        registry = DeviceRegistry.instance()
+        if registry.ready.is_set():
+            devices = registry.list()
+        else:
+            devices = await AdbDevice.list_devices_async()
+        logger.debug(f"Périphériques détectés : {devices}")
+        return {"status": "success", "devices": devices}
     except Exception as e:
         logger.error(f"Erreur lors de la liste des périphériques : {e}")
         return {"status": "error", "details": "Erreur lors de la liste des périphériques"}
+
+@router.get("/devices/events")
+@jwt_required
+async def device_events(request: Request):
+    """Diffuse (SSE) les connexions, déconnexions et changements d'état des périphériques."""
+    registry = DeviceRegistry.instance()
+
+    async def stream():
+        queue = registry.subscribe()
+        try:
+            yield f"event: snapshot\ndata: {json.dumps(registry.list())}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            registry.unsubscribe(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@router.get("/devices/cache/stats")
+@jwt_required
+async def property_cache_stats(request: Request):
+    """Statistiques du cache des propriétés statiques (succès, échecs, entrées)."""
+    return DevicePropertyCache.instance().stats()
+
+def _logcat_filter(tag: Optional[str], priority: str, pid: Optional[int], regex: Optional[str]) -> LogcatFilter:
+    try:
+        return LogcatFilter([t for t in (tag or "").split(",") if t], priority, pid, regex)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def require_known_device(serial: str) -> None:
+    """Lève une 404 si le numéro de série n'est ni dans le registre ni dans `adb devices`."""
+    registry = DeviceRegistry.instance()
+    if registry.ready.is_set():
+        known = registry.get(serial) is not None
+    else:
+        known = any(device["device"] == serial for device in await AdbDevice.list_devices_async())
+    if not known:
+        raise HTTPException(status_code=404, detail=f"Périphérique inconnu : {serial}")
+
+async def _logcat_reader(serial: str) -> LogcatReader:
+    """Lecteur logcat d'un périphérique connu ; 404 pour un numéro de série inconnu."""
+    await require_known_device(serial)
+    return LogcatReader.for_device(serial)
+
+@router.get("/devices/logcat/status")
+@jwt_required
+async def logcat_status(request: Request):
+    """État des lectures logcat en cours (abonnés, entrées en mémoire, entrées abandonnées)."""
+    return {"readers": [reader.stats() for reader in LogcatReader.running()]}
+
+@router.get("/devices/{serial}/logcat")
+@jwt_required
+async def logcat_recent(request: Request, serial: str, tag: Optional[str] = None, priority: str = "V",
+                        pid: Optional[int] = None, regex: Optional[str] = None, limit: int = 200):
+    """
+    Dernières entrées du journal du périphérique, filtrées sur le serveur.
+
+    tag : tags séparés par des virgules ; priority : priorité minimale (V, D, I, W, E, F).
+    """
+    log_filter = _logcat_filter(tag, priority, pid, regex)
+    reader = await _logcat_reader(serial)
+    reader.start()
+    await reader.wait_loaded()
+    return {"serial": serial, "entries": [entry.to_dict() for entry in reader.recent(log_filter, limit)]}
+
+@router.get("/devices/{serial}/logcat/stream")
+@jwt_required
+async def logcat_stream(request: Request, serial: str, tag: Optional[str] = None, priority: str = "V",
+                        pid: Optional[int] = None, regex: Optional[str] = None, history: int = 100):
+    """Diffuse (SSE) les entrées du journal qui passent le filtre, en commençant par les history dernières."""
+    log_filter = _logcat_filter(tag, priority, pid, regex)
+    reader = await _logcat_reader(serial)
+
+    async def stream():
+        async with aclosing(reader.tail(log_filter, history, heartbeat=15)) as entries:
+            async for entry in entries:
+                if entry is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"data: {json.dumps(entry.to_dict())}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
 @router.get("/devices/{serial}")
 @jwt_required
-async def device_info(serial: str):
+@cancel_on_disconnect
+async def device_info(request: Request, serial: str):
     """Récupère les informations d'un périphérique spécifique via ADB."""
     logger.debug(f"Entrée dans la fonction device_info avec serial={serial}")
     try:
-        info = AdbDevice.device_info(serial)
+        info = await AdbDevice.device_info_async(serial)
         logger.debug(f"Informations du périphérique {serial} : {info}")
         return info
     except Exception as e:
@@ -49,8 +147,8 @@ async def connect_device(request: Request, connect_request: DeviceRequest):
         status="Erreur"
         if not connect_request.ip or connect_request.ip == "auto":
             if connect_request.device:
-                connect_request.ip=AdbDevice.get_ip(connect_request.device)
-        result = AdbDevice.connect(connect_request.ip, connect_request.port)
+                connect_request.ip=await AdbDevice.get_ip_async(connect_request.device)
+        result = await AdbDevice.connect_async(connect_request.ip, connect_request.port)
 
         if result.get("statut") == 'Erreur':
             detail=f"Erreur {result.get('message')}: {result.get('detail')}"
@@ -77,7 +175,7 @@ async def disconnect_device(request: Request, disconnect_request: DeviceRequest)
     logger.debug(f"Entrée dans la fonction disconnect_device avec IP={disconnect_request.ip}")
     status = "Erreur"
     try:
-        result = AdbDevice.disconnect(disconnect_request.ip)
+        result = await AdbDevice.disconnect_async(disconnect_request.ip)
         if result.get("statut") == 'Erreur':
             detail=f"{result.get('message')}"
         elif not result:
@@ -101,7 +199,7 @@ async def disconnect_device(request: Request, disconnect_request: DeviceRequest)
 async def disconnect_device(request: Request, mode: str):
     try:
         detail=""
-        result = AdbDevice.set_mode(mode=mode)
+        result = await AdbDevice.set_mode_async(mode=mode)
         if "restarting" in result:
             return {"message": f"Mode {mode} activé"}
         if "Erreur" in result:
@@ -1,18 +1,72 @@
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from adb.adb_host_client import AdbProtocolError
 from adb.adb_services_files import AdbFiles
 import logging
-from decorators import jwt_required
+from decorators import jwt_required, cancel_on_disconnect
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Seul répertoire du serveur accessible à /files/pull et /files/push
+FILES_TRANSFER_DIR = os.getenv(
+    "FILES_TRANSFER_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "transfers")
+)
+
+# Progression des envois en cours et récents, consultable via /files/upload/{upload_id}
+UPLOADS: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+MAX_TRACKED_UPLOADS = 100
+
+
+def _transfer_path(path: str) -> str:
+    """Chemin local de pull/push, relatif à FILES_TRANSFER_DIR ; 400 s'il en sort."""
+    root = os.path.realpath(FILES_TRANSFER_DIR)
+    resolved = os.path.realpath(os.path.join(root, path.lstrip("/")))
+    if os.path.commonpath([root, resolved]) != root:
+        raise HTTPException(status_code=400, detail=f"Chemin local hors du répertoire de transfert : {path}")
+    return resolved
+
+def _content_disposition(path: str) -> str:
+    """
+    En-tête Content-Disposition d'un téléchargement : nom ASCII de repli, et nom exact
+    encodé en UTF-8 (RFC 5987) pour les noms accentués ou non latins.
+    """
+    name = os.path.basename(path) or "fichier"
+    fallback = "".join(c if c.isascii() and c.isprintable() and c not in '"\\' else "_" for c in name)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Convertit un en-tête Range (une seule plage) en bornes incluses ; None s'il est invalide."""
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    if match.group(1) == "":
+        # Suffixe : les N derniers octets
+        suffix = int(match.group(2))
+        return (max(size - suffix, 0), size - 1) if suffix and size else None
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
 @router.get("/files/list")
 @jwt_required
-async def list_files(request:Request,path: str = "/sdcard"):
+@cancel_on_disconnect
+async def list_files(request:Request,path: str = "/sdcard", serial: Optional[str] = None):
     """Liste les fichiers dans un répertoire donné."""
     logger.debug(f"Entrée dans la fonction list_files avec path={path}")
     try:
-        files = AdbFiles.list_files(path)
+        files = await AdbFiles.list_files_async(path, serial)
         logger.debug(f"Fichiers listés: {files}")
         return {"files": files}
     except Exception as e:
@@ -21,11 +75,13 @@ async def list_files(request:Request,path: str = "/sdcard"):
 
 @router.post("/files/pull")
 @jwt_required
-async def pull_file(request:Request,source: str, destination: str):
-    """Copie un fichier du périphérique vers le système local."""
+async def pull_file(request:Request,source: str, destination: str, serial: Optional[str] = None):
+    """Copie un fichier du périphérique vers le répertoire de transfert du serveur."""
     logger.debug(f"Entrée dans la fonction pull_file avec source={source}, destination={destination}")
+    local = _transfer_path(destination)
     try:
-        result = AdbFiles.pull(source, destination)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        result = await AdbFiles.pull_async(source, local, serial)
         logger.debug(f"Résultat du pull: {result}")
         return {"result": result}
     except Exception as e:
@@ -34,11 +90,12 @@ async def pull_file(request:Request,source: str, destination: str):
 
 @router.post("/files/push")
 @jwt_required
-async def push_file(request:Request,source: str, destination: str):
-    """Copie un fichier du système local vers le périphérique."""
+async def push_file(request:Request,source: str, destination: str, serial: Optional[str] = None):
+    """Copie un fichier du répertoire de transfert du serveur vers le périphérique."""
     logger.debug(f"Entrée dans la fonction push_file avec source={source}, destination={destination}")
+    local = _transfer_path(source)
     try:
-        result = AdbFiles.push(source, destination)
+        result = await AdbFiles.push_async(local, destination, serial)
         logger.debug(f"Résultat du push: {result}")
         return {"result": result}
     except Exception as e:
@@ -47,11 +104,11 @@ async def push_file(request:Request,source: str, destination: str):
 
 @router.delete("/files/del")
 @jwt_required
-async def delete_file(request:Request,path: str):
+async def delete_file(request:Request,path: str, serial: Optional[str] = None):
     """Supprime un fichier sur le périphérique."""
     logger.debug(f"Entrée dans la fonction delete_file avec path={path}")
     try:
-        result = AdbFiles.delete_file(path)
+        result = await AdbFiles.delete_file_async(path, serial)
         logger.debug(f"Résultat de la suppression: {result}")
         return {"result": result}
     except Exception as e:
@@ -60,11 +117,12 @@ async def delete_file(request:Request,path: str):
 
 @router.get("/files/details")
 @jwt_required
-async def file_details(request:Request,path: str):
+@cancel_on_disconnect
+async def file_details(request:Request,path: str, serial: Optional[str] = None):
     """Obtient les détails d'un fichier sur le périphérique."""
     logger.debug(f"Entrée dans la fonction file_details avec path={path}")
     try:
-        details = AdbFiles.file_details(path)
+        details = await AdbFiles.file_details_async(path, serial)
         logger.debug(f"Détails du fichier: {details}")
         return details
     except Exception as e:
@@ -73,11 +131,11 @@ async def file_details(request:Request,path: str):
 
 @router.post("/files/mkdir")
 @jwt_required
-async def create_directory(request:Request,path: str):
+async def create_directory(request:Request,path: str, serial: Optional[str] = None):
     """Crée un répertoire sur le périphérique."""
     logger.debug(f"Entrée dans la fonction create_directory avec path={path}")
     try:
-        result = AdbFiles.create_directory(path)
+        result = await AdbFiles.create_directory_async(path, serial)
         logger.debug(f"Résultat de la création du répertoire: {result}")
         return {"result": result}
     except Exception as e:
@@ -86,13 +144,92 @@ async def create_directory(request:Request,path: str):
 
 @router.post("/files/chmod")
 @jwt_required
-async def change_permissions(request:Request,path: str, permissions: str):
+async def change_permissions(request:Request,path: str, permissions: str, serial: Optional[str] = None):
     """Change les permissions d'un fichier sur le périphérique."""
     logger.debug(f"Entrée dans la fonction change_permissions avec path={path}, permissions={permissions}")
     try:
-        result = AdbFiles.change_permissions(path, permissions)
+        result = await AdbFiles.change_permissions_async(path, permissions, serial)
         logger.debug(f"Résultat du changement de permissions: {result}")
         return {"result": result}
     except Exception as e:
         logger.error(f"Erreur lors du changement de permissions: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/files/download")
+@jwt_required
+async def download_file(request: Request, path: str, serial: Optional[str] = None):
+    """Télécharge un fichier du périphérique en flux continu (prise en charge des requêtes Range)."""
+    logger.debug(f"Entrée dans la fonction download_file avec path={path}")
+    try:
+        size = await AdbFiles.stat_size_async(path, serial)
+    except RuntimeError as e:
+        logger.error(f"Erreur lors de la lecture de la taille de {path}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if size is None:
+        raise HTTPException(status_code=404, detail=f"Fichier introuvable : {path}")
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": _content_disposition(path)
+    }
+    range_header = request.headers.get("range")
+    if range_header:
+        bounds = _parse_range(range_header, size)
+        if bounds is None:
+            raise HTTPException(status_code=416, detail="Plage demandée invalide",
+                                headers={"Content-Range": f"bytes */{size}"})
+        start, end = bounds
+        headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+        body = AdbFiles.stream_file_async(path, start, end - start + 1, serial)
+        return StreamingResponse(body, status_code=206, media_type="application/octet-stream", headers=headers)
+
+    headers["Content-Length"] = str(size)
+    body = AdbFiles.stream_file_async(path, serial=serial)
+    return StreamingResponse(body, media_type="application/octet-stream", headers=headers)
+
+@router.post("/files/upload")
+@jwt_required
+async def upload_file(request: Request, destination: str, serial: Optional[str] = None,
+                      upload_id: Optional[str] = None):
+    """
+    Envoie le corps brut de la requête (éventuellement chunked) vers un fichier du périphérique.
+
+    Les octets passent directement du client HTTP au protocole sync d'ADB, sans copie sur le disque du serveur.
+    """
+    logger.debug(f"Entrée dans la fonction upload_file avec destination={destination}")
+    upload_id = upload_id or uuid.uuid4().hex
+    length = request.headers.get("content-length")
+    progress = {
+        "upload_id": upload_id, "destination": destination, "serial": serial,
+        "total": int(length) if length and length.isdigit() else None,
+        "sent": 0, "statut": "En cours", "debut": time.time()
+    }
+    UPLOADS[upload_id] = progress
+    while len(UPLOADS) > MAX_TRACKED_UPLOADS:
+        UPLOADS.popitem(last=False)
+
+    def report(sent: int):
+        progress["sent"] = sent
+
+    try:
+        sent = await AdbFiles.push_stream_async(destination, request.stream(), serial, progress=report)
+        progress.update(statut="Succès", sent=sent)
+        logger.debug(f"Envoi {upload_id} terminé : {sent} octets")
+        return {"result": "Succès", "upload_id": upload_id, "bytes": sent}
+    except AdbProtocolError as e:
+        progress.update(statut="Erreur", message=str(e))
+        logger.error(f"Erreur lors de l'envoi du fichier: {e}")
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        progress.update(statut="Erreur", message=str(e))
+        logger.error(f"Erreur lors de l'envoi du fichier: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/files/upload/{upload_id}")
+@jwt_required
+async def upload_progress(request: Request, upload_id: str):
+    """Retourne la progression d'un envoi en cours ou récent."""
+    progress = UPLOADS.get(upload_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Envoi inconnu")
+    return progress
@@ -0,0 +1,53 @@
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from adb.adb_fleet import AdbFleet
+from decorators import jwt_required
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+class FleetRequest(BaseModel):
+    operation: str
+    serials: Optional[List[str]] = None  # None : tous les périphériques en ligne
+    args: Dict[str, Any] = {}
+    concurrency: int = 8
+    timeout: float = 30.0
+    format: str = "ndjson"  # "ndjson" ou "sse"
+
+@router.get("/fleet/operations")
+@jwt_required
+async def list_operations(request: Request):
+    """Liste les opérations exécutables sur une flotte de périphériques."""
+    return {"operations": sorted(AdbFleet.OPERATIONS)}
+
+@router.post("/fleet/run")
+@jwt_required
+async def run_on_fleet(request: Request, fleet_request: FleetRequest):
+    """Exécute une opération sur plusieurs périphériques et diffuse chaque résultat dès qu'il arrive."""
+    logger.debug(f"Entrée dans la fonction run_on_fleet avec operation={fleet_request.operation}")
+    if fleet_request.operation not in AdbFleet.OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Opération inconnue : {fleet_request.operation}")
+    if fleet_request.concurrency < 1:
+        raise HTTPException(status_code=400, detail="La concurrence doit être au moins égale à 1")
+    if fleet_request.format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="Format invalide. Utilisez 'ndjson' ou 'sse'.")
+
+    async def stream():
+        try:
+            async for result in AdbFleet.run(
+                fleet_request.operation, fleet_request.serials, fleet_request.args,
+                fleet_request.concurrency, fleet_request.timeout
+            ):
+                payload = json.dumps(result, default=str, ensure_ascii=False)
+                yield f"data: {payload}\n\n" if fleet_request.format == "sse" else payload + "\n"
+        except Exception as e:
+            logger.error(f"Erreur lors de l'exécution sur la flotte : {e}")
+            error = json.dumps({"statut": "Erreur", "message": str(e)}, ensure_ascii=False)
+            yield f"data: {error}\n\n" if fleet_request.format == "sse" else error + "\n"
+
+    media_type = "text/event-stream" if fleet_request.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
@@ -1,14 +1,15 @@
 import os
 from fastapi import APIRouter, Depends, HTTPException, Request
-from supabase import Client
+from supabase import AsyncClient
 from datetime import datetime, timedelta
 from typing import Optional, List
 from pydantic import BaseModel
-from database import init_supabase
+from database import get_db
 from fastapi.security import OAuth2PasswordBearer
 from config import Settings
 import logging
 from decorators import jwt_required, role_required
+from auth.roles import RoleResolver
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 logger = logging.getLogger(__name__)
@@ -27,9 +28,9 @@ class GroupOut(BaseModel):
 
 @router.post("/groups/add")
 @jwt_required
-async def add_group(group: GroupCreate, request: Request, db: Client = Depends(init_supabase)):
-    data, count = db.table('groups').select('*').eq('name', group.name).execute()
-    if len(data[1]) > 0:
+async def add_group(group: GroupCreate, request: Request, db: AsyncClient = Depends(get_db)):
+    existing = await db.table('groups').select('id').eq('name', group.name).execute()
+    if len(existing.data) > 0:
         raise HTTPException(status_code=400, detail="Group déjà défini")
 
     from uuid import uuid4
@@ -39,38 +40,41 @@ async def add_group(group: GroupCreate, request: Request, db: Client = Depends(i
         'name': group.name,
         'description': group.description
     }
-    data, count = db.table('groups').insert(new_group).execute()
-    return data[1][0]
+    response = await db.table('groups').insert(new_group).execute()
+    RoleResolver.instance().invalidate()
+    return response.data[0]
 
 @router.get("/groups/list", response_model=List[GroupOut])
 @jwt_required
-async def list_groups(request: Request, db: Client = Depends(init_supabase)):
-    data, count = db.table('groups').select('*').execute()
-    return data[1]
+async def list_groups(request: Request, db: AsyncClient = Depends(get_db)):
+    response = await db.table('groups').select('*').execute()
+    return response.data
 
 @router.delete("/groups/delete/{group_id}")
 @jwt_required
-async def delete_group(request: Request, group_id: str, db: Client = Depends(init_supabase)):
+async def delete_group(request: Request, group_id: str, db: AsyncClient = Depends(get_db)):
     # Récupérer le groupe avant suppression
-    group_data, _ = db.table('groups').select('name').eq('id', group_id).execute()
-    if len(group_data[1]) == 0:
+    group_data = await db.table('groups').select('name').eq('id', group_id).execute()
+    if len(group_data.data) == 0:
         return {"status":"error",
             "details": "Groupe non trouvé"}
     
-    group_name = group_data[1][0]['name']
+    group_name = group_data.data[0]['name']
     
     # Supprimer le groupe
-    db.table('groups').delete().eq('id', group_id).execute()    
+    await db.table('groups').delete().eq('id', group_id).execute()
+    RoleResolver.instance().invalidate()
     return {"status":"success","details": f"Groupe {group_name} supprimé avec succès"}
 
 @router.put("/groups/update/{group_id}", response_model=GroupOut)
 @jwt_required
-async def update_group_route(request: Request, group_id: str, group: GroupCreate, db: Client = Depends(init_supabase)):
-    data, count = db.table('groups').update({
+async def update_group_route(request: Request, group_id: str, group: GroupCreate, db: AsyncClient = Depends(get_db)):
+    response = await db.table('groups').update({
         'name': group.name,
         'description': group.description
     }).eq('id', group_id).execute()
-    
-    if count == 0:
+    RoleResolver.instance().invalidate()
+
+    if not response.data:
         raise HTTPException(status_code=404, detail="Groupe non trouvé")
-    return data[1][0]
+    return response.data[0]
@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from adb.adb_logcat import LogcatFilter
+from adb.adb_logcat_archive import LogcatArchive
+from decorators import jwt_required
+from routes.devices import require_known_device
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+def _parse_time(value: Optional[str], default: float) -> float:
+    """Accepte une date ISO 8601 ou un horodatage epoch en secondes."""
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Date invalide : {value}")
+
+@router.get("/logs/query")
+@jwt_required
+async def query_logs(request: Request, serial: Optional[str] = None, from_: Optional[str] = Query(None, alias="from"),
+                     to: Optional[str] = None, tag: Optional[str] = None, level: str = "V",
+                     regex: Optional[str] = None, limit: int = 1000):
+    """
+    Recherche dans les journaux archivés.
+
+    serial : numéros de série séparés par des virgules (par défaut tous) ; from / to : ISO 8601
+    ou epoch (par défaut la dernière heure) ; tag : tags séparés par des virgules ;
+    level : priorité minimale (V, D, I, W, E, F).
+    """
+    end = _parse_time(to, datetime.now().timestamp())
+    start = _parse_time(from_, end - 3600)
+    if start > end:
+        raise HTTPException(status_code=400, detail="La date de début est postérieure à la date de fin.")
+    if not 1 <= limit <= 100000:
+        raise HTTPException(status_code=400, detail="La limite doit être comprise entre 1 et 100000.")
+    try:
+        log_filter = LogcatFilter([t for t in (tag or "").split(",") if t], level, None, regex)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    serials = [s for s in (serial or "").split(",") if s] or None
+    entries = await LogcatArchive.instance().query(serials, start, end, log_filter, limit)
+    return {"from": start, "to": end, "count": len(entries), "entries": entries}
+
+@router.get("/logs/archive")
+@jwt_required
+async def archive_status(request: Request):
+    """Périphériques archivés sur le disque et archivages en cours."""
+    archive = LogcatArchive.instance()
+    return {"archived": archive.archived_serials(), "active": archive.active()}
+
+@router.post("/logs/archive/{serial}/start")
+@jwt_required
+async def start_archive(request: Request, serial: str):
+    """Démarre l'archivage continu du journal d'un périphérique."""
+    await require_known_device(serial)
+    LogcatArchive.instance().start(serial)
+    return {"status": "success", "serial": serial}
+
+@router.post("/logs/archive/{serial}/stop")
+@jwt_required
+async def stop_archive(request: Request, serial: str):
+    """Arrête l'archivage ; les entrées en attente sont écrites sur le disque."""
+    await LogcatArchive.instance().stop(serial)
+    return {"status": "success", "serial": serial}
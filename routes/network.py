@@ -24,7 +24,7 @@ async def status(request: Request):
     """Récupère le statut du Wi-Fi."""
     logger.debug("Entrée dans la fonction status")
     try:
-        result = AdbNetwork.wifi_status()
+        result = await AdbNetwork.wifi_status_async()
         logger.debug(f"Résultat du statut du Wi-Fi : {result}")
         return result
     except Exception as e:
@@ -36,7 +36,7 @@ async def ssid(request: Request):
     """Récupère le SSID du réseau Wi-Fi connecté."""
     logger.debug("Entrée dans la fonction ssid")
     try:
-        result = AdbNetwork.get_connected_ssid()
+        result = await AdbNetwork.get_connected_ssid_async()
         logger.debug(f"Résultat du SSID connecté : {result}")
         return result
     except Exception as e:
@@ -48,7 +48,7 @@ async def get_ip(request: Request):
     """Récupère l'adresse IP du réseau Wi-Fi connecté."""
     logger.debug("Entrée dans la fonction get_ip")
     try:
-        result = AdbNetwork.get_wifi_ip()
+        result = await AdbNetwork.get_wifi_ip_async()
         logger.debug(f"Résultat de l'adresse IP du Wi-Fi : {result}")
         return result
     except Exception as e:
@@ -60,7 +60,7 @@ async def reset(request: Request):
     """Réinitialise le Wi-Fi."""
     logger.debug("Entrée dans la fonction reset")
     try:
-        result = AdbNetwork.reset_wifi()
+        result = await AdbNetwork.reset_wifi_async()
         logger.debug(f"Résultat de la réinitialisation du Wi-Fi : {result}")
         return result
     except Exception as e:
@@ -72,7 +72,7 @@ async def wifi_signal_strength(request: Request):
     """Récupère la force du signal Wi-Fi."""
     logger.debug("Entrée dans la fonction wifi_signal_strength")
     try:
-        result = AdbNetwork.wifi_signal_strength()
+        result = await AdbNetwork.wifi_signal_strength_async()
         logger.debug(f"Résultat de la force du signal Wi-Fi : {result}")
         return result
     except Exception as e:
@@ -84,7 +84,7 @@ async def wifi_frequency(request: Request):
     """Récupère la fréquence du Wi-Fi."""
     logger.debug("Entrée dans la fonction wifi_frequency")
     try:
-        result = AdbNetwork.wifi_frequency()
+        result = await AdbNetwork.wifi_frequency_async()
         logger.debug(f"Résultat de la fréquence du Wi-Fi : {result}")
         return result
     except Exception as e:
@@ -1,18 +1,30 @@
-import subprocess
+import itertools
+import shlex
+import time
+from contextlib import aclosing
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import time
-import threading
-
-from adb.adb_command_executor import AdbCommandExecutor
+import logging
+
+from adb.adb_command_executor import AsyncAdbCommandExecutor
+from adb.adb_fleet import AdbFleet
+from adb.adb_screen import check_stream_options
+from adb.adb_screen_broadcaster import Frame, ScreenBroadcaster
+from adb.adb_screen_mosaic import ScreenMosaic
+from adb.adb_screen_recorder import ScreenRecorder
+from adb.adb_screen_transport import FRAME_JPEG, FRAME_PNG, FrameSender
+from adb.adb_screen_transcoder import CV2_DISPONIBLE, PROFILES, ScreenTranscoder
+from adb.adb_screenshot import IMAGE_FORMATS, ScreenshotCache
+from auth.dependencies import authenticate_websocket
+from decorators import jwt_required
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# État global pour le streaming
-stop_stream = False
-
 ### 📹 **1. Capture Vidéo (Enregistrement)**
 class Screen(BaseModel):
     path: str
@@ -22,26 +34,30 @@ class Screen(BaseModel):
 
 
 @router.post("/screen/video/capture")
-async def start_screen_capture(screen: Screen):
+@jwt_required
+async def start_screen_capture(request: Request, screen: Screen, serial: Optional[str] = None):
     """Démarre la capture vidéo de l'écran."""
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         path_with_timestamp = f"{screen.path}_{timestamp}.mp4"
+        # screenrecord rend la main à la fin de l'enregistrement
+        timeout = screen.duration + AsyncAdbCommandExecutor.DEFAULT_TIMEOUT
         
         command = [
-            "shell", "screenrecord", "--time-limit", str(screen.duration), path_with_timestamp
+            "shell", "screenrecord", "--time-limit", str(screen.duration), shlex.quote(path_with_timestamp)
         ]
 
         # Exécuter la commande adb
-        result = AdbCommandExecutor.execute(command)
+        result = await AsyncAdbCommandExecutor.execute(command, timeout=timeout, serial=serial)
 
         # Vérifiez si la commande a échoué en raison de la résolution
         if "unable to configure video/avc codec" in result:
             # Réessayez avec une résolution plus basse
             command = [
-                "shell", "screenrecord", "--size", "720x1280", "--time-limit", str(screen.duration), path_with_timestamp
+                "shell", "screenrecord", "--size", "720x1280", "--time-limit", str(screen.duration),
+                shlex.quote(path_with_timestamp)
             ]
-            result = AdbCommandExecutor.execute(command)
+            result = await AsyncAdbCommandExecutor.execute(command, timeout=timeout, serial=serial)
 
         return {
             "status": "success",
@@ -58,7 +74,8 @@ async def start_screen_capture(screen: Screen):
         )
 
 @router.post("/screen/video/stop")
-async def stop_screen_capture():
+@jwt_required
+async def stop_screen_capture(request: Request, serial: Optional[str] = None):
     """Arrête la capture vidéo de l'écran."""
     try:
         command = [
@@ -66,7 +83,7 @@ async def stop_screen_capture():
         ]
 
         # Exécuter la commande adb
-        result = AdbCommandExecutor.execute(command)
+        result = await AsyncAdbCommandExecutor.execute(command, serial=serial)
 
         return {
             "status": "success",
@@ -86,18 +103,19 @@ class ImageCapture(BaseModel):
 
 
 @router.post("/screen/image/capture")
-async def capture_image(screen: ImageCapture):
+@jwt_required
+async def capture_image(request: Request, screen: ImageCapture, serial: Optional[str] = None):
     """Capture une image de l'écran."""
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         path_with_timestamp = f"{screen.path}{screen.prefix}_{timestamp}.png"
         
         command = [
-            "shell", "screencap", path_with_timestamp
+            "shell", "screencap", shlex.quote(path_with_timestamp)
         ]
 
         # Exécuter la commande adb
-        result = AdbCommandExecutor.execute(command)
+        result = await AsyncAdbCommandExecutor.execute(command, serial=serial)
 
         return {
             "status": "success",
@@ -114,91 +132,83 @@ async def capture_image(screen: ImageCapture):
         )
 
 
-### 🎥 **3. Streaming Vidéo en Temps Réel**
-
-stream_thread = None
-
-
-def adb_screen_stream():
+@router.get("/screen/image")
+@jwt_required
+async def screenshot(request: Request, serial: Optional[str] = None, format: str = "png", quality: int = 80, max_age: float = 1.0):
     """
-    Capture et diffuse les captures d'écran Android en continu via ADB.
+    Retourne directement l'image de l'écran, sans fichier intermédiaire sur le périphérique.
+
+    Si une diffusion est en cours, sa dernière image est réutilisée ; sinon la capture
+    brute (`exec-out screencap`) est encodée par le serveur en PNG, JPEG ou WebP.
+    Les captures de moins de max_age secondes sont resservies depuis le cache.
     """
-    global stop_stream
+    if format not in IMAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format inconnu. Utilisez : {', '.join(IMAGE_FORMATS)}")
+    if format != "png" and not CV2_DISPONIBLE:
+        raise HTTPException(status_code=501, detail="OpenCV (cv2) n'est pas installé sur le serveur.")
+    if not 1 <= quality <= 100 or max_age < 0:
+        raise HTTPException(status_code=400, detail="Qualité (1 à 100) ou âge maximal invalide.")
     try:
-        while not stop_stream:
-            process = subprocess.Popen(
-                ["adb", "exec-out", "screencap", "-p"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+        image = await ScreenshotCache.instance().capture(serial, format, quality, max_age)
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=502, detail=f"Erreur lors de la capture d'image: {str(e)}")
+    return Response(
+        content=image.data,
+        media_type=image.media_type,
+        headers={"X-Frame-Timestamp": f"{image.timestamp:.3f}", "X-Frame-Source": image.source,
+                 "Cache-Control": "no-store"}
+    )
 
-            image_data = process.stdout.read()
-            if not image_data:
-                continue  # Ignore les images invalides
 
-            yield (b'--frame\r\n' b'Content-Type: image/png\r\n\r\n' + image_data + b'\r\n')
-            
-            time.sleep(0.5)  # Ajuster le délai pour le framerate
+### 🎥 **3. Streaming Vidéo en Temps Réel**
 
-    except Exception as e:
-        print(f"❌ Erreur dans le flux : {e}")
+async def adb_screen_stream(serial: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Diffuse les captures d'écran Android en MJPEG (images PNG).
+
+    Les captures proviennent du diffuseur partagé du périphérique : plusieurs
+    spectateurs n'entraînent qu'une seule capture.
+    """
+    try:
+        async with aclosing(ScreenBroadcaster.for_device(serial).frames()) as frames:
+            async for frame in frames:
+                yield b'--frame\r\n' b'Content-Type: image/png\r\n\r\n' + frame.data + b'\r\n'
+    except RuntimeError as e:
+        logger.error(f"❌ Erreur dans le flux : {e}")
     finally:
-        print("🔴 Flux de capture arrêté proprement.")
+        logger.info("🔴 Flux de capture arrêté proprement.")
+
 
-def adb_screen_stream_opencv():
+async def adb_screen_stream_opencv(serial: Optional[str] = None, profile: str = "medium") -> AsyncIterator[bytes]:
     """
-    Diffuse le flux vidéo Android avec OpenCV et ADB via `screencap`.
+    Diffuse le flux vidéo Android en MJPEG compressé avec OpenCV.
+
+    La conversion se fait dans le pool du ScreenTranscoder, une seule fois par
+    image et par profil pour tous les spectateurs.
     """
-    global stop_stream
     try:
-        while not stop_stream:
-            # Capture via ADB
-            process = subprocess.Popen(
-                ["adb", "exec-out", "screencap", "-p"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            
-            image_data = process.stdout.read()
-            if not image_data:
-                continue  # Ignore les données invalides
-
-            # Décodage avec OpenCV
-            img_array = np.frombuffer(image_data, dtype=np.uint8)
-            frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-            
-            if frame is None:
-                continue
-
-            # Redimensionner pour des performances accrues
-            frame = cv2.resize(frame, (640, 480))
-
-            # Compression en JPEG pour un transfert efficace
-            _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-
-            # Envoi du flux MJPEG
-            yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-
-            time.sleep(0.03)  # Contrôle du framerate (~30 FPS)
-
-    except Exception as e:
-        print(f"❌ Erreur du flux : {e}")
+        async with aclosing(ScreenBroadcaster.for_device(serial).frames()) as frames:
+            async for frame in frames:
+                jpeg = await ScreenTranscoder.instance().jpeg(serial, frame, profile)
+                if jpeg is None:
+                    continue  # Ignore les données invalides
+                yield b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+    except RuntimeError as e:
+        logger.error(f"❌ Erreur du flux : {e}")
     finally:
-        print("🔴 Flux arrêté proprement.")
+        logger.info("🔴 Flux arrêté proprement.")
 
 
 ### ▶️ **1. Démarrer le Streaming d'Écran**
 @router.post("/screen/video/stream/start")
-async def start_stream():
+@jwt_required
+async def start_stream(request: Request, serial: Optional[str] = None):
     """
     Démarre la capture continue de l'écran Android.
-    """
-    global stop_stream, stream_thread
-    stop_stream = False
 
-    if stream_thread is None or not stream_thread.is_alive():
-        stream_thread = threading.Thread(target=adb_screen_stream)
-        stream_thread.start()
+    La capture s'arrête d'elle-même si aucun spectateur ne se connecte.
+    """
+    ScreenBroadcaster.for_device(serial).start()
 
     return JSONResponse(
         content={"status": "success", "message": "Streaming démarré."},
@@ -208,12 +218,14 @@ async def start_stream():
 
 ### ⏹️ **2. Arrêter le Streaming d'Écran**
 @router.post("/screen/video/stream/stop")
-async def stop_streaming():
+@jwt_required
+async def stop_streaming(request: Request, serial: Optional[str] = None):
     """
-    Arrête la capture continue de l'écran Android.
+    Arrête la capture continue de l'écran Android et déconnecte ses spectateurs.
     """
-    global stop_stream
-    stop_stream = True
+    for broadcaster in ScreenBroadcaster.running():
+        if serial is None or broadcaster.serial == serial:
+            await broadcaster.stop()
 
     return JSONResponse(
         content={"status": "success", "message": "Streaming arrêté."},
@@ -221,29 +233,201 @@ async def stop_streaming():
     )
 
 
+@router.get("/screen/video/stream/status")
+@jwt_required
+async def stream_status(request: Request):
+    """État des captures en cours (spectateurs, dernière image, images abandonnées)."""
+    return {"streams": [broadcaster.stats() for broadcaster in ScreenBroadcaster.running()]}
+
+
 ### 📺 **3. Diffuser le Flux d'Écran**
 @router.get("/screen/video/stream")
-async def stream_screen():
+@jwt_required
+async def stream_screen(request: Request, serial: Optional[str] = None):
     """
     Diffuse en continu les captures d'écran Android via ADB.
     """
-    global stop_stream
-    if stop_stream:
-        raise HTTPException(status_code=400, detail="Le streaming n'est pas démarré. Lancez `/screen/start` d'abord.")
-
     return StreamingResponse(
-        adb_screen_stream(),
+        adb_screen_stream(serial),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
 @router.get("/screen/video/stream2")
-async def stream_screen():
+@jwt_required
+async def stream_screen_opencv(request: Request, serial: Optional[str] = None, profile: str = "medium"):
     """
-    Démarre le streaming vidéo depuis Android avec OpenCV et FastAPI.
+    Diffuse le flux vidéo depuis Android, compressé en JPEG avec OpenCV (profils low, medium, high).
     """
-    global stop_stream
-    stop_stream = False
+    if not CV2_DISPONIBLE:
+        raise HTTPException(status_code=501, detail="OpenCV (cv2) n'est pas installé sur le serveur.")
+    if profile not in PROFILES:
+        raise HTTPException(status_code=400, detail=f"Profil inconnu. Utilisez : {', '.join(PROFILES)}")
     return StreamingResponse(
-        adb_screen_stream_opencv(),
+        adb_screen_stream_opencv(serial, profile),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
+
+
+### 🧩 **Mosaïque de la classe**
+@router.get("/screen/mosaic")
+@jwt_required
+async def stream_mosaic(request: Request, serials: Optional[str] = None, tile_width: int = 320, tile_height: int = 180,
+                        columns: Optional[int] = None, fps: float = 2.0):
+    """
+    Diffuse en MJPEG une grille de vignettes de plusieurs périphériques.
+
+    serials : numéros de série séparés par des virgules (par défaut tous les périphériques en ligne).
+    """
+    if not CV2_DISPONIBLE:
+        raise HTTPException(status_code=501, detail="OpenCV (cv2) n'est pas installé sur le serveur.")
+    if not (16 <= tile_width <= 1920 and 16 <= tile_height <= 1920) or fps <= 0:
+        raise HTTPException(status_code=400, detail="Taille de vignette ou fréquence invalide.")
+    selected = [serial for serial in (serials or "").split(",") if serial] or await AdbFleet.online_serials()
+    if not selected:
+        raise HTTPException(status_code=404, detail="Aucun périphérique en ligne.")
+    mosaic = ScreenMosaic(selected, tile_width, tile_height, columns, fps)
+
+    async def stream():
+        async with aclosing(mosaic.frames()) as frames:
+            async for jpeg in frames:
+                yield b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+
+    return StreamingResponse(stream(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+
+### ⏺️ **Enregistrement côté serveur**
+class Recording(BaseModel):
+    serial: Optional[str] = None
+    segment_seconds: float = 10.0
+
+
+@router.post("/screen/recordings/start")
+@jwt_required
+async def start_recording(request: Request, recording: Recording):
+    """
+    Enregistre le flux H.264 partagé du périphérique en segments sur le serveur.
+
+    L'enregistrement s'abonne à la même capture que les spectateurs : il ne lance
+    pas de second screenrecord sur le casque.
+    """
+    if not 1 <= recording.segment_seconds <= 600:
+        raise HTTPException(status_code=400, detail="Durée de segment invalide (1 à 600 secondes).")
+    recorder = ScreenRecorder.start(recording.serial, recording.segment_seconds)
+    return {"status": "success", "id": recorder.id, "serial": recorder.serial}
+
+
+@router.post("/screen/recordings/{recording_id}/stop")
+@jwt_required
+async def stop_recording(request: Request, recording_id: str):
+    """Arrête un enregistrement ; le segment en cours est finalisé et ajouté à l'index."""
+    recorder = ScreenRecorder.get(recording_id)
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Aucun enregistrement en cours avec cet identifiant.")
+    index = await recorder.stop()
+    return {"status": "success", "id": recording_id, "segments": len(index["segments"])}
+
+
+@router.get("/screen/recordings")
+@jwt_required
+async def list_recordings(request: Request):
+    """Enregistrements présents sur le serveur, et ceux en cours."""
+    return {"recordings": ScreenRecorder.list_recordings(),
+            "active": [recorder.id for recorder in ScreenRecorder.active()]}
+
+
+@router.get("/screen/recordings/{recording_id}")
+@jwt_required
+async def recording_index(request: Request, recording_id: str):
+    """Index d'un enregistrement : segments, horodatages de début et de fin, tailles."""
+    index = ScreenRecorder.load_index(recording_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Enregistrement introuvable.")
+    return index
+
+
+@router.get("/screen/recordings/{recording_id}/{segment}")
+@jwt_required
+async def recording_segment(request: Request, recording_id: str, segment: str):
+    """Télécharge un segment H.264 brut (Annex-B), lisible avec ffplay/VLC ou remultiplexable sans réencodage."""
+    path = ScreenRecorder.segment_path(recording_id, segment)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Segment introuvable.")
+    return FileResponse(path, media_type="video/h264", filename=f"{recording_id}_{segment}")
+
+
+### 🎞️ **4. Flux H.264 (screenrecord)**
+@router.websocket("/screen/video/h264")
+async def stream_h264(websocket: WebSocket, serial: Optional[str] = None, size: Optional[str] = None,
+                      bit_rate: int = 4_000_000):
+    """
+    Diffuse l'écran en H.264 brut (Annex-B) : un message binaire par unité NAL.
+
+    Le navigateur décode le flux avec WebCodecs ou un démultiplexeur JavaScript (jmuxer...).
+    Tous les spectateurs d'un périphérique partagent le même processus screenrecord ;
+    size et bit_rate ne s'appliquent qu'au premier.
+    """
+    if await authenticate_websocket(websocket) is None:
+        return
+    await websocket.accept()
+    try:
+        check_stream_options(size, bit_rate)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e)[:120])
+        return
+    broadcaster = ScreenBroadcaster.for_device(serial, "h264", size=size, bit_rate=bit_rate)
+    try:
+        async with aclosing(broadcaster.frames()) as frames:
+            async for frame in frames:
+                await websocket.send_bytes(frame.data)
+    except WebSocketDisconnect:
+        logger.info(f"Spectateur H.264 déconnecté ({serial or 'périphérique par défaut'})")
+    except RuntimeError as e:
+        logger.error(f"Erreur dans le flux H.264 : {e}")
+        await websocket.close(code=1011, reason=str(e)[:120])
+
+
+### 🔌 **5. Transport WebSocket binaire**
+QUALITIES = ("original",) + tuple(PROFILES)
+
+@router.websocket("/screen/ws")
+async def stream_websocket(websocket: WebSocket, serial: Optional[str] = None, quality: str = "medium",
+                           window: int = 2, mosaic: Optional[str] = None):
+    """
+    Diffuse l'écran sous forme de messages binaires : en-tête de 17 octets
+    (type, séquence, horodatage en ms, longueur) suivi de l'image PNG ou JPEG.
+
+    Le client acquitte chaque image ({"ack": seq}) ; au-delà de window images non
+    acquittées, les images intermédiaires sont abandonnées côté serveur. quality vaut
+    "original" (PNG de l'appareil) ou un profil JPEG, et peut changer en cours de flux
+    ({"quality": "low"}). Avec mosaic (numéros de série séparés par des virgules, ou "all"),
+    la grille de vignettes remplace l'écran d'un seul périphérique.
+    """
+    if await authenticate_websocket(websocket) is None:
+        return
+    await websocket.accept()
+    if quality not in QUALITIES:
+        await websocket.close(code=1008, reason="Qualité inconnue")
+        return
+    sender = FrameSender(websocket, window, quality)
+
+    async def encode(frame: Frame, current_quality: str):
+        if mosaic or current_quality == "original" or not CV2_DISPONIBLE:
+            return (FRAME_JPEG if mosaic else FRAME_PNG), frame.data
+        jpeg = await ScreenTranscoder.instance().jpeg(serial, frame, current_quality)
+        return (FRAME_JPEG, jpeg) if jpeg is not None else None
+
+    async def mosaic_frames():
+        serials = [s for s in mosaic.split(",") if s and s != "all"] or await AdbFleet.online_serials()
+        sequence = itertools.count(1)
+        async with aclosing(ScreenMosaic(serials).frames()) as frames:
+            async for jpeg in frames:
+                yield Frame(next(sequence), time.time(), jpeg)
+
+    try:
+        frames = mosaic_frames() if mosaic else ScreenBroadcaster.for_device(serial).frames()
+        await sender.run(frames, encode, QUALITIES)
+    except WebSocketDisconnect:
+        logger.info(f"Spectateur WebSocket déconnecté : {sender.stats()}")
+    except (RuntimeError, ValueError) as e:
+        logger.error(f"Erreur dans le flux WebSocket : {e}")
+        await websocket.close(code=1011, reason=str(e)[:120])
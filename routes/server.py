@@ -12,7 +12,7 @@ async def start_server(request:Request):
     """Démarre le serveur ADB."""
     logger.debug("Entrée dans la fonction start_server")
     try:
-        result = AdbServer.start_server()
+        result = await AdbServer.start_server_async()
         logger.debug(f"Résultat du démarrage du serveur : {result}")
         return result
     except Exception as e:
@@ -25,7 +25,7 @@ async def stop_server(request:Request):
     """Arrête le serveur ADB."""
     logger.debug("Entrée dans la fonction stop_server")
     try:
-        result = AdbServer.stop_server()
+        result = await AdbServer.stop_server_async()
         logger.debug(f"Résultat de l'arrêt du serveur : {result}")
         return result
     except Exception as e:
@@ -38,7 +38,7 @@ async def restart_server(request:Request):
     """Redémarre le serveur ADB."""
     logger.debug("Entrée dans la fonction restart_server")
     try:
-        result = AdbServer.restart_server()
+        result = await AdbServer.restart_server_async()
         logger.debug(f"Résultat du redémarrage du serveur : {result}")
         return result
     except Exception as e:
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Header
+from fastapi import APIRouter, Depends, HTTPException, Request
 from datetime import datetime, timedelta
+import asyncio
 import logging
-from supabase import Client
+from supabase import AsyncClient
 from database import SUPABASE_JWT_SECRET, get_db, resolve_token
+from auth.dependencies import authenticate
 import uuid
 
 from routes.users import get_user_by_id
@@ -13,19 +15,26 @@ logger = logging.getLogger(__name__)
 router = APIRouter( tags=["sessions"])
 
 # --- Fonctions Utilitaires ---
-def get_session(session_id: str, db: Client = Depends(get_db)):
+async def get_session(session_id: str, db: AsyncClient = Depends(get_db)):
     """Récupère une session par son ID"""
-    response = db.table('sessions').select('*').eq('id', session_id).execute()
+    response = await db.table('sessions').select('*').eq('id', session_id).execute()
     return response.data[0] if response.data else None
 
 
 
-def get_sessions_with_users(response, db):
+async def get_users_by_id(rows, db):
+    """Utilisateurs des lignes sessions_users, récupérés en parallèle (une fois par utilisateur)."""
+    user_ids = list({row['user_id'] for row in rows})
+    users = await asyncio.gather(*(get_user_by_id(user_id, db) for user_id in user_ids))
+    return dict(zip(user_ids, users))
+
+async def get_sessions_with_users(response, db):
     sessions = []
     users = []
+    users_by_id = await get_users_by_id(response.data, db)
     
     for session in response.data:
-        user = get_user_by_id(session['user_id'], db)
+        user = users_by_id[session['user_id']]
         users.append({
             'user': user,
             'joined_at': session['joined_at'],
@@ -39,12 +48,13 @@ def get_sessions_with_users(response, db):
         })
     return sessions
     
-def get_all_sessions_with_users(response, db):
+async def get_all_sessions_with_users(response, db):
     sessions = []
     users = []
+    users_by_id = await get_users_by_id(response.data, db)
     
     for session in response.data:
-        user = get_user_by_id(session['user_id'], db)
+        user = users_by_id[session['user_id']]
         users.append({
             'user': user,
             'joined_at': session['joined_at'],
@@ -64,25 +74,14 @@ def get_all_sessions_with_users(response, db):
 # --- Routes ---
 @router.post("/sessions/add")
 async def create_session(
+    request: Request,
     session_data: dict, 
-    authorization: str = Header(None),
-    db: Client = Depends(get_db)
+    db: AsyncClient = Depends(get_db)
 ):
     """Crée une nouvelle session"""
+    # Utilisateur du jeton (et non la dernière session ouverte sur le client partagé)
+    user_id = (await authenticate(request)).id
     try:
-        # Vérification du header Authorization
-        if not authorization or not authorization.startswith("Bearer "):
-            raise HTTPException(status_code=401, detail="Token JWT manquant")
-            
-        # Extraction du token
-        token = authorization.split(" ")[1]
-        
-        response = db.auth.get_session()
-
-        # Décodage du JWT
-        #user_id = resolve_token(token)
-        user_id= response.user.id
-
         # Validation des données
         required_fields = ['name']
         if not all(field in session_data for field in required_fields):
@@ -109,11 +108,13 @@ async def create_session(
         #session_data['start_date'] = datetime.fromisoformat(session_data['start_date']).strftime('%Y-%m-%d %H:%M:%S')
         #session_data['end_date'] = datetime.fromisoformat(session_data['end_date']).strftime('%Y-%m-%d %H:%M:%S')
         
-        response = db.table('sessions').insert(session_data).execute()
+        response = await db.table('sessions').insert(session_data).execute()
         
         if response.data:
             return response.data[0]
         raise HTTPException(status_code=400, detail="Erreur lors de la création de la session")
+    except HTTPException:
+        raise
     except Exception as e:
         # Log complet de l'erreur
         logger.error(f"Erreur création session: {e!r}", exc_info=True)
@@ -140,16 +141,16 @@ async def create_session(
         )
 
 @router.get("/sessions/list/{session_id}")
-async def get_sessions(session_id: str, db: Client = Depends(get_db)):
+async def get_sessions(session_id: str, db: AsyncClient = Depends(get_db)):
     """Récupère toutes les sessions"""
     sessions = []
     try:
         if session_id=="all":
-            response = db.table('sessions_users').select('*').execute()
-            sessions=get_all_sessions_with_users(response, db)
+            response = await db.table('sessions_users').select('*').execute()
+            sessions=await get_all_sessions_with_users(response, db)
         else:    
-            response = db.table('sessions_users').select('*').eq('session_id', session_id).execute()
-            sessions=get_sessions_with_users(response, db)
+            response = await db.table('sessions_users').select('*').eq('session_id', session_id).execute()
+            sessions=await get_sessions_with_users(response, db)
         
         return sessions
         
@@ -158,13 +159,13 @@ async def get_sessions(session_id: str, db: Client = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Erreur serveur lors de la récupération des sessions")
 
 @router.get("/sessions/{session_id}")
-async def get_session_by_id(session_id: str, db: Client = Depends(get_db)):
+async def get_session_by_id(session_id: str, db: AsyncClient = Depends(get_db)):
     """Récupère une session par son ID"""
     try:
         # Validation de l'UUID
         uuid.UUID(session_id)
         
-        session = get_session(session_id, db)
+        session = await get_session(session_id, db)
         if not session:
             raise HTTPException(status_code=404, detail="Session non trouvée")
             
@@ -176,20 +177,20 @@ async def get_session_by_id(session_id: str, db: Client = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Erreur serveur lors de la recherche")
 
 @router.put("/sessions/update/{session_id}")
-async def update_session(session_id: str, updates: dict, db: Client = Depends(get_db)):
+async def update_session(session_id: str, updates: dict, db: AsyncClient = Depends(get_db)):
     """Met à jour une session existante"""
     try:
         # Validation de l'UUID
         uuid.UUID(session_id)
         
         # Vérification de l'existence de la session
-        existing_session = get_session(session_id, db)
+        existing_session = await get_session(session_id, db)
         if not existing_session:
             raise HTTPException(status_code=404, detail="Session non trouvée")
             
         # Mise à jour
         updates['updated_at'] = datetime.utcnow().isoformat()
-        response = db.table('sessions').update(updates).eq('id', session_id).execute()
+        response = await db.table('sessions').update(updates).eq('id', session_id).execute()
         
         if response.data:
             return response.data[0]
@@ -201,14 +202,14 @@ async def update_session(session_id: str, updates: dict, db: Client = Depends(ge
         raise HTTPException(status_code=500, detail="Erreur serveur lors de la mise à jour")
 
 @router.delete("/sessions/delete/{session_id}")
-async def delete_session(session_id: str, db: Client = Depends(get_db)):
+async def delete_session(session_id: str, db: AsyncClient = Depends(get_db)):
     """Supprime une session"""
     try:
         # Validation de l'UUID
         uuid.UUID(session_id)
         
         # Suppression
-        db.table('sessions').delete().eq('id', session_id).execute()
+        await db.table('sessions').delete().eq('id', session_id).execute()
         return {"message": f"Session {session_id} supprimée avec succès"}
     except ValueError:
         raise HTTPException(status_code=400, detail="ID session invalide")
@@ -219,7 +220,7 @@ async def delete_session(session_id: str, db: Client = Depends(get_db)):
 @router.post("/sessions/start/{session_id}")
 async def start_session(
     session_id: str,
-    db: Client = Depends(get_db)
+    db: AsyncClient = Depends(get_db)
 ):
     """Démarre une session existante"""
     try:
@@ -227,7 +228,7 @@ async def start_session(
         uuid.UUID(session_id)
         
         # Vérification de l'existence de la session
-        session = get_session(session_id, db)
+        session = await get_session(session_id, db)
         if not session:
             raise HTTPException(status_code=404, detail="Session non trouvée")
 
@@ -240,7 +241,7 @@ async def start_session(
             'start_date': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
         }
         
-        response = db.table('sessions').update(updates).eq('id', session_id).execute()
+        response = await db.table('sessions').update(updates).eq('id', session_id).execute()
         
         if response.data:
             return response.data[0]
@@ -260,7 +261,7 @@ async def start_session(
 @router.post("/sessions/stop/{session_id}")
 async def stop_session(
     session_id: str,
-    db: Client = Depends(get_db)
+    db: AsyncClient = Depends(get_db)
 ):
     """Arrête une session existante"""
     try:
@@ -268,7 +269,7 @@ async def stop_session(
         uuid.UUID(session_id)
         
         # Vérification de l'existence de la session
-        session = get_session(session_id, db)
+        session = await get_session(session_id, db)
         if not session:
             raise HTTPException(status_code=404, detail="Session non trouvée")
             
@@ -280,7 +281,7 @@ async def stop_session(
         if session['status'] == 'stopped':
             raise HTTPException(status_code=400, detail="Session déjà arrêtée")
         
-        response = db.table('sessions').update(updates).eq('id', session_id).execute()
+        response = await db.table('sessions').update(updates).eq('id', session_id).execute()
         
         if response.data:
             return response.data[0]
@@ -302,7 +303,7 @@ async def stop_session(
 async def link_user_to_session(
     session_id: str,
     user_id: str,
-    db: Client = Depends(get_db)
+    db: AsyncClient = Depends(get_db)
 ):
     """Associe un utilisateur à une session"""
     try:
@@ -311,13 +312,12 @@ async def link_user_to_session(
         uuid.UUID(user_id)
         
         # Vérification de l'existence de la session
-        session = get_session(session_id, db)
+        session = await get_session(session_id, db)
         if not session:
             raise HTTPException(status_code=404, detail="Session non trouvée")
             
         # Vérification de l'existence de l'utilisateur
-        from routes.users import get_user_by_id
-        get_user_by_id(user_id, db)
+        await get_user_by_id(user_id, db)
         
         # Mise à jour de la session
         inserts = {
@@ -327,7 +327,7 @@ async def link_user_to_session(
             'role': 'participant'
         }
         
-        response = db.table('sessions_users').insert(inserts).execute()
+        response = await db.table('sessions_users').insert(inserts).execute()
         
         if response.data:
             return response.data[0]
@@ -343,7 +343,7 @@ async def link_user_to_session(
 async def link_user_to_session(
     session_id: str,
     user_id: str,
-    db: Client = Depends(get_db)
+    db: AsyncClient = Depends(get_db)
 ):
     """Associe un utilisateur à une session"""
     try:
@@ -352,11 +352,11 @@ async def link_user_to_session(
         uuid.UUID(user_id)
         
         # Vérification de l'existence de la session
-        session = get_session(session_id, db)
+        session = await get_session(session_id, db)
         if not session:
             raise HTTPException(status_code=404, detail="Session non trouvée")
                 
-        response = db.table('sessions_users').delete().eq('session_id', session_id ).eq('user_id', user_id).execute()
+        response = await db.table('sessions_users').delete().eq('session_id', session_id ).eq('user_id', user_id).execute()
         
         if response.data:
             return response.data[0]
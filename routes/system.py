@@ -1,18 +1,20 @@
+from typing import Optional
 from fastapi import APIRouter, HTTPException, Request
 from adb.adb_system import AdbSystem
 import logging
-from decorators import jwt_required
+from decorators import jwt_required, cancel_on_disconnect
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.get("/system/battery")
 @jwt_required
-async def battery_info(request: Request):
+@cancel_on_disconnect
+async def battery_info(request: Request, serial: Optional[str] = None):
     """Récupère les informations sur la batterie."""
     logger.debug("Entrée dans la fonction battery_info")
     try:
-        result = AdbSystem.battery_info()
+        result = await AdbSystem.battery_info_async(serial)
         logger.debug(f"Résultat des informations sur la batterie : {result}")
         return result
     except Exception as e:
@@ -21,25 +23,28 @@ async def battery_info(request: Request):
 
 @router.get("/system/uptime")
 @jwt_required
-async def uptime(request: Request):
+@cancel_on_disconnect
+async def uptime(request: Request, serial: Optional[str] = None):
     """Récupère le temps de fonctionnement du périphérique."""
     logger.debug("Entrée dans la fonction uptime")
     try:
-        result = AdbSystem.uptime()
-        infos=result.split(",")
+        result = await AdbSystem.uptime_async(serial)
+        if result.startswith("Erreur"):
+            raise RuntimeError(result)
         logger.debug(f"Résultat du temps de fonctionnement : {result}")
-        return {f"status":"OK", f"uptime":infos[0].strip(), f"users":infos[1].strip(),"infos":infos[2].strip()}
+        return {"status": "OK", **AdbSystem._parse_uptime(result)}
     except Exception as e:
         logger.error(f"Erreur lors de la récupération du temps de fonctionnement : {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/system/screen")
 @jwt_required
-async def screen_status(request: Request):
+@cancel_on_disconnect
+async def screen_status(request: Request, serial: Optional[str] = None):
     """Récupère l'état de l'écran."""
     logger.debug("Entrée dans la fonction screen_status")
     try:
-        result = AdbSystem.screen_status()
+        result = await AdbSystem.screen_status_async(serial)
         logger.debug(f"Résultat de l'état de l'écran : {result}")
         return result
     except Exception as e:
@@ -48,11 +53,12 @@ async def screen_status(request: Request):
 
 @router.get("/system/thermal")
 @jwt_required
-async def thermal_info(request: Request):
+@cancel_on_disconnect
+async def thermal_info(request: Request, serial: Optional[str] = None):
     """Récupère les informations thermiques."""
     logger.debug("Entrée dans la fonction thermal_info")
     try:
-        result = AdbSystem.thermal_info()
+        result = await AdbSystem.thermal_info_async(serial)
         logger.debug(f"Résultat des informations thermiques : {result}")
         return result
     except Exception as e:
@@ -61,11 +67,12 @@ async def thermal_info(request: Request):
     
 @router.get("/system/cpu")
 @jwt_required
-async def cpu_info(request: Request):
+@cancel_on_disconnect
+async def cpu_info(request: Request, serial: Optional[str] = None):
     """Récupère les informations thermiques."""
     logger.debug("Entrée dans la fonction cpu_info")
     try:
-        result = AdbSystem.get_cpu_info()
+        result = await AdbSystem.get_cpu_info_async(serial)
         logger.debug(f"Résultat des informations cpu : {result}")
         return result
     except Exception as e:
@@ -74,14 +81,34 @@ async def cpu_info(request: Request):
 
 @router.get("/system/memory")
 @jwt_required
-async def memory_info(request: Request):
+@cancel_on_disconnect
+async def memory_info(request: Request, serial: Optional[str] = None):
     """Récupère les informations mémoires."""
     logger.debug("Entrée dans la fonction memory_info")
     try:
-        result = AdbSystem.memory_info()
+        result = await AdbSystem.memory_info_async(serial)
         logger.debug(f"Résultat des informations mémoire : {result}")
         return result
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des informations mémoire : {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    
\ No newline at end of file
+
+@router.get("/system/snapshot")
+@jwt_required
+@cancel_on_disconnect
+async def snapshot(request: Request, fields: Optional[str] = None, serial: Optional[str] = None):
+    """Récupère en un seul appel les métriques système demandées (ex. fields=battery,memory)."""
+    logger.debug(f"Entrée dans la fonction snapshot avec fields={fields}")
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    # Seule une liste de champs invalide relève d'une erreur client
+    try:
+        AdbSystem._snapshot_fields(selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        result = await AdbSystem.snapshot_async(selected, serial)
+        logger.debug(f"Résultat du snapshot système : {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération du snapshot système : {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,12 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, Request
 from datetime import datetime
 import logging
-from supabase import Client
+from supabase import AsyncClient
 from database import get_db
+from auth.dependencies import get_current_profile, invalidate_profile
+from auth.dependencies import get_current_user as get_current_user_dependency
+from auth.roles import RoleResolver
 import uuid
 
 logger = logging.getLogger(__name__)
@@ -11,14 +15,14 @@ router = APIRouter()
 
 
 # --- Fonctions Utilitaires ---
-def get_user(username: str, db: Client = Depends(get_db)):
-    response = db.table('users').select('*').eq('username', username).execute()
+async def get_user(username: str, db: AsyncClient = Depends(get_db)):
+    response = await db.table('users').select('*').eq('username', username).execute()
     return response.data[0] if response.data else None
 
-def get_user_by_id(user_id: str, db: Client = Depends(get_db)):
+async def get_user_by_id(user_id: str, db: AsyncClient = Depends(get_db)):
     """Récupère un utilisateur par son ID"""
     try:
-        user = db.auth.admin.get_user_by_id(user_id)
+        user = await db.auth.admin.get_user_by_id(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
         return user
@@ -28,7 +32,7 @@ def get_user_by_id(user_id: str, db: Client = Depends(get_db)):
         logger.error(f"Erreur récupération utilisateur: {str(e)}")
         raise HTTPException(status_code=500, detail="Erreur serveur lors de la récupération")
 
-def add_profile(user_id: str, fullname: str, db: Client = Depends(get_db)):
+async def add_profile(user_id: str, fullname: str, db: AsyncClient = Depends(get_db)):
     """Ajoute un profil utilisateur dans la table profiles"""
     profile_data = {
         "id": user_id,
@@ -37,7 +41,7 @@ def add_profile(user_id: str, fullname: str, db: Client = Depends(get_db)):
     }
     
     try:
-        response = db.table('profiles').insert(profile_data).execute()
+        response = await db.table('profiles').insert(profile_data).execute()
         if response.data:
             return response.data[0]
         raise HTTPException(status_code=400, detail="Erreur lors de la création du profil")
@@ -45,14 +49,16 @@ def add_profile(user_id: str, fullname: str, db: Client = Depends(get_db)):
         logger.error(f"Erreur création profil: {str(e)}")
         raise HTTPException(status_code=500, detail="Erreur serveur lors de la création du profil")
 
-def add_application(user_id: str,  db: Client = Depends(get_db)):
+async def add_application(user_id: str,  db: AsyncClient = Depends(get_db)):
     """Ajoute une application utilisateur dans la table applications"""
     try:
-        response = db.table('applications').select('*').execute()
+        response = await db.table('applications').select('id').execute()
 
         if response.data:
-            for app in response.data:
-                db.table('applications_users').insert({"app_id": app['id'], "user_id": user_id, "status": "available"}).execute()
+            # Une seule insertion pour toutes les applications
+            await db.table('applications_users').insert([
+                {"app_id": app['id'], "user_id": user_id, "status": "available"} for app in response.data
+            ]).execute()
                 
     except Exception as e:
         logger.error(f"Erreur création application: {str(e)}")
@@ -60,12 +66,12 @@ def add_application(user_id: str,  db: Client = Depends(get_db)):
 
 # --- Routes ---
 @router.post("/users/add")
-async def add_user(request: Request, db: Client = Depends(get_db)):
+async def add_user(request: Request, db: AsyncClient = Depends(get_db)):
     user = await request.json()
     print(type(user))
     # Vérification des credentials via Supabase Auth
     try:
-        response = db.auth.sign_in_with_password({
+        response = await db.auth.sign_in_with_password({
             "email": user['email'],
             "password": user['password']
         })
@@ -77,7 +83,7 @@ async def add_user(request: Request, db: Client = Depends(get_db)):
     
     # Création de l'utilisateur via Supabase Auth
     try:
-        sign_up_response = db.auth.sign_up({
+        sign_up_response = await db.auth.sign_up({
             "email": user['email'],
             "password": user['password'],
             "options": {
@@ -92,12 +98,13 @@ async def add_user(request: Request, db: Client = Depends(get_db)):
         
         if sign_up_response.user:
             # Création du profil associé
-            profile = add_profile(
+            profile = await add_profile(
                 user_id=sign_up_response.user.id,
                 fullname=user.get('full_name', user['username']),
                 db=db
             )
-            add_application(user_id=sign_up_response.user.id, db=db)
+            await add_application(user_id=sign_up_response.user.id, db=db)
+            RoleResolver.instance().invalidate()
             
             return {
                 "id": sign_up_response.user.id,
@@ -113,24 +120,24 @@ async def add_user(request: Request, db: Client = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Erreur lors de la création de l'utilisateur")
 
 @router.get("/users/list")
-async def list_users(request: Request, db: Client = Depends(get_db)):
-    response = db.auth.admin.list_users()
+async def list_users(request: Request, db: AsyncClient = Depends(get_db)):
+    response = await db.auth.admin.list_users()
     return response
 
 @router.get("/users/find/byId/{user_id}")
-async def find_user_by_id(user_id: str, db: Client = Depends(get_db)):
+async def find_user_by_id(user_id: str, db: AsyncClient = Depends(get_db)):
     """Trouve un utilisateur par son ID avec son profil associé"""
     try:
         # Validation de l'UUID
         uuid.UUID(user_id)
         
-        # Récupération de l'utilisateur
-        user = db.auth.admin.get_user_by_id(user_id)
+        # Récupération simultanée de l'utilisateur et de son profil
+        user, profile = await asyncio.gather(
+            db.auth.admin.get_user_by_id(user_id),
+            db.table('profiles').select('*').eq('id', user_id).execute()
+        )
         if not user:
             raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
-            
-        # Récupération du profil
-        profile = db.table('profiles').select('*').eq('id', user_id).execute()
         
         return {
             "user": user,
@@ -143,31 +150,21 @@ async def find_user_by_id(user_id: str, db: Client = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Erreur serveur lors de la recherche")
 
 @router.get("/users/me")
-async def get_current_user(db: Client = Depends(get_db)):
-    """Récupère l'utilisateur actuellement authentifié"""
-    try:
-        # Récupération de l'utilisateur via le token JWT
-        user = db.auth.get_user()
-        if not user:
-            raise HTTPException(status_code=401, detail="Non authentifié")
-            
-        # Récupération du profil associé
-        profile = db.table('profiles').select('*').eq('id', user.user.id).execute()
-        
-        return {
-            "user": user.user,
-            "profile": profile.data[0] if profile.data else None
-        }
-    except Exception as e:
-        logger.error(f"Erreur récupération utilisateur: {str(e)}")
-        raise HTTPException(status_code=500, detail="Erreur serveur lors de la récupération")
+async def get_current_user(current_user=Depends(get_current_user_dependency),
+                           profile=Depends(get_current_profile)):
+    """Récupère l'utilisateur actuellement authentifié et son profil"""
+    return {
+        "user": current_user,
+        "profile": profile
+    }
 
 @router.delete("/users/delete/{user_id}")
-async def delete_user(request: Request, user_id: str, db: Client = Depends(get_db)):
+async def delete_user(request: Request, user_id: str, db: AsyncClient = Depends(get_db)):
     try:
         # Validation de l'UUID
         uuid.UUID(user_id)
-        db.auth.admin.delete_user(str(user_id))
+        await db.auth.admin.delete_user(str(user_id))
+        RoleResolver.instance().invalidate()
         return {"message": f"Utilisateur supprimé avec l'id : {user_id}"}
     except ValueError:
         raise HTTPException(status_code=400, detail=f"L'ID {user_id} utilisateur doit être un identifiant valide au format UUID")
@@ -177,7 +174,7 @@ async def delete_user(request: Request, user_id: str, db: Client = Depends(get_d
 
 
 @router.put("/users/profile/{user_id}")
-async def update_user_profile(request: Request, user_id: str, db: Client = Depends(get_db)):
+async def update_user_profile(request: Request, user_id: str, db: AsyncClient = Depends(get_db)):
     """Met à jour les informations publiques du profil utilisateur"""
     try:
         # Validation de l'UUID
@@ -187,7 +184,7 @@ async def update_user_profile(request: Request, user_id: str, db: Client = Depen
         profile_data = await request.json()
         
         # Vérification de l'existence du profil
-        existing_profile = db.table('profiles').select('*').eq('id', user_id).execute()
+        existing_profile = await db.table('profiles').select('*').eq('id', user_id).execute()
         if not existing_profile.data:
             raise HTTPException(status_code=404, detail="Profil non trouvé")
             
@@ -205,7 +202,9 @@ async def update_user_profile(request: Request, user_id: str, db: Client = Depen
             return {"message": "Aucune mise à jour nécessaire"}
             
         # Exécution de la mise à jour
-        response = db.table('profiles').update(updates).eq('id', user_id).execute()
+        response = await db.table('profiles').update(updates).eq('id', user_id).execute()
+        invalidate_profile(user_id)
+        RoleResolver.instance().invalidate()
         
         if response.data:
             return response.data[0]
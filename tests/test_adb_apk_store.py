@@ -0,0 +1,112 @@
+import asyncio
+import struct
+import zipfile
+
+import pytest
+
+from adb import adb_apk_store
+from adb.adb_apk_store import ApkFormatError, ApkStore, parse_manifest
+from adb.adb_services_applications import AdbApplications
+
+
+def _string_pool(strings):
+    offsets, data = [], b""
+    for string in strings:
+        offsets.append(len(data))
+        data += struct.pack("<H", len(string)) + string.encode("utf-16-le") + b"\0\0"
+    data += b"\0" * (-len(data) % 4)
+    header_size = 28
+    strings_start = header_size + 4 * len(strings)
+    body = struct.pack(f"<{len(strings)}I", *offsets) + data
+    return struct.pack("<HHIIIIII", 0x0001, header_size, header_size + len(body),
+                       len(strings), 0, 0, strings_start, 0) + body
+
+
+def _manifest(package, version_code, split=None):
+    """Construit un AndroidManifest.xml binaire réduit à l'élément <manifest>."""
+    strings = ["versionCode", "package", "split", "manifest", package] + ([split] if split else [])
+    pool = _string_pool(strings)
+    resource_map = struct.pack("<HHII", 0x0180, 8, 12, 0x0101021B)
+    attributes = [
+        struct.pack("<IIIHxBI", 0xFFFFFFFF, 0, 0xFFFFFFFF, 8, 0x10, version_code),
+        struct.pack("<IIIHxBI", 0xFFFFFFFF, 1, 4, 8, 0x03, 4),
+    ]
+    if split:
+        attributes.append(struct.pack("<IIIHxBI", 0xFFFFFFFF, 2, 5, 8, 0x03, 5))
+    body = struct.pack("<IIHHHHHH", 0xFFFFFFFF, 3, 20, 20, len(attributes), 0, 0, 0) + b"".join(attributes)
+    element = struct.pack("<HHIII", 0x0102, 16, 16 + len(body), 1, 0xFFFFFFFF) + body
+    content = pool + resource_map + element
+    return struct.pack("<HHI", 0x0003, 8, 8 + len(content)) + content
+
+
+def _apk(path, package, version_code, split=None):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("AndroidManifest.xml", _manifest(package, version_code, split))
+        archive.writestr("classes.dex", f"{package}{split}".encode())
+    return str(path)
+
+
+def test_parse_manifest():
+    assert parse_manifest(_manifest("com.example.vr", 42)) == \
+        {"package": "com.example.vr", "version_code": 42, "split": None}
+    assert parse_manifest(_manifest("com.example.vr", 42, "config.arm64_v8a"))["split"] == "config.arm64_v8a"
+    with pytest.raises(ApkFormatError):
+        parse_manifest(b"PK\x03\x04")
+
+
+def test_store_deduplicates_and_resolves_bundle(tmp_path):
+    store = ApkStore(str(tmp_path / "store"))
+    base_path = _apk(tmp_path / "base.apk", "com.example.vr", 7)
+    base = store.add_file(base_path)
+    assert store.add_file(base_path) == base
+    split = store.add_file(_apk(tmp_path / "split.apk", "com.example.vr", 7, "config.fr"))
+    assert len(store.list("com.example.vr")) == 2
+
+    bundle = store.resolve_bundle([split["sha256"], base["sha256"]])
+    assert bundle["package"] == "com.example.vr" and bundle["version_code"] == 7
+    assert bundle["paths"] == [store.path(base["sha256"]), store.path(split["sha256"])]
+
+    other = store.add_file(_apk(tmp_path / "autre.apk", "com.example.other", 1))
+    with pytest.raises(ValueError):
+        store.resolve_bundle([base["sha256"], other["sha256"]])
+    assert ApkStore(str(tmp_path / "store")).get(base["sha256"])["version_code"] == 7
+
+
+def test_store_adds_streamed_upload_off_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(adb_apk_store, "WRITE_BLOCK_SIZE", 100)
+    data = open(_apk(tmp_path / "base.apk", "com.example.vr", 7), "rb").read()
+    store = ApkStore(str(tmp_path / "store"))
+
+    async def chunks():
+        for offset in range(0, len(data), 64):
+            yield data[offset:offset + 64]
+
+    async def scenario():
+        entry = await store.add_stream(chunks(), "base.apk")
+        assert await store.add_file_async(str(tmp_path / "base.apk")) == entry
+        return entry
+
+    entry = asyncio.run(scenario())
+    assert entry["package"] == "com.example.vr" and entry["size"] == len(data)
+    assert open(store.path(entry["sha256"]), "rb").read() == data
+    assert [name for name in (tmp_path / "store").iterdir() if name.suffix == ".apk"] == [
+        tmp_path / "store" / f"{entry['sha256']}.apk"]
+
+
+def test_parse_versions():
+    output = "package:com.example.vr versionCode:42\npackage:com.android.shell versionCode:34"
+    assert AdbApplications._parse_versions(output) == {"com.example.vr": 42, "com.android.shell": 34}
+    assert AdbApplications._parse_versions("Erreur : device offline") == "Erreur : device offline"
+
+
+def test_parse_package_info_and_pidof():
+    output = ("Packages:\n  Package [com.example.vr] (3c1d2e):\n    versionCode=42 minSdk=29 targetSdk=32\n"
+              "    versionName=1.4.0\n    firstInstallTime=2026-01-02 10:11:12\n"
+              "    lastUpdateTime=2026-03-04 05:06:07\n")
+    info = AdbApplications._parse_package_info("com.example.vr", output)
+    assert (info["installed"], info["version_code"], info["version_name"]) == (True, 42, "1.4.0")
+    assert info["last_update_time"] == "2026-03-04 05:06:07"
+    assert not AdbApplications._parse_package_info("com.absent", "Unable to find package: com.absent")["installed"]
+    assert AdbApplications._parse_pidof("com.example.vr", "4242 4250")["pids"] == [4242, 4250]
+    assert AdbApplications._parse_pidof("com.example.vr", "")["running"] is False
+    assert AdbApplications._parse_pidof("com.example.vr", "Erreur : device offline")["statut"] == "Erreur"
@@ -0,0 +1,190 @@
+import asyncio
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import pytest
+
+from adb.adb_host_client import (
+    AdbHostClient, AdbProtocolError, AdbUnsupportedCommand, AsyncAdbHostClient, parse_shell_v2, translate_command
+)
+
+
+def _reply_string(data: str) -> bytes:
+    encoded = data.encode()
+    return b"OKAY" + f"{len(encoded):04x}".encode() + encoded
+
+
+def _packet(packet_id: int, data: bytes) -> bytes:
+    return bytes([packet_id]) + struct.pack("<I", len(data)) + data
+
+
+def _fail(message: str) -> bytes:
+    return b"FAIL" + f"{len(message):04x}".encode() + message.encode()
+
+
+class FakeAdbHandler(socketserver.BaseRequestHandler):
+    """Serveur ADB minimal : host:version, host:devices, features, transport, shell:, shell,v2, exec: et sync:."""
+
+    devices = {"HEADSET01": "device", "HEADSET02": "offline"}
+    legacy = {"LEGACY01"}  # Transport sans shell v2, hors de la liste host:devices
+    received: dict = {}
+
+    def _read_request(self) -> str:
+        length = int(self._read(4), 16)
+        return self._read(length).decode()
+
+    def _read(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def handle(self):
+        try:
+            request = self._read_request()
+        except ConnectionError:
+            return  # Connexion préchauffée jamais utilisée
+        if request == "host:version":
+            self.request.sendall(_reply_string("0029"))
+            return
+        if request == "host:devices":
+            listing = "".join(f"{serial}\t{state}\n" for serial, state in self.devices.items())
+            self.request.sendall(_reply_string(listing))
+            return
+        if request.startswith("host-serial:") and request.endswith(":features"):
+            serial = request.split(":")[1]
+            self.request.sendall(_reply_string("cmd,ls_v2" if serial in self.legacy else "shell_v2,cmd,ls_v2"))
+            return
+        if request.startswith("host:transport:"):
+            serial = request.split(":", 2)[2]
+            if serial not in self.devices and serial not in self.legacy:
+                self.request.sendall(_fail(f"device '{serial}' not found"))
+                return
+            self.request.sendall(b"OKAY")
+            service = self._read_request()
+            if service.startswith("shell,v2,raw:"):
+                command = service.split(":", 1)[1]
+                code = 1 if command.startswith("false") else 0
+                stream, text = (2, "erreur\n") if code else (1, f"{serial}> {command}\n")
+                self.request.sendall(b"OKAY" + _packet(stream, text.encode()) + _packet(3, bytes([code])))
+            elif service.startswith("shell:") or service.startswith("exec:"):
+                self.request.sendall(b"OKAY" + f"{serial}> {service.split(':', 1)[1]}\n".encode())
+            elif service == "sync:":
+                self.request.sendall(b"OKAY")
+                tag, length = self._read(4), struct.unpack("<I", self._read(4))[0]
+                argument = self._read(length).decode()
+                if tag == b"STAT":
+                    self.request.sendall(b"STAT" + struct.pack("<III", 0o100644, 1234, 1700000000))
+                elif tag == b"SEND":
+                    self._receive_file(argument.rsplit(",", 1)[0])
+            return
+        self.request.sendall(_fail(f"unknown host service {request}"))
+
+    def _receive_file(self, path: str):
+        data = b""
+        while True:
+            tag, length = self._read(4), struct.unpack("<I", self._read(4))[0]
+            if tag == b"DONE":
+                break
+            assert tag == b"DATA" and length <= 64 * 1024
+            data += self._read(length)
+        self.received[path] = data
+        self.request.sendall(b"OKAY" + struct.pack("<I", 0))
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    request_queue_size = 64  # Connexions du pool ouvertes en rafale
+
+
+@pytest.fixture
+def fake_adb_server():
+    server = FakeAdbServer(("127.0.0.1", 0), FakeAdbHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_translate_command():
+    assert translate_command(["-s", "X", "shell", "getprop", "ro.product.model"]) == \
+        ("X", "service", "shell:getprop ro.product.model")
+    assert translate_command(["devices"]) == (None, "host", "host:devices")
+    with pytest.raises(AdbUnsupportedCommand):
+        translate_command(["install", "app.apk"])
+
+
+def test_host_queries(fake_adb_server):
+    client = AdbHostClient(*fake_adb_server)
+    assert client.run(["version"]) == "Android Debug Bridge version 1.0.41"
+    assert client.run(["devices"]).splitlines() == [
+        "List of devices attached", "HEADSET01\tdevice", "HEADSET02\toffline"
+    ]
+
+
+def test_shell_through_pooled_sockets(fake_adb_server):
+    client = AdbHostClient(*fake_adb_server, pool_size=2)
+    for _ in range(3):
+        assert client.run(["-s", "HEADSET01", "shell", "uptime"]) == "HEADSET01> uptime"
+    # Le pool se remplit en arrière-plan dès la première prise d'une socket
+    for _ in range(100):
+        if len(client._pool) == 2:
+            break
+        time.sleep(0.01)
+    assert len(client._pool) == 2
+    assert client.stat("/sdcard/video.mp4", serial="HEADSET01")["size"] == 1234
+    client.close()
+
+
+def test_shell_exit_status(fake_adb_server):
+    client = AdbHostClient(*fake_adb_server, pool_size=0)
+    with pytest.raises(AdbProtocolError, match="erreur"):
+        client.run(["-s", "HEADSET01", "shell", "false"])
+    assert client.run(["-s", "LEGACY01", "shell", "uptime"]).startswith("LEGACY01> uptime ;")
+    assert parse_shell_v2(_packet(1, b"out") + _packet(2, b"err") + _packet(3, b"\x02")) == (b"out", b"err", 2)
+
+
+def test_unknown_device_raises(fake_adb_server):
+    client = AdbHostClient(*fake_adb_server)
+    with pytest.raises(AdbProtocolError, match="not found"):
+        client.shell("uptime", serial="INCONNU")
+
+
+def test_async_client(fake_adb_server):
+    client = AsyncAdbHostClient(*fake_adb_server)
+
+    async def scenario():
+        results = await asyncio.gather(*(
+            client.run(["-s", "HEADSET01", "shell", f"echo {i}"]) for i in range(5)
+        ))
+        chunks = [chunk async for chunk in client.stream("exec:cat /sdcard/a.bin", serial="HEADSET01")]
+        await asyncio.sleep(0.1)
+        assert len(client._pool) == client.pool_size  # Rempli en arrière-plan
+        client.close()
+        return results, b"".join(chunks)
+
+    results, streamed = asyncio.run(scenario())
+    assert results == [f"HEADSET01> echo {i}" for i in range(5)]
+    assert streamed == b"HEADSET01> cat /sdcard/a.bin\n"
+
+
+def test_async_push(fake_adb_server):
+    client = AsyncAdbHostClient(*fake_adb_server)
+    payload = bytes(range(256)) * 1000
+    progress = []
+
+    async def chunks():
+        for offset in range(0, len(payload), 100000):
+            yield payload[offset:offset + 100000]
+
+    sent = asyncio.run(client.push("/sdcard/video.mp4", chunks(), serial="HEADSET01", progress=progress.append))
+    assert sent == len(payload)
+    assert FakeAdbHandler.received["/sdcard/video.mp4"] == payload
+    assert progress[-1] == len(payload) and len(progress) > 2
@@ -0,0 +1,47 @@
+import asyncio
+import struct
+
+import pytest
+
+from adb.adb_logcat import LogcatFilter, LogcatReader, parse_entries
+
+
+def _entry(priority, tag, message, pid=1234, seconds=1700000000, nanoseconds=500_000_000, header_size=28):
+    payload = bytes([priority]) + tag.encode() + b"\0" + message.encode() + b"\0"
+    header = struct.pack("<HHiIII", len(payload), header_size if header_size != 20 else 0, pid, pid,
+                         seconds, nanoseconds)
+    return header + b"\0" * (header_size - len(header)) + payload
+
+
+def test_parse_entries_keeps_incomplete_tail():
+    data = _entry(4, "Unity", "Scene loaded") + _entry(6, "AndroidRuntime", "FATAL EXCEPTION", header_size=20)
+    entries, rest = parse_entries(data[:-5])
+    assert [(e.priority, e.tag, e.message) for e in entries] == [(4, "Unity", "Scene loaded")]
+    assert entries[0].timestamp == pytest.approx(1700000000.5)
+    entries, rest = parse_entries(rest + data[-5:])
+    assert [(e.tag, e.message) for e in entries] == [("AndroidRuntime", "FATAL EXCEPTION")]
+    assert rest == b""
+
+
+def test_logcat_filter():
+    entries, _ = parse_entries(_entry(3, "Unity", "frame 1", pid=1) + _entry(5, "Unity", "GC alloc 42", pid=2)
+                               + _entry(6, "Audio", "underrun", pid=2))
+    assert [e.message for e in entries if LogcatFilter(priority="W").matches(e)] == ["GC alloc 42", "underrun"]
+    assert [e.message for e in entries if LogcatFilter(tags=["Unity"], pattern=r"\d{2}").matches(e)] == ["GC alloc 42"]
+    assert [e.message for e in entries if LogcatFilter(pid=2, priority="e").matches(e)] == ["underrun"]
+    with pytest.raises(ValueError):
+        LogcatFilter(priority="X")
+    with pytest.raises(ValueError):
+        LogcatFilter(pattern="(")
+
+
+def test_stopped_reader_is_dropped():
+    async def scenario():
+        reader = LogcatReader.for_device("GONE01")
+        assert LogcatReader.for_device("GONE01") is reader
+        await reader.stop()
+        assert "GONE01" not in LogcatReader._readers
+        assert LogcatReader.for_device("GONE01") is not reader
+        await LogcatReader.close_all()
+
+    asyncio.run(scenario())
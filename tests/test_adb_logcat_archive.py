@@ -0,0 +1,56 @@
+from urllib.parse import unquote
+
+from adb.adb_logcat import LogcatFilter, LogEntry
+from adb.adb_logcat_archive import ArchiveWriter, device_directory, query_archive, read_index
+
+BASE = 1700000000.0  # 2023-11-14 22:13:20 UTC
+
+
+def _write(directory, serial, entries, block_entries=2):
+    writer = ArchiveWriter(serial, str(directory), block_entries=block_entries)
+    for entry in entries:
+        if writer.append(entry):
+            writer.flush()
+    writer.flush()
+    return writer
+
+
+def test_blocks_are_indexed_and_partitioned_by_hour(tmp_path):
+    entries = [LogEntry(BASE + i * 600, 1, 1, 4, "Unity" if i % 2 else "Audio", f"m{i}") for i in range(6)]
+    writer = _write(tmp_path, "192.168.1.5:5555", entries)
+    partitions = sorted(p.name for p in (tmp_path / "192.168.1.5%3A5555").iterdir())
+    assert partitions == ["2023111422", "2023111423"]
+    blocks = read_index(str(tmp_path / "192.168.1.5%3A5555" / partitions[0]))
+    assert [block["count"] for block in blocks] == [2, 2, 1]
+    assert blocks[0]["tags"] == ["Audio", "Unity"]
+    # Les entrées déjà archivées ne sont pas réécrites quand logcat rejoue son historique
+    assert ArchiveWriter("192.168.1.5:5555", str(tmp_path)).last_timestamp == writer.last_timestamp
+
+
+def test_query_filters_time_tag_and_level(tmp_path):
+    _write(tmp_path, "A", [LogEntry(BASE + i, 10, 10, 6 if i == 3 else 3, "Unity", f"a{i}") for i in range(5)])
+    _write(tmp_path, "B", [LogEntry(BASE + i + 0.5, 20, 20, 4, "Audio", f"b{i}") for i in range(5)])
+    everything = LogcatFilter()
+    result = query_archive(["A", "B"], BASE + 1, BASE + 2.5, everything, directory=str(tmp_path))
+    assert [entry["message"] for entry in result] == ["a1", "b1", "a2", "b2"]
+    errors = query_archive(["A", "B"], BASE, BASE + 10, LogcatFilter(priority="E"), directory=str(tmp_path))
+    assert [(entry["serial"], entry["message"]) for entry in errors] == [("A", "a3")]
+    audio = query_archive(["A", "B"], BASE, BASE + 10, LogcatFilter(tags=["Audio"]), limit=2, directory=str(tmp_path))
+    assert [entry["message"] for entry in audio] == ["b0", "b1"]
+
+
+def test_same_timestamp_entries_are_kept_and_replays_dropped(tmp_path):
+    burst = [LogEntry(BASE, 1, 1, 4, "Unity", f"m{i}") for i in range(3)]
+    _write(tmp_path, "A", burst)
+    # Reprise après redémarrage : logcat rejoue la même milliseconde puis continue
+    writer = _write(tmp_path, "A", burst + [LogEntry(BASE, 1, 1, 4, "Unity", "m3"),
+                                            LogEntry(BASE + 1, 1, 1, 4, "Unity", "m4")])
+    result = query_archive(["A"], BASE, BASE + 10, LogcatFilter(), directory=str(tmp_path))
+    assert [entry["message"] for entry in result] == ["m0", "m1", "m2", "m3", "m4"]
+    assert not writer.append(LogEntry(BASE + 0.5, 1, 1, 4, "Unity", "old"))
+
+
+def test_device_directory_escapes_dot_names():
+    assert device_directory("192.168.1.5:5555") == "192.168.1.5%3A5555"
+    assert device_directory("..") == "%2E%2E" and unquote(device_directory("..")) == ".."
+    assert device_directory("a/../b") == "a%2F..%2Fb"
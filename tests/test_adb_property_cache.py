@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from adb.adb_property_cache import DevicePropertyCache
+
+
+def test_cancelled_caller_does_not_cancel_shared_load():
+    async def scenario():
+        cache = DevicePropertyCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "[ro.product.model]: [Quest 3]"
+
+        first = asyncio.ensure_future(cache.get_or_load_async("S1", "getprop", loader))
+        second = asyncio.ensure_future(cache.get_or_load_async("S1", "getprop", loader))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "[ro.product.model]: [Quest 3]"
+        assert first.cancelled() and len(calls) == 1
+        assert cache.get("S1", "getprop") == "[ro.product.model]: [Quest 3]"
+
+    asyncio.run(scenario())
+
+
+def test_failed_load_can_be_retried():
+    async def scenario():
+        cache = DevicePropertyCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("adb injoignable")
+            return "ok"
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load_async("S1", "getprop", loader)
+        assert await cache.get_or_load_async("S1", "getprop", loader) == "ok"
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,13 @@
+import pytest
+
+from adb.adb_screen import H264ScreenStream
+
+
+def test_h264_stream_rejects_unsafe_options():
+    assert "--size=1280x720" in H264ScreenStream(size="1280x720", bit_rate=2_000_000).command()
+    for size in ("1280x720;reboot", "1280x720\n", "$(id)", ""):
+        with pytest.raises(ValueError):
+            H264ScreenStream(size=size)
+    for bit_rate in (0, -1, "4000000;id"):
+        with pytest.raises(ValueError):
+            H264ScreenStream(bit_rate=bit_rate)
@@ -0,0 +1,62 @@
+import asyncio
+import struct
+import zlib
+
+import pytest
+
+from adb import adb_screenshot
+from adb.adb_screenshot import (PIXEL_BGRA_8888, PIXEL_RGBA_8888, ScreenshotCache, encode_png_zlib,
+                                parse_raw_screencap)
+
+
+def _raw(width, height, pixel_format, pixels, colorspace=True):
+    header = struct.pack("<III", width, height, pixel_format) + (struct.pack("<I", 1) if colorspace else b"")
+    return header + pixels
+
+
+@pytest.mark.parametrize("colorspace", [True, False])
+def test_parse_raw_screencap_detects_header_size(colorspace):
+    pixels = bytes(range(2 * 3 * 4))
+    raw = parse_raw_screencap(_raw(2, 3, PIXEL_RGBA_8888, pixels, colorspace), timestamp=1.0)
+    assert (raw.width, raw.height, raw.pixel_format, raw.timestamp) == (2, 3, PIXEL_RGBA_8888, 1.0)
+    assert raw.pixels == pixels
+
+
+def test_parse_raw_screencap_rejects_invalid_data():
+    with pytest.raises(ValueError):
+        parse_raw_screencap(_raw(2, 3, PIXEL_RGBA_8888, bytes(10)))
+    with pytest.raises(ValueError):
+        parse_raw_screencap(_raw(2, 3, 4, bytes(12)))  # RGB_565 : 2 octets par pixel
+    with pytest.raises(ValueError):
+        parse_raw_screencap(b"\0" * 4)
+
+
+def test_encode_png_zlib_swaps_bgra():
+    raw = parse_raw_screencap(_raw(1, 2, PIXEL_BGRA_8888, bytes([1, 2, 3, 255, 4, 5, 6, 255])))
+    png = encode_png_zlib(raw)
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    width, height, depth, color_type = struct.unpack(">IIBB", png[16:26])
+    assert (width, height, depth, color_type) == (1, 2, 8, 6)
+    idat_length = struct.unpack(">I", png[33:37])[0]
+    assert png[37:41] == b"IDAT"
+    assert zlib.decompress(png[41:41 + idat_length]) == bytes([0, 3, 2, 1, 255, 0, 6, 5, 4, 255])
+
+
+def test_encoded_cache_keeps_latest_frame_only(monkeypatch):
+    async def stream(command, serial=None):
+        yield _raw(1, 1, PIXEL_RGBA_8888, b"\x01\x02\x03\xff")
+
+    monkeypatch.setattr(adb_screenshot.AsyncAdbCommandExecutor, "stream", stream)
+
+    async def scenario():
+        cache = ScreenshotCache(max_raw_frames=1)
+        await cache.capture("S1", "png", 80, max_age=0)
+        await cache.capture("S1", "png", 90, max_age=0)
+        assert {key[0] for key in cache._encoded} == {"S1"}
+        await asyncio.sleep(0.01)
+        await cache.capture("S1", "png", 80, max_age=0)
+        assert list(cache._encoded) == [("S1", "png", 80)]
+        await cache.capture("S2", "png", 80, max_age=0)
+        assert list(cache._encoded) == [("S2", "png", 80)]
+
+    asyncio.run(scenario())
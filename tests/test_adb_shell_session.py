@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from adb import adb_shell_session
+from adb.adb_shell_session import DeviceShellSession, ShellSessionBusy
+
+
+@pytest.fixture
+def fake_adb(tmp_path, monkeypatch):
+    script = tmp_path / "adb"
+    script.write_text("#!/bin/sh\nexec sh\n")
+    script.chmod(0o755)
+    monkeypatch.setattr(adb_shell_session, "adb_path", lambda: str(script))
+
+
+def test_session_bounds_waiters_and_times_out_while_waiting(fake_adb):
+    async def scenario():
+        session = DeviceShellSession(max_pending=2)
+        output, code = await session.execute("echo ok")
+        assert (output.strip(), code) == ("ok", 0)
+
+        stuck = asyncio.ensure_future(session.execute("sleep 1.5", timeout=0.5))
+        await asyncio.sleep(0.1)
+        waiting = asyncio.ensure_future(session.execute("echo late", timeout=0.2))
+        await asyncio.sleep(0)
+        with pytest.raises(ShellSessionBusy):
+            await session.execute("echo refused")
+        # Le délai couvre aussi l'attente de la session occupée
+        with pytest.raises(asyncio.TimeoutError):
+            await waiting
+        with pytest.raises(asyncio.TimeoutError):
+            await stuck
+        output, code = await session.execute("echo again")
+        assert (output.strip(), code) == ("again", 0)
+        await session.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import jwt
+
+from auth.revocation import (BloomFilter, MemoryRevocationBackend, RedisRevocationBackend, RevocationStore,
+                             SqliteRevocationBackend, token_key)
+
+
+def _token(**claims):
+    return jwt.encode({"sub": "user-1", "exp": int(time.time()) + 3600, **claims}, "secret-" * 6, algorithm="HS256")
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000)
+    for i in range(1000):
+        bloom.add(f"key-{i}")
+    assert all(f"key-{i}" in bloom for i in range(1000))
+    assert sum(f"other-{i}" in bloom for i in range(10000)) < 100
+
+
+def test_token_key_prefers_jti():
+    assert token_key(_token(jti="abc")) == "jti:abc"
+    assert len(token_key(_token())) == 64
+
+
+def test_memory_store_expires_revocations():
+    async def scenario():
+        store = RevocationStore(MemoryRevocationBackend())
+        active, expired, other = _token(), _token(exp=int(time.time()) - 1), _token(sub="user-2")
+        await store.revoke(active)
+        await store.revoke(expired)
+        assert await store.is_revoked(active)
+        assert not await store.is_revoked(expired)
+        assert not await store.is_revoked(other)
+        assert store.backend_checks == 2  # Le jeton non révoqué est écarté par le filtre de Bloom
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "revocations.db")
+        first = RevocationStore(SqliteRevocationBackend(path), sync_interval=0)
+        second = RevocationStore(SqliteRevocationBackend(path), sync_interval=0)
+        token = _token()
+        assert not await second.is_revoked(token)
+        await first.revoke(token)
+        assert await second.is_revoked(token)
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_sync_follows_insertion_order_not_clock(tmp_path, monkeypatch):
+    async def scenario():
+        path = str(tmp_path / "revocations.db")
+        first = RevocationStore(SqliteRevocationBackend(path), sync_interval=0)
+        second = RevocationStore(SqliteRevocationBackend(path), sync_interval=0)
+        late, early = _token(sub="late"), _token(sub="early")
+        await first.revoke(late)
+        assert await second.is_revoked(late)
+        # Révocation enregistrée ensuite par un worker dont l'horloge retarde
+        monkeypatch.setattr(time, "time", lambda real=time.time: real() - 60)
+        await first.revoke(early)
+        monkeypatch.undo()
+        assert await second.is_revoked(early)
+
+    asyncio.run(scenario())
+
+
+class FakeRedis:
+    """Sous-ensemble de redis.asyncio utilisé par RedisRevocationBackend."""
+
+    def __init__(self):
+        self.values = {}
+        self.stream = []
+        self.sequence = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def exists(self, name):
+        return int(name in self.values)
+
+    async def xrange(self, name, min="-", max="+"):
+        after = int(min[1:].split("-")[0]) if min.startswith("(") else 0
+        return [(f"{entry_id}-0".encode(), fields) for entry_id, fields in self.stream if entry_id > after]
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, name, value, ex=None):
+        self.commands.append(lambda: self.client.values.__setitem__(name, value))
+
+    def xadd(self, name, fields, minid=None, approximate=True):
+        def xadd():
+            self.client.sequence += 1
+            self.client.stream.append((self.client.sequence, {k.encode(): v.encode() for k, v in fields.items()}))
+        self.commands.append(xadd)
+
+    async def execute(self):
+        for command in self.commands:
+            command()
+
+
+def test_redis_store_is_shared_between_workers():
+    async def scenario():
+        client = FakeRedis()
+        first = RevocationStore(RedisRevocationBackend(client=client), sync_interval=0)
+        second = RevocationStore(RedisRevocationBackend(client=client), sync_interval=0)
+        tokens = [_token(sub=f"user-{i}") for i in range(3)]
+        assert not await second.is_revoked(tokens[0])
+        for token in tokens:
+            await first.revoke(token)
+            assert await second.is_revoked(token)
+        assert second.bloom_keys == 3  # Chaque révocation n'est lue qu'une fois grâce au curseur
+
+    asyncio.run(scenario())
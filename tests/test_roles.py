@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from auth.roles import Authorizations, RoleResolver
+
+
+def _rows():
+    user_roles = [{"user_id": "u1", "role": "admin"}, {"user_id": "u2", "role": "user"}]
+    profiles = [{"id": "u2", "role": "operator", "group_id": "g1"}, {"id": "u3", "role": None}]
+    groups = [{"id": "g1", "name": "lab"}]
+    return user_roles, profiles, groups
+
+
+def test_authorizations_from_rows():
+    authorizations = Authorizations.from_rows(*_rows())
+    assert authorizations.has_role("u1", "admin")
+    assert authorizations.has_role("u2", "admin", "operator")
+    assert not authorizations.has_role("u3", "user")
+    assert authorizations.in_group("u2", "lab") and authorizations.in_group("u2", "g1")
+    assert not authorizations.in_group("u1", "lab")
+
+
+def test_resolver_loads_once_and_reloads_after_invalidation():
+    async def scenario():
+        rows = {"roles": [{"user_id": "u1", "role": "admin"}]}
+
+        async def loader():
+            await asyncio.sleep(0.01)
+            return Authorizations.from_rows(rows["roles"], [], [])
+
+        resolver = RoleResolver(loader, ttl=60)
+        checks = await asyncio.gather(*(resolver.has_role("u1", "admin") for _ in range(20)))
+        assert all(checks) and resolver.loads == 1
+
+        rows["roles"] = []
+        assert await resolver.has_role("u1", "admin")
+        resolver.invalidate()
+        assert not await resolver.has_role("u1", "admin")
+        assert resolver.loads == 2
+
+    asyncio.run(scenario())
+
+
+def test_resolver_serves_stale_index_while_refreshing():
+    async def scenario():
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            if len(calls) > 1:
+                raise RuntimeError("base injoignable")
+            return Authorizations({"u1": ["admin"]}, {})
+
+        resolver = RoleResolver(loader, ttl=0)
+        assert await resolver.has_role("u1", "admin")
+        # Rechargement de fond en échec : l'index précédent continue de répondre
+        assert await resolver.has_role("u1", "admin")
+        await asyncio.sleep(0)
+        resolver.invalidate()
+        with pytest.raises(RuntimeError):
+            await resolver.has_role("u1", "admin")
+        assert resolver.stats()["stale"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import time
+
+import jwt
+import pytest
+
+from auth.token_verifier import LocalVerificationUnavailable, TokenVerifier
+
+SECRET = "test-secret-with-enough-length-for-hs256"
+
+
+def _token(secret=SECRET, **claims):
+    payload = {"sub": "user-1", "aud": "authenticated", "role": "authenticated", "email": "prof@example.com",
+               "exp": int(time.time()) + 3600}
+    payload.update(claims)
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def test_verify_and_cache():
+    verifier = TokenVerifier(secret=SECRET, supabase_url=None)
+    token = _token()
+    user = verifier.verify(token)
+    assert (user.id, user.email, user.role) == ("user-1", "prof@example.com", "authenticated")
+    assert verifier.verify(token) is user
+    assert verifier.stats()["hits"] == 1
+    verifier.discard(token)
+    assert verifier.verify(token) is not user
+
+
+@pytest.mark.parametrize("token", [
+    _token(exp=int(time.time()) - 60),
+    _token(aud="anon"),
+    _token(secret="another-secret-with-enough-length-for-hs256"),
+])
+def test_rejected_tokens(token):
+    with pytest.raises(jwt.InvalidTokenError):
+        TokenVerifier(secret=SECRET, supabase_url=None).verify(token)
+
+
+def test_remote_fallback_without_key_material():
+    verifier = TokenVerifier(secret=None, supabase_url=None, remote_paths=["/users"])
+    assert verifier.requires_remote("/devices/list")
+    with pytest.raises(LocalVerificationUnavailable):
+        verifier.verify(_token())
+    assert TokenVerifier(secret=SECRET, supabase_url=None, remote_paths=["/users"]).requires_remote("/users/list")